@@ -0,0 +1,56 @@
+import argparse
+import io
+import json
+import time
+
+from PIL import Image
+
+from benchmarks.common import latency_summary
+from nutrivision import assets
+
+
+# Function to do what every rerun did before: decode the logo, then what st.image does with a
+# PIL image and a smaller width: encode it at full size, reopen, resize and encode again
+def logo_per_rerun(width):
+    full = io.BytesIO()
+    Image.open(assets.LOGO_PATH).save(full, format="PNG")
+    image = Image.open(io.BytesIO(full.getvalue()))
+    height = max(1, round(image.height * width / image.width))
+    buffer = io.BytesIO()
+    image.resize((width, height), Image.BILINEAR).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def sample(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - start)
+    return result, latency_summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-rerun cost of the page logo and theme CSS, before and after the asset cache")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--width", type=int, default=assets.LOGO_WIDTH)
+    args = parser.parse_args()
+
+    with open(assets.THEME_PATH, encoding="utf-8") as source:
+        raw_css = f"<style>{source.read()}</style>"
+    old_logo, old_timing = sample(lambda: logo_per_rerun(args.width), args.repeat)
+    new_logo, new_timing = sample(lambda: assets.logo_thumbnail(args.width).data, args.repeat)
+    css = assets.theme_css().data
+
+    report = {
+        "logo_per_rerun": {"before": old_timing, "after": new_timing},
+        "logo_bytes": {"source": assets.logo_thumbnail(args.width).source_bytes, "before": len(old_logo), "after": len(new_logo)},
+        "css_bytes": {"before": len(raw_css), "after": len(css)},
+        "bytes_saved_per_rerun": len(old_logo) - len(new_logo) + len(raw_css) - len(css),
+        "stats": assets.asset_stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import latency_summary, synthetic_images
+from nutrivision.backends import BACKENDS, make_loader
+from nutrivision.model_registry import MODEL_IDS, ModelRegistry, resident_memory_bytes
+
+
+# Function to load the local image set, falling back to synthetic images
+def load_images(images_dir, count):
+    if not images_dir:
+        return synthetic_images(count)
+    from PIL import Image
+
+    paths = sorted(
+        path for pattern in ("*.jpg", "*.jpeg", "*.png")
+        for path in glob.glob(os.path.join(images_dir, pattern))
+    )
+    return [Image.open(path).convert("RGB") for path in paths[:count]]
+
+
+# Function to benchmark one backend; runs in its own process so memory numbers don't mix
+def run_worker(args):
+    rss_start = resident_memory_bytes()
+    registry = ModelRegistry(MODEL_IDS, loader=make_loader(args.worker, intra_op_threads=args.threads))
+    registry.preload(background=False)
+    images = load_images(args.images_dir, args.images)
+
+    report = {"backend": args.worker, "models": {}}
+    for name in registry.model_ids:
+        model = registry.get(name)
+        pixel_values = model.processor(images, return_tensors="pt")["pixel_values"]
+        model.forward(pixel_values[:1])  # warm-up
+        latencies = []
+        for index in range(len(images)):
+            start = time.perf_counter()
+            model.forward(pixel_values[index:index + 1])
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        predictions = model.forward(pixel_values)
+        batch_seconds = time.perf_counter() - start
+        report["models"][name] = {
+            "load_seconds": round(model.load_seconds, 2),
+            "single_image": latency_summary(latencies),
+            "batch_img_per_s": round(len(images) / batch_seconds, 2),
+            "predictions": predictions,
+        }
+    report["rss_mb"] = round((resident_memory_bytes() - rss_start) / 2**20, 1)
+    print(json.dumps(report))
+
+
+# Function to compare a backend's predictions with the eager reference
+def parity(reference, candidate):
+    agree = 0
+    max_diff = 0.0
+    for ref, cand in zip(reference, candidate):
+        agree += ref[0]["label"] == cand[0]["label"]
+        ref_scores = {item["label"]: item["score"] for item in ref}
+        for item in cand:
+            if item["label"] in ref_scores:
+                max_diff = max(max_diff, abs(item["score"] - ref_scores[item["label"]]))
+    return {"top1_agreement": round(agree / max(len(reference), 1), 4), "max_score_diff": round(max_diff, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, memory and accuracy parity of the classification backends")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--images-dir", help="directory of local .jpg/.png images (synthetic images if omitted)")
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--threads", type=int, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="fail if top-1 agreement with eager drops below this")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    backends = [backend for backend in args.backends.split(",") if backend]
+    if "eager" not in backends:
+        backends.insert(0, "eager")
+    reports = {}
+    for backend in backends:
+        command = [sys.executable, "-m", "benchmarks.bench_backends", "--worker", backend, "--images", str(args.images)]
+        if args.images_dir:
+            command += ["--images-dir", args.images_dir]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        reports[backend] = json.loads(output.strip().splitlines()[-1])
+
+    reference = {name: model_report["predictions"] for name, model_report in reports["eager"]["models"].items()}
+    failed = False
+    summary = {}
+    for backend, report in reports.items():
+        summary[backend] = {"rss_mb": report["rss_mb"], "models": {}}
+        for name, model_report in report["models"].items():
+            predictions = model_report.pop("predictions")
+            model_report["parity"] = parity(reference[name], predictions) if backend != "eager" else None
+            if model_report["parity"] and model_report["parity"]["top1_agreement"] < args.min_agreement:
+                failed = True
+            summary[backend]["models"][name] = model_report
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
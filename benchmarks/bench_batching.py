@@ -0,0 +1,71 @@
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import fake_loader, latency_summary, synthetic_images
+from nutrivision.inference_scheduler import InferenceScheduler
+from nutrivision.model_registry import MODEL_IDS, ModelRegistry, load_pipeline
+
+
+# Function to classify every image with one direct call per model, like the original page
+def run_unbatched(registry, images, clients):
+    def classify(image):
+        start = time.perf_counter()
+        for name in registry.model_ids:
+            registry.get(name)(image)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(classify, images))
+    return time.perf_counter() - start, latencies, None
+
+
+def run_batched(registry, images, clients, max_batch, max_wait_ms):
+    scheduler = InferenceScheduler(registry, registry.model_ids, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+    def classify(image):
+        start = time.perf_counter()
+        scheduler.submit(image).result()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(classify, images))
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats()
+    scheduler.shutdown()
+    return elapsed, latencies, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput/latency of micro-batched food classification")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent sessions submitting uploads")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=20.0)
+    parser.add_argument("--fake-models", action="store_true", help="use fake pipelines instead of the Hugging Face models")
+    args = parser.parse_args()
+
+    loader = fake_loader() if args.fake_models else load_pipeline
+    registry = ModelRegistry(MODEL_IDS, loader=loader)
+    registry.preload(background=False)
+    images = synthetic_images(args.images)
+
+    report = {}
+    for mode in ("unbatched", "batched"):
+        if mode == "unbatched":
+            elapsed, latencies, stats = run_unbatched(registry, images, args.clients)
+        else:
+            elapsed, latencies, stats = run_batched(registry, images, args.clients, args.max_batch, args.max_wait_ms)
+        report[mode] = {
+            "throughput_img_per_s": round(len(images) / elapsed, 2),
+            "latency": latency_summary(latencies),
+            "scheduler": stats,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import json
+import time
+
+from benchmarks.common import measure
+from benchmarks.seed import seeded_database
+from nutrivision import favorites
+from nutrivision.context_builder import ContextBuilder
+from nutrivision.search import search_favorites
+from nutrivision.vector_index import get_vector_index, nearest_favorites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Favorites listing and full-text search over a seeded SQLite database")
+    parser.add_argument("--db", default="bench_favorites.sqlite3")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--retrieval", action="store_true", help="also build the vector index and time top-k retrieval")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seeded_database(args.db, args.rows)
+    print(f"seeded {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+    deep_cursor = args.rows - favorites.PAGE_SIZE * 2
+    report = {
+        "load_all": measure(favorites.load_favorites, max(1, args.repeat // 2)),
+        "first_page": measure(lambda: favorites.list_favorites(), args.repeat * 10),
+        "deep_page": measure(lambda: favorites.list_favorites(after_id=deep_cursor), args.repeat * 10),
+        "expand_one": measure(lambda: favorites.get_favorite_recipe(args.rows // 2), args.repeat * 10),
+        "search_common": measure(lambda: search_favorites("garlic tomato"), args.repeat * 10),
+        "search_rare": measure(lambda: search_favorites(f"#{args.rows // 3}"), args.repeat * 10),
+        "search_prefix": measure(lambda: search_favorites("chickp"), args.repeat * 10),
+        "context_build": measure(lambda: ContextBuilder().build(favorites.context_candidates(), args.rows), args.repeat * 10),
+    }
+    if args.retrieval:
+        # The first build embeds every seeded row and stores the vectors; later runs only read them
+        report["index_build"] = measure(get_vector_index, 1)
+        report["retrieve_top8"] = measure(lambda: nearest_favorites("quick vegetarian pasta with garlic"), args.repeat * 10)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
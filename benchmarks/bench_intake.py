@@ -0,0 +1,46 @@
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from benchmarks.common import measure
+from benchmarks.seed import seeded_intake
+from nutrivision import intake
+
+
+# Function to aggregate a range the way a dashboard without rollups would: scan raw meals, then group
+def raw_scan_daily(start, end):
+    meals = intake.meal_logs_frame(start, end)
+    days = pd.to_datetime(meals["logged_at"]).dt.floor("D")
+    return meals.groupby(days)[list(intake.MACROS)].sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intake logging and dashboard aggregates over millions of synthetic meals")
+    parser.add_argument("--db", default="bench_intake.sqlite3")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    end = date(2026, 1, 1)
+    start = time.perf_counter()
+    seeded_intake(args.db, args.rows, end)
+    print(f"seeded {args.rows} meal logs in {time.perf_counter() - start:.1f}s")
+
+    month, year = end - timedelta(days=29), end - timedelta(days=364)
+    report = {
+        "log_one_meal": measure(lambda: intake.log_meal(450, 20, 15, 50, logged_at=pd.Timestamp(end).to_pydatetime()), args.repeat * 10),
+        "daily_30d": measure(lambda: intake.daily_totals(month, end), args.repeat * 10),
+        "daily_365d": measure(lambda: intake.daily_totals(year, end), args.repeat * 10),
+        "weekly_365d": measure(lambda: intake.weekly_totals(intake.daily_totals(year, end)), args.repeat * 10),
+        "rolling7_365d": measure(lambda: intake.rolling_averages(intake.daily_totals(year, end)), args.repeat * 10),
+        "raw_scan_30d": measure(lambda: raw_scan_daily(month, end), args.repeat),
+        "raw_scan_365d": measure(lambda: raw_scan_daily(year, end), max(1, args.repeat // 2)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
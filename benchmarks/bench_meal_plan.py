@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from nutrivision.db import configure_database
+from nutrivision.fakes import FakeCohereClient, FaultInjectingClient
+from nutrivision.llm_gateway import LLMGateway
+from nutrivision.meal_plans import build_plan, check_plan
+from nutrivision.resilience import CallPolicy
+
+
+def run(llm, mode, run_index, workers):
+    days_ready = []
+    start = time.perf_counter()
+    _, plan = build_plan(
+        llm, f"benchmark {mode} {run_index}", "peanuts", "rice, lentils, spinach",
+        on_day=lambda day, meals: days_ready.append(round((time.perf_counter() - start) * 1000, 1)),
+        parallel=mode == "parallel", workers=workers,
+    )
+    return {
+        "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+        "first_day_ms": days_ready[0],
+        "problems": len(check_plan(plan, "peanuts")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs parallel weekly meal-plan generation against a fake LLM")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=1500.0, help="fake generation time per call")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=5.0, help="LLM calls per second allowed for the pool")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of calls that fail and are retried")
+    parser.add_argument("--retries", type=int, default=3, help="retries per failed call")
+    args = parser.parse_args()
+
+    configure_database(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_meal_plan.sqlite3')}")
+    client = FaultInjectingClient(FakeCohereClient(latency_ms=args.latency_ms), args.failure_rate)
+    policy = CallPolicy("llm", rate=args.rate, retries=args.retries, base_delay=0.2)
+    llm = LLMGateway(client, policy=policy)
+
+    report = {}
+    for mode in ("sequential", "parallel"):
+        samples = [run(llm, mode, index, args.workers) for index in range(args.runs)]
+        report[mode] = {
+            "wall_ms": [sample["wall_ms"] for sample in samples],
+            "first_day_ms": [sample["first_day_ms"] for sample in samples],
+            "problems": sum(sample["problems"] for sample in samples),
+        }
+    report["model_calls"] = llm.calls
+    report["injected_failures"] = client.failures
+    report["policy"] = policy.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import json
+import time
+
+from benchmarks.common import latency_summary
+from nutrivision.fakes import FakeCohereClient, fake_build
+from nutrivision.llm_gateway import LLMGateway
+from nutrivision.recipe_flow import RecipeRun, stream_recipe
+
+
+def search(youtube, query):
+    response = youtube.search().list(part="snippet", q=query, type="video", maxResults=1).execute()
+    return f"https://www.youtube.com/watch?v={response['items'][0]['id']['videoId']}"
+
+
+# Function to run the original flow: recipe, then a second call for the name, then build + search
+def run_sequential(llm, build, ingredients):
+    timings = {}
+    start = time.perf_counter()
+    recipe = llm.generate(prompt=f"Generate a recipe with the following ingredients: {ingredients}", max_tokens=512, use_cache=False)
+    timings["generation_ms"] = (time.perf_counter() - start) * 1000
+    dish_name = llm.generate(prompt=f"Extract the name of the dish: {recipe}", max_tokens=50, use_cache=False)
+    timings["dish_name_ms"] = (time.perf_counter() - start) * 1000
+    search(build("youtube", "v3"), dish_name + " cooking")
+    timings["end_to_end_ms"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+# Function to run the new flow: one structured stream, video lookup overlapping it
+def run_concurrent(llm, youtube, ingredients):
+    run = RecipeRun()
+    recipe = "".join(stream_recipe(llm, ingredients, run, lambda query: search(youtube, query)))
+    if run.video_future:
+        run.video_future.result()
+    run.timings["end_to_end_ms"] = (time.perf_counter() - run.started_at) * 1000
+    return run.timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency of the recipe generator flow against local stubs")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--llm-ms", type=float, default=2000.0, help="fake recipe generation time")
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--build-ms", type=float, default=300.0, help="fake discovery build() time")
+    parser.add_argument("--search-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    def responder(prompt, **params):
+        if "Extract the name" in prompt:
+            return "Garlic Tomato Pasta"
+        return "Dish name: Garlic Tomato Pasta\n" + " ".join(f"step{i}" for i in range(200))
+
+    llm = LLMGateway(FakeCohereClient(latency_ms=args.llm_ms, first_token_ms=args.first_token_ms, responder=responder))
+    build = fake_build(args.build_ms, args.search_ms)
+    youtube = build("youtube", "v3")
+
+    report = {}
+    for mode in ("sequential", "concurrent"):
+        samples = {}
+        for index in range(args.requests):
+            ingredients = f"tomato, garlic, pasta #{index}"
+            timings = run_sequential(llm, build, ingredients) if mode == "sequential" else run_concurrent(llm, youtube, ingredients)
+            for stage, value in timings.items():
+                samples.setdefault(stage, []).append(value / 1000.0)
+        report[mode] = {stage: latency_summary(values) for stage, values in samples.items()}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary
+from nutrivision.fakes import FakeCohereClient, FaultInjectingClient
+from nutrivision.llm_gateway import LLMGateway
+from nutrivision.resilience import CallPolicy
+
+
+# Function to run `users` concurrent users against the gateway and count what they got back
+def run(llm, users, iterations, prompts, think_ms):
+    latencies = []
+    outcomes = {"ok": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def user_session(user):
+        for i in range(iterations):
+            start = time.perf_counter()
+            try:
+                llm.generate(prompt=f"Suggest a dinner, variant {(user * iterations + i) % prompts}", max_tokens=100)
+                outcome = "ok"
+            except Exception:
+                outcome = "errors"
+            with lock:
+                outcomes[outcome] += 1
+                latencies.append(time.perf_counter() - start)
+            time.sleep(think_ms / 1000.0)
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user_session, range(users)))
+    total = sum(outcomes.values())
+    return dict(latency_summary(latencies), **outcomes, success_rate=round(outcomes["ok"] / total, 3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway calls with and without a call policy against a fault-injecting fake LLM")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=40)
+    parser.add_argument("--prompts", type=int, default=20, help="distinct prompts, all cached once before the run")
+    parser.add_argument("--think-ms", type=float, default=200.0)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--failure-rate", type=float, default=0.15, help="fraction of calls failing with 429/503")
+    parser.add_argument("--timeout-rate", type=float, default=0.05, help="fraction of calls timing out after --slow-ms")
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--outage", type=float, nargs=2, default=(2.0, 5.0), metavar=("START_S", "END_S"),
+                        help="window after the first call in which every call fails")
+    parser.add_argument("--ttl", type=float, default=0.5, help="cache TTL, short so most calls go upstream")
+    parser.add_argument("--rate", type=float, default=50.0)
+    args = parser.parse_args()
+
+    report = {}
+    for mode in ("no_policy", "policy"):
+        policy = CallPolicy(
+            "llm", rate=args.rate, max_concurrent=args.users, retries=2, base_delay=0.1, max_delay=1.0,
+            deadline_seconds=3.0, failure_threshold=5, reset_timeout=1.0,
+        ) if mode == "policy" else None
+        llm = LLMGateway(FakeCohereClient(latency_ms=args.latency_ms), ttl=args.ttl, policy=policy)
+        for index in range(args.prompts):
+            llm.generate(prompt=f"Suggest a dinner, variant {index}", max_tokens=100)
+        # Faults start with the load, so the outage window lines up in both modes
+        llm.client = FaultInjectingClient(
+            llm.client, args.failure_rate, args.timeout_rate, args.slow_rate, args.slow_ms, tuple(args.outage),
+        )
+        report[mode] = run(llm, args.users, args.iterations, args.prompts, args.think_ms)
+        report[mode]["upstream_calls"] = llm.client.client.calls - args.prompts
+        report[mode]["injected_failures"] = llm.client.failures
+        report[mode]["stale_fallbacks"] = llm.stale_hits
+        if policy is not None:
+            report[mode]["policy"] = policy.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
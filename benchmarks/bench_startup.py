@@ -0,0 +1,82 @@
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import percentile
+
+# Modules that are slow to import; none of them should load before a page actually needs them
+HEAVY_MODULES = (
+    "cohere", "googleapiclient", "huggingface_hub", "transformers", "torch", "onnxruntime",
+    "sentence_transformers", "plotly", "pandas",
+)
+
+# Runs in a fresh interpreter: import the modules, then build the process-wide gateway
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+errors = {}
+for name in sys.argv[1:]:
+    try:
+        __import__(name)
+    except ImportError as e:
+        errors[name] = str(e)
+imported = time.perf_counter()
+from nutrivision.llm_gateway import get_gateway
+get_gateway()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "gateway_ms": (time.perf_counter() - imported) * 1000,
+    "heavy": [name for name in %r if name in sys.modules],
+    "errors": errors,
+}))
+""" % (HEAVY_MODULES,)
+
+
+# Function to list the nutrivision modules a page script imports at the top level
+def page_modules(path):
+    with open(path, encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("nutrivision"):
+            modules.append(node.module)
+        elif isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names if alias.name.startswith("nutrivision"))
+    return modules
+
+
+def probe(modules):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, *modules], capture_output=True, text=True, check=True,
+        env=dict(os.environ, NUTRIVISION_FAKE_LLM="1"),
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of each page's modules, in fresh interpreters")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = {}
+    for path in ["main.py"] + sorted(glob.glob("pages/*.py")):
+        modules = page_modules(path)
+        samples = [probe(modules) for _ in range(args.repeat)]
+        import_ms = [sample["import_ms"] for sample in samples]
+        report[path] = {
+            "modules": len(modules),
+            "import_p50_ms": round(percentile(import_ms, 50), 1),
+            "import_max_ms": round(max(import_ms), 1),
+            "gateway_ms": round(percentile([sample["gateway_ms"] for sample in samples], 50), 2),
+            "heavy_loaded": samples[0]["heavy"],
+            "import_errors": samples[0]["errors"],
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
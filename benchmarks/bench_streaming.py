@@ -0,0 +1,54 @@
+import argparse
+import json
+import time
+
+from benchmarks.common import latency_summary
+from nutrivision.fakes import FakeCohereClient
+from nutrivision.llm_gateway import LLMGateway
+
+
+# Function to measure time-to-first-token and total time for one prompt
+def measure(gateway, prompt, stream):
+    start = time.perf_counter()
+    if not stream:
+        gateway.generate(prompt, max_tokens=512, use_cache=False)
+        elapsed = time.perf_counter() - start
+        return elapsed, elapsed
+    first = None
+    for _ in gateway.generate_stream(prompt, max_tokens=512, use_cache=False):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-token of streamed vs blocking generation")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--first-token-ms", type=float, default=250.0)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    parser.add_argument("--tokens", type=int, default=300, help="words in each fake response")
+    args = parser.parse_args()
+
+    text = " ".join(f"word{i}" for i in range(args.tokens))
+    total_ms = args.first_token_ms + args.token_ms * args.tokens
+    client = FakeCohereClient(
+        latency_ms=total_ms,
+        first_token_ms=args.first_token_ms,
+        token_ms=args.token_ms,
+        responder=lambda prompt, **params: text,
+    )
+    gateway = LLMGateway(client)
+
+    report = {}
+    for mode in ("blocking", "streaming"):
+        first_samples, total_samples = [], []
+        for index in range(args.requests):
+            first, total = measure(gateway, f"prompt {index}", mode == "streaming")
+            first_samples.append(first)
+            total_samples.append(total)
+        report[mode] = {"time_to_first_token": latency_summary(first_samples), "total": latency_summary(total_samples)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import random
+import time
+
+
+# Function to build solid-colour food-sized test images without touching the network
+def synthetic_images(count, size=(640, 480), seed=0):
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+            x1, y1 = x0 + rng.randrange(20, 200), y0 + rng.randrange(20, 200)
+            draw.ellipse((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+        images.append(image)
+    return images
+
+
+# Function to compute a percentile from a list of samples
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def latency_summary(samples_seconds):
+    return {
+        "count": len(samples_seconds),
+        "p50_ms": round(percentile(samples_seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples_seconds, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples_seconds, 99) * 1000, 2),
+        "max_ms": round(max(samples_seconds, default=0.0) * 1000, 2),
+    }
+
+
+# Stand-in for a transformers image-classification pipeline with a fixed per-call
+# overhead plus a per-image cost, which is what makes batching pay off
+class FakeClassificationPipeline:
+    def __init__(self, labels, call_overhead_ms=30.0, per_image_ms=5.0):
+        self.labels = list(labels)
+        self.call_overhead = call_overhead_ms / 1000.0
+        self.per_image = per_image_ms / 1000.0
+
+    def _classify(self, image):
+        index = sum(image.resize((1, 1)).getpixel((0, 0))) % len(self.labels)
+        return [{"label": self.labels[index], "score": 0.9}]
+
+    def __call__(self, images, **kwargs):
+        single = not isinstance(images, list)
+        batch = [images] if single else images
+        time.sleep(self.call_overhead + self.per_image * len(batch))
+        results = [self._classify(image) for image in batch]
+        return results[0] if single else results
+
+
+# Function to build a registry loader returning fake pipelines
+def fake_loader(call_overhead_ms=30.0, per_image_ms=5.0):
+    def load(model_id):
+        labels = [f"{model_id.split('/')[-1]}-{i}" for i in range(10)]
+        return FakeClassificationPipeline(labels, call_overhead_ms, per_image_ms)
+    return load
+
+
+# Function to time repeated calls of function and summarize the latencies
+def measure(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
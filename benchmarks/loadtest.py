@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import fake_loader, latency_summary, synthetic_images
+from benchmarks.seed import seeded_database
+from nutrivision.conversation import ConversationEngine
+from nutrivision.favorites import add_favorite, delete_favorite, get_favorite_recipe, list_favorites, update_favorite
+from nutrivision.fakes import FakeCohereClient, FakeYouTubeClient
+from nutrivision.inference_scheduler import InferenceScheduler, classify_food
+from nutrivision.llm_gateway import LLMGateway
+from nutrivision.model_registry import MODEL_IDS, ModelRegistry, resident_memory_bytes
+from nutrivision.recipe_flow import RecipeRun, extract_dish_name, stream_recipe
+from nutrivision.recommendations import recommend_recipes
+from nutrivision.resilience import CallPolicy
+from nutrivision.youtube import VideoLookupCache, fetch_video
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "loadtest.json")
+
+
+# Function to answer like the model would: recipes open with a dish name line
+def responder(prompt, **params):
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    if prompt.startswith("Generate a recipe"):
+        return f"Dish name: Dish {digest}\n" + " ".join(f"step{i}" for i in range(120))
+    return FakeCohereClient.default_response(prompt, **params)
+
+
+class Environment:
+    # Everything the pages talk to, replaced by local stand-ins with configurable latency
+    def __init__(self, args, directory):
+        seeded_database(os.path.join(directory, "loadtest.sqlite3"), args.favorites, recipe_size=800)
+        # Calls go through call policies like the app's, with limits high enough not to shape the load
+        self.llm = LLMGateway(FakeCohereClient(
+            latency_ms=args.llm_ms, first_token_ms=args.llm_ms / 4, responder=responder,
+        ), policy=CallPolicy("llm", rate=10000, max_concurrent=256))
+        self.youtube = FakeYouTubeClient(latency_ms=args.youtube_ms)
+        self.youtube_policy = CallPolicy("youtube", rate=10000, max_concurrent=256)
+        self.videos = VideoLookupCache(os.path.join(directory, "youtube.sqlite3"), daily_quota=10 ** 9)
+        self.registry = ModelRegistry(MODEL_IDS, loader=fake_loader(args.model_ms, args.per_image_ms))
+        self.registry.preload(background=False)
+        self.scheduler = InferenceScheduler(self.registry, self.registry.model_ids)
+        self.images = synthetic_images(16)
+
+    def search_youtube_video(self, query):
+        return self.videos.lookup(query, lambda query, reserve: fetch_video(
+            self.youtube, query, self.youtube_policy, reserve=reserve,
+        ))
+
+    def close(self):
+        self.scheduler.shutdown()
+
+
+# Function to build one callable per page core function; each takes (user, iteration)
+def scenarios(env):
+    def generate_recipe(user, i):
+        run = RecipeRun()
+        recipe = "".join(stream_recipe(env.llm, f"tomato, basil, user {user} try {i}", run, env.search_youtube_video))
+        if run.video_future:
+            run.video_future.result()
+        return recipe
+
+    def get_dish_name(user, i):
+        return extract_dish_name(env.llm, f"Slow-cooked lentils for user {user}, attempt {i}.")
+
+    def search_youtube_video(user, i):
+        # Half the queries repeat earlier ones, like popular dishes do
+        return env.search_youtube_video(f"dish {user} {i // 2} cooking")
+
+    def recommend(user, i):
+        return recommend_recipes(env.llm, f"spicy quick vegetarian, user {user} visit {i}")
+
+    def analyze_nutrition(user, i):
+        return ConversationEngine(env.llm).refresh_analysis(force=True)
+
+    def classify_food_and_get_ingredients(user, i):
+        return classify_food(env.scheduler, env.images[(user + i) % len(env.images)])
+
+    def favorites_crud(user, i):
+        recipe_id = add_favorite(f"Load test {user}-{i}", "Mix rice with beans. " * 40).id
+        get_favorite_recipe(recipe_id)
+        update_favorite(recipe_id, f"Load test {user}-{i} (edited)", "Mix rice with black beans. " * 40)
+        list_favorites(limit=20)
+        delete_favorite(recipe_id)
+
+    return {
+        "generate_recipe": generate_recipe,
+        "get_dish_name": get_dish_name,
+        "search_youtube_video": search_youtube_video,
+        "recommend_recipes": recommend,
+        "analyze_nutrition": analyze_nutrition,
+        "classify_food_and_get_ingredients": classify_food_and_get_ingredients,
+        "favorites_crud": favorites_crud,
+    }
+
+
+# Function to run `users` simulated users, each calling fn `iterations` times with think time between.
+# Iterations are numbered from `first`, so repeated runs don't just replay each other's cache hits.
+def run_load(fn, users, iterations, think_ms=0.0, first=0):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def user_session(user):
+        for i in range(first, first + iterations):
+            start = time.perf_counter()
+            try:
+                fn(user, i)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+            with lock:
+                latencies.append(time.perf_counter() - start)
+            if think_ms:
+                time.sleep(think_ms / 1000.0)
+
+    rss_before = resident_memory_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user_session, range(users)))
+    elapsed = time.perf_counter() - start
+    return dict(
+        latency_summary(latencies),
+        errors=len(errors),
+        first_error=errors[0] if errors else None,
+        throughput_ops_s=round(len(latencies) / elapsed, 2),
+        rss_mb=round(resident_memory_bytes() / 2**20, 1),
+        rss_delta_mb=round((resident_memory_bytes() - rss_before) / 2**20, 1),
+    )
+
+
+# Function to combine repeated runs of a scenario into one result, taking the median of each
+# number so that one noisy run neither fails the comparison nor skews the baseline
+def median_result(runs):
+    result = {
+        key: round(statistics.median(run[key] for run in runs), 2)
+        for key, value in runs[0].items() if isinstance(value, (int, float))
+    }
+    result["first_error"] = next((run["first_error"] for run in runs if run["first_error"]), None)
+    result["repeats"] = len(runs)
+    return result
+
+
+# Function to list what got worse than the baseline by more than `tolerance` (a fraction)
+def compare(report, baseline, tolerance):
+    regressions = []
+    for name, result in report.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+        if result["throughput_ops_s"] < before["throughput_ops_s"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_ops_s']} -> {result['throughput_ops_s']} ops/s")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of every page's core functions against local stand-ins")
+    parser.add_argument("--scenarios", default="all", help="comma-separated scenario names")
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=10, help="calls per user")
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--favorites", type=int, default=500, help="favorites in the seeded database")
+    parser.add_argument("--llm-ms", type=float, default=200.0)
+    parser.add_argument("--youtube-ms", type=float, default=100.0)
+    parser.add_argument("--model-ms", type=float, default=30.0, help="fake classifier per-call overhead")
+    parser.add_argument("--per-image-ms", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario; medians are reported and compared")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression is reported")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="nutrivision-loadtest-")
+    env = Environment(args, directory)
+    selected = scenarios(env)
+    if args.scenarios != "all":
+        selected = {name: selected[name] for name in args.scenarios.split(",")}
+
+    report = {}
+    try:
+        for name, fn in selected.items():
+            # One warm-up call, so index builds and model loads aren't billed to the first user
+            fn(0, -1)
+            report[name] = median_result([
+                run_load(fn, args.users, args.iterations, args.think_ms, first=run * args.iterations)
+                for run in range(args.repeat)
+            ])
+            print(f"{name}: {report[name]}", file=sys.stderr)
+    finally:
+        env.close()
+    print(json.dumps(report, indent=2))
+
+    # Numbers are only comparable between runs with the same load and stand-in latencies
+    settings = {key: value for key, value in vars(args).items() if key not in ("scenarios", "baseline", "save_baseline", "tolerance")}
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as target:
+            json.dump({"settings": settings, "scenarios": report}, target, indent=2)
+            target.write("\n")
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as source:
+            baseline = json.load(source)
+        if baseline["settings"] != settings:
+            # Numbers from a different load say nothing about regressions
+            differences = ", ".join(
+                f"{key}={settings.get(key)!r} (baseline {baseline['settings'].get(key)!r})"
+                for key in sorted(set(settings) | set(baseline["settings"]))
+                if settings.get(key) != baseline["settings"].get(key)
+            )
+            print(f"settings mismatch, not compared with {args.baseline}: {differences}", file=sys.stderr)
+            sys.exit(2)
+        regressions = compare(report, baseline["scenarios"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import random
+
+from sqlalchemy import func, insert, select
+
+from nutrivision.context_builder import summary_columns
+from nutrivision.db import FavoriteRecipe, configure_database
+
+INGREDIENTS = (
+    "garlic onion tomato basil pasta beef lentil chickpea spinach carrot potato ginger lemon yogurt "
+    "cumin paprika salmon tofu mushroom pepper chicken rice butter cream cheese egg flour sugar honey "
+    "oats apple banana berry walnut almond cinnamon nutmeg coriander parsley dill mint thyme rosemary "
+    "oregano chili lime coconut avocado corn bean pea zucchini eggplant cabbage kale broccoli cauliflower "
+    "shrimp cod tuna pork lamb turkey bacon sausage noodle quinoa barley couscous bread tortilla "
+    "vinegar mustard mayonnaise soy sesame peanut olive raisin date fig pear peach plum mango pineapple"
+).split()
+# Extra synthetic ingredients so the vocabulary has a realistic long tail
+INGREDIENTS += [f"spice{index}" for index in range(300)]
+STEPS = (
+    "Chop the {a}. Heat oil and add the {a} with the {b}. Stir for five minutes. "
+    "Season the {b} and simmer with the {c}. Serve the {c} warm.",
+    "Mix the {a} and {b} in a bowl. Bake with the {c} for twenty minutes.",
+    "Boil the {a}. Fry the {b} until golden and fold in the {c}.",
+)
+# Zipf-like popularity: a few ingredients are in many recipes, most are rare
+_WEIGHTS = [1.0 / (rank + 1) for rank in range(len(INGREDIENTS))]
+WORDS = INGREDIENTS[:24]
+
+
+# Function to make a recipe-like block of text of roughly the given size
+def fake_recipe(rng, size=1500):
+    ingredients = rng.choices(INGREDIENTS, weights=_WEIGHTS, k=rng.randint(6, 12))
+    parts = ["Ingredients: " + ", ".join(ingredients) + "."]
+    length = len(parts[0])
+    while length < size:
+        step = rng.choice(STEPS).format(a=rng.choice(ingredients), b=rng.choice(ingredients), c=rng.choice(ingredients))
+        parts.append(step)
+        length += len(step) + 1
+    return " ".join(parts)
+
+
+# Function to open (and if needed seed) a SQLite database with `count` favorite recipes
+def seeded_database(path, count, recipe_size=1500, seed=0, batch_size=5000):
+    database = configure_database(f"sqlite:///{os.path.abspath(path)}")
+    with database.engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(FavoriteRecipe)).scalar()
+    if existing >= count:
+        return database
+    rng = random.Random(seed)
+    with database.engine.begin() as conn:
+        for start in range(existing, count, batch_size):
+            rows = []
+            for index in range(start, min(start + batch_size, count)):
+                name = f"{rng.choice(WORDS).title()} with {rng.choice(INGREDIENTS)} #{index}"
+                recipe = fake_recipe(rng, recipe_size)
+                # Summaries are stored as the app would store them when a favorite is saved
+                rows.append({"name": name, "recipe": recipe, **summary_columns(name, recipe)})
+            conn.execute(insert(FavoriteRecipe), rows)
+    return database
+
+
+# Function to make `count` synthetic meal log rows spread over `days` days before `end`,
+# three to five meals a day with noisy macros
+def synthetic_meal_logs(count, end, days=3 * 365, seed=0):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    offsets = rng.integers(0, days * 86400, size=count)
+    calories = rng.gamma(6.0, 90.0, size=count)
+    return pd.DataFrame({
+        "logged_at": pd.Timestamp(end) - pd.to_timedelta(offsets, unit="s"),
+        "calories": calories.round(1),
+        "protein": (calories * rng.uniform(0.03, 0.08, size=count)).round(1),
+        "fat": (calories * rng.uniform(0.02, 0.05, size=count)).round(1),
+        "carbs": (calories * rng.uniform(0.08, 0.15, size=count)).round(1),
+    })
+
+
+# Function to open (and if needed seed) a SQLite database with `count` meal logs, rollups included
+def seeded_intake(path, count, end, chunk_size=200_000, seed=0):
+    from nutrivision.db import MealLog
+    from nutrivision.intake import log_meals
+
+    database = configure_database(f"sqlite:///{os.path.abspath(path)}")
+    with database.engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(MealLog)).scalar()
+    for start in range(existing, count, chunk_size):
+        log_meals(synthetic_meal_logs(min(chunk_size, count - start), end, seed=seed + start))
+    return database
@@ -1,71 +1,36 @@
+# Imported first so startup profiles measure from server start (NUTRIVISION_PROFILE_STARTUP=1)
+from nutrivision.startup import profile_page
+
+profile = profile_page("Home")
+
+import os
 import streamlit as st
-from PIL import Image
+from dotenv import load_dotenv
+from nutrivision.model_registry import preload_if_enabled
+from nutrivision.db import get_database
+from nutrivision.assets import inject_theme, show_logo
+
+profile.imports_done()
 
 # Set page configuration
 st.set_page_config(page_title="NutriVision", page_icon="🍽️", layout="wide")
 
-# Load logo
-logo = Image.open("pages/logo.png")
+# Load environment variables
+load_dotenv()
 
-# Custom CSS to style the page
-st.markdown(
-    """
-    <style>
-    .main-title {
-        font-size: 4em;
-        text-align: center;
-        color: #4CAF50;
-        font-weight: bold;
-        margin-top: -100px;
-    }
-    .sub-title {
-        font-size: 2em;
-        text-align: center;
-        color: #4CAF50;
-        margin-bottom: 20px;
-        font-weight: bold;
-    }
-    .info-box {
-        background-color: #333;
-        padding: 30px;
-        border-radius: 10px;
-        color: #fff;
-    }
-    .feature-list {
-        font-size: 1.5rem;
-        line-height: 2;
-    }
-    .logo-title-container {
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-    .logo {
-        width: 150px;
-        margin-right: 20px;
-        margin-bottom: 0px;
-    }
-    .page-title {
-        font-size: 1.2em;
-        text-align: center;
-        color: #4CAF50;
-        margin-top: 20px;
-        font-weight: bold;
-    }
-    .feature-img {
-        display: block;
-        margin-left: auto;
-        margin-right: auto;
-        width: 50%;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# Start loading the classification models in the background (NUTRIVISION_PRELOAD_MODELS=1)
+preload_if_enabled()
+
+# Create the pooled engine and apply schema migrations once per server process
+if os.getenv("DATABASE_URL"):
+    get_database()
+
+# Shared theme stylesheet, minified once per process (pages/theme.css)
+inject_theme()
 
 # Page Title with Logo
 st.markdown('<div class="logo-title-container">', unsafe_allow_html=True)
-st.image(logo, width=150)
+show_logo()
 st.markdown(
     """
     <div>
@@ -96,3 +61,5 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
+
+profile.finish()
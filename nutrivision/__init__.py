@@ -0,0 +1,4 @@
+# Shared building blocks for the NutriVision Streamlit pages.
+#
+# Modules in this package are imported once per server process, so anything
+# created at module level here is shared across every browser session.
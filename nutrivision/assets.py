@@ -0,0 +1,123 @@
+import io
+import os
+import re
+import threading
+import time
+
+from nutrivision.timing import elapsed_ms
+
+LOGO_PATH = "pages/logo.png"
+THEME_PATH = "pages/theme.css"
+LOGO_WIDTH = 150
+
+
+class Asset:
+    # A prepared asset: the bytes sent to the browser and what the source file weighed
+    def __init__(self, data, source_bytes, build_ms):
+        self.data = data
+        self.source_bytes = source_bytes
+        self.build_ms = build_ms
+
+
+_assets = {}
+_assets_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"builds": 0, "renders": 0, "render_ms": 0.0}
+
+
+def _count(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+# Function to get an asset built once per process by build(path); a changed file is rebuilt
+def _cached(kind, path, build):
+    key = (kind, path, os.path.getmtime(path))
+    asset = _assets.get(key)
+    if asset is None:
+        with _assets_lock:
+            asset = _assets.get(key)
+            if asset is None:
+                start = time.perf_counter()
+                data = build(path)
+                asset = Asset(data, os.path.getsize(path), elapsed_ms(start))
+                # Older versions of the same file are dropped
+                for old in [old for old in _assets if old[:2] == key[:2]]:
+                    del _assets[old]
+                _assets[key] = asset
+                _count("builds")
+    return asset
+
+
+# Function to decode an image and encode a PNG thumbnail exactly `width` pixels wide,
+# so Streamlit has nothing left to resize or re-encode. A flat logo loses nothing visible
+# in a 256-colour palette and the PNG shrinks to about a quarter.
+def encode_thumbnail(path, width, colors=256):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        height = max(1, round(image.height * width / image.width))
+        thumbnail = image.resize((width, height), Image.LANCZOS)
+    if colors:
+        thumbnail = thumbnail.quantize(colors, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+# Function to strip comments and insignificant whitespace from a stylesheet
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def _theme_block(path):
+    with open(path, encoding="utf-8") as source:
+        return f"<style>{minify_css(source.read())}</style>"
+
+
+# Function to get the pre-encoded logo thumbnail
+def logo_thumbnail(width=LOGO_WIDTH, path=LOGO_PATH):
+    return _cached(f"logo-{width}", path, lambda path: encode_thumbnail(path, width))
+
+
+# Function to get the minified theme stylesheet as a <style> block
+def theme_css(path=THEME_PATH):
+    return _cached("theme", path, _theme_block)
+
+
+# Function to draw the logo from the shared thumbnail. The bytes are identical on every
+# rerun, so Streamlit serves them under the same media URL and the browser keeps its copy.
+def show_logo(area=None, width=LOGO_WIDTH):
+    import streamlit as st
+
+    start = time.perf_counter()
+    (area or st).image(logo_thumbnail(width).data, width=width)
+    _count("renders")
+    _count("render_ms", elapsed_ms(start))
+
+
+# Function to add the shared theme stylesheet to the page
+def inject_theme(area=None):
+    import streamlit as st
+
+    (area or st).markdown(theme_css().data, unsafe_allow_html=True)
+
+
+# Function to get build counts, render time and the bytes each asset saves per rerun
+def asset_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_render_ms"] = round(stats.pop("render_ms") / max(stats["renders"], 1), 3)
+    stats["assets"] = [
+        {
+            "asset": kind,
+            "sent_bytes": len(asset.data),
+            "source_bytes": asset.source_bytes,
+            "build_ms": asset.build_ms,
+        }
+        for (kind, _, _), asset in list(_assets.items())
+    ]
+    return stats
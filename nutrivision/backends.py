@@ -0,0 +1,150 @@
+import importlib.util
+import os
+
+from nutrivision.model_registry import load_pipeline, top_k_labels
+from nutrivision.preprocessing import processor_target_size
+
+# Inference backends for the image classification models
+#   eager - fp32 PyTorch, as shipped by transformers
+#   int8  - PyTorch with nn.Linear layers dynamically quantized to int8
+#   onnx  - the model exported to ONNX and run by ONNX Runtime on CPU
+BACKENDS = ("eager", "int8", "onnx")
+
+DEFAULT_ONNX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nutrivision", "onnx")
+
+
+# Function to get the backend name configured for this server
+def selected_backend():
+    backend = os.getenv("NUTRIVISION_BACKEND", "eager").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown NUTRIVISION_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend == "onnx":
+        require_onnxruntime()
+    return backend
+
+
+# Function to fail early, before any model is exported, when the optional onnxruntime
+# package (not in requirements.txt) is missing
+def require_onnxruntime():
+    if importlib.util.find_spec("onnxruntime") is None:
+        raise ValueError("The onnx backend needs the optional onnxruntime package: pip install onnxruntime")
+
+
+# Function to load a model as a dynamically int8-quantized PyTorch pipeline
+def load_int8_pipeline(model_id):
+    import torch
+    from transformers import pipeline, AutoImageProcessor, AutoModelForImageClassification
+
+    processor = AutoImageProcessor.from_pretrained(model_id)
+    model = AutoModelForImageClassification.from_pretrained(model_id)
+    model.eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("image-classification", model=quantized, image_processor=processor)
+
+
+# Function to export a transformers image classifier to ONNX with a dynamic batch axis
+def export_onnx(model, processor, path):
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, pixel_values):
+            return self.inner(pixel_values=pixel_values).logits
+
+    width, height = processor_target_size(processor)
+    dummy = torch.zeros(1, 3, height, width)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    torch.onnx.export(
+        LogitsOnly(model).eval(),
+        (dummy,),
+        tmp_path,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=14,
+    )
+    os.replace(tmp_path, path)
+
+
+class _Output:
+    def __init__(self, logits):
+        self.logits = logits
+
+
+class OnnxImageClassifier:
+    # Callable like a transformers model: model(pixel_values=...).logits
+    def __init__(self, path, config, intra_op_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = int(intra_op_threads)
+        self.path = path
+        self.config = config
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, pixel_values):
+        import torch
+
+        # .numpy() shares the tensor's buffer, so nothing is copied on the way in
+        array = pixel_values.numpy() if hasattr(pixel_values, "numpy") else pixel_values
+        logits = self.session.run(["logits"], {"pixel_values": array})[0]
+        return _Output(torch.from_numpy(logits))
+
+
+class OnnxPipeline:
+    # Minimal stand-in for the transformers pipeline around an ONNX session
+    def __init__(self, model, image_processor):
+        self.model = model
+        self.image_processor = image_processor
+
+    def __call__(self, images, top_k=5, **kwargs):
+        single = not isinstance(images, list)
+        pixel_values = self.image_processor([images] if single else images, return_tensors="pt")["pixel_values"]
+        results = top_k_labels(self.model(pixel_values=pixel_values).logits, self.model.config.id2label, top_k)
+        return results[0] if single else results
+
+
+# Function to load a model as an ONNX Runtime session, exporting it on first use
+def load_onnx_pipeline(model_id, intra_op_threads=None, onnx_dir=DEFAULT_ONNX_DIR):
+    require_onnxruntime()
+    from transformers import AutoConfig, AutoImageProcessor
+
+    processor = AutoImageProcessor.from_pretrained(model_id)
+    config = AutoConfig.from_pretrained(model_id)
+    path = os.path.join(onnx_dir, model_id.replace("/", "__") + ".onnx")
+    if not os.path.exists(path):
+        from transformers import AutoModelForImageClassification
+
+        model = AutoModelForImageClassification.from_pretrained(model_id)
+        model.eval()
+        export_onnx(model, processor, path)
+        # The eager weights are only needed for the export
+        del model
+    return OnnxPipeline(OnnxImageClassifier(path, config, intra_op_threads), processor)
+
+
+# Function to build a ModelRegistry loader for the given backend
+def make_loader(backend, intra_op_threads=None, onnx_dir=DEFAULT_ONNX_DIR):
+    if backend == "eager":
+        return load_pipeline
+    if backend == "int8":
+        return load_int8_pipeline
+    if backend == "onnx":
+        return lambda model_id: load_onnx_pipeline(model_id, intra_op_threads, onnx_dir)
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+
+# Function to build the loader configured through environment variables
+def loader_from_env():
+    threads = os.getenv("NUTRIVISION_ONNX_THREADS")
+    return make_loader(
+        selected_backend(),
+        intra_op_threads=int(threads) if threads else None,
+        onnx_dir=os.getenv("NUTRIVISION_ONNX_DIR") or DEFAULT_ONNX_DIR,
+    )
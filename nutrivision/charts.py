@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from nutrivision.intake import DEFAULT_USER, MACROS, daily_totals, intake_version, meal_logs_frame, rolling_averages
+from nutrivision.llm_gateway import MemoryCacheBackend
+from nutrivision.metrics import get_metrics
+from nutrivision.timing import elapsed_ms
+
+# Points per trace; more than a chart is wide in pixels only adds payload
+DEFAULT_MAX_POINTS = int(os.getenv("NUTRIVISION_CHART_POINTS", "800"))
+
+
+# Function to pick at most `threshold` points that keep the visual shape of a series
+# (Largest-Triangle-Three-Buckets). x must be numeric and increasing.
+def lttb(x, y, threshold):
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    # Bucket edges for the points between the first and the last
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # The next bucket's average is the third corner of the triangle
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+# Function to keep the minimum and maximum of each of `buckets` equal-width slices, so peaks survive
+def minmax_buckets(y, buckets):
+    size = len(y)
+    if size <= 2 * buckets:
+        return np.arange(size)
+    edges = np.linspace(0, size, buckets + 1).astype(np.int64)
+    keep = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop > start:
+            window = y[start:stop]
+            keep.extend((start + int(np.argmin(window)), start + int(np.argmax(window))))
+    return np.unique(keep)
+
+
+# Function to downsample one series to at most max_points with LTTB or min/max bucketing
+def downsample(x, y, max_points, method="lttb"):
+    x_numeric = x.astype("datetime64[ns]").astype(np.int64).astype(np.float64) if x.dtype.kind == "M" else x
+    y = np.asarray(y, dtype=np.float64)
+    if method == "minmax":
+        return minmax_buckets(y, max_points // 2)
+    return lttb(x_numeric, y, max_points)
+
+
+class ChartResult:
+    def __init__(self, figure, points, raw_points, payload_bytes, build_ms, cached=False):
+        self.figure = figure
+        self.points = points
+        self.raw_points = raw_points
+        self.payload_bytes = payload_bytes
+        self.build_ms = build_ms
+        self.cached = cached
+
+    def report(self):
+        return {
+            "cached": self.cached,
+            "points_sent": self.points,
+            "raw_points": self.raw_points,
+            "payload_kb": round(self.payload_bytes / 1024, 1),
+            "build_ms": self.build_ms,
+        }
+
+
+def _figure(series, title, labels, max_points, method):
+    import plotly.graph_objects as go
+
+    figure = go.Figure()
+    points = 0
+    for metric, frame in series.items():
+        x, y = frame.index.values, frame.values
+        keep = downsample(x, y, max_points, method)
+        points += len(keep)
+        figure.add_trace(go.Scatter(x=x[keep], y=y[keep], mode="lines", name=labels.get(metric, metric)))
+    figure.update_layout(title=title, xaxis_title="Day", yaxis_title="Amount", legend_title="Metric")
+    return figure, points
+
+
+class ChartCache:
+    # Built figures keyed by (user, range, metrics, granularity, resolution) and the user's intake
+    # version, so logging or deleting a meal makes the next request rebuild.
+    def __init__(self, max_entries=64, max_points=DEFAULT_MAX_POINTS):
+        self.cache = MemoryCacheBackend(max_entries)
+        self.max_points = max_points
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, *parts):
+        return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        get_metrics().increment("cache_requests", cache="chart", result="hit" if counter == "hits" else "miss")
+
+    # Function to get the chart of daily totals, their 7-day rolling average or individual meals
+    # for a range. granularity is "daily", "rolling7" or "meal"; labels maps metric -> display name.
+    def chart(self, start, end, metrics, granularity="daily", user_id=DEFAULT_USER, labels=None,
+              title=None, max_points=None):
+        max_points = max_points or self.max_points
+        metrics = [metric for metric in MACROS if metric in metrics]
+        key = self._key(user_id, start, end, metrics, granularity, max_points, intake_version(user_id))
+        result = self.cache.get(key)
+        if result is not None:
+            self._count("hits")
+            return ChartResult(result.figure, result.points, result.raw_points, result.payload_bytes,
+                               result.build_ms, cached=True)
+        self._count("misses")
+
+        begin = time.perf_counter()
+        if granularity == "meal":
+            meals = meal_logs_frame(start, end, user_id).set_index("logged_at")
+            series = {metric: meals[metric] for metric in metrics}
+            # LTTB keeps the shape of dense, noisy per-meal data
+            method = "lttb"
+        else:
+            daily = daily_totals(start, end, user_id)
+            if granularity == "rolling7":
+                daily = rolling_averages(daily, 7)
+            series = {metric: daily[metric] for metric in metrics}
+            # Min/max keeps the highest and lowest days visible in long ranges
+            method = "minmax"
+        raw_points = sum(len(frame) for frame in series.values())
+        with get_metrics().span("chart.build", granularity=granularity):
+            figure, points = _figure(series, title or "", labels or {}, max_points, method)
+            payload_bytes = len(figure.to_json())
+        result = ChartResult(figure, points, raw_points, payload_bytes, elapsed_ms(begin))
+        self.cache.set(key, result)
+        return result
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.cache)}
+
+
+_chart_cache = None
+_chart_cache_lock = threading.Lock()
+
+
+# Function to get the process-wide chart cache
+def get_chart_cache():
+    global _chart_cache
+    if _chart_cache is None:
+        with _chart_cache_lock:
+            if _chart_cache is None:
+                _chart_cache = ChartCache()
+    return _chart_cache
@@ -0,0 +1,120 @@
+import os
+import re
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Token budget for the favorites part of a prompt
+DEFAULT_BUDGET_TOKENS = int(os.getenv("NUTRIVISION_CONTEXT_TOKENS", "2000"))
+
+# Target size of a stored per-recipe summary
+SUMMARY_TOKENS = 60
+
+
+# Function to estimate the number of model tokens in a text.
+# Subword tokenizers split long and non-English words, so words count a bit more than one.
+def count_tokens(text):
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _TOKEN_RE.findall(text):
+        tokens += 1 + len(piece) // 8 if not piece.isascii() else 1 + len(piece) // 12
+    return tokens
+
+
+# Function to cut a text down to at most max_tokens, on a word boundary
+def truncate_to_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) + 1 <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + "…"
+
+
+# Function to build the short extractive summary stored next to each recipe
+def summarize_recipe(name, recipe, max_tokens=SUMMARY_TOKENS):
+    lines = [line.strip(" -*#\t") for line in (recipe or "").splitlines() if line.strip()]
+    # Ingredient lists carry most of the nutritional signal, so keep them first
+    ingredient_lines = [line for line in lines if "ingredient" in line.lower()]
+    body = " ".join(ingredient_lines + [line for line in lines if line not in ingredient_lines])
+    return truncate_to_tokens(f"{name}: {body}", max_tokens)
+
+
+# Function to make the summary columns saved with a recipe: the summary and its token count,
+# so prompts can be packed without re-tokenizing anything
+def summary_columns(name, recipe):
+    summary = summarize_recipe(name, recipe)
+    return {"summary": summary, "summary_tokens": count_tokens(summary)}
+
+
+_SUMMARY_LABEL = "Recipe summary:"
+_SUMMARY_LABEL_TOKENS = count_tokens(_SUMMARY_LABEL)
+
+
+# Function to get the favorites bodies for some ids as {id: recipe}
+def _load_recipes(recipe_ids):
+    from nutrivision.favorites import get_favorite_recipes
+    return get_favorite_recipes(recipe_ids)
+
+
+class Context:
+    def __init__(self, text, tokens, budget, included, summarized, dropped):
+        self.text = text
+        self.tokens = tokens
+        self.budget = budget
+        self.included = included
+        self.summarized = summarized
+        self.dropped = dropped
+
+    def report(self):
+        return {
+            "context_tokens": self.tokens,
+            "budget": self.budget,
+            "full_recipes": self.included,
+            "summarized_recipes": self.summarized,
+            "dropped_recipes": self.dropped,
+        }
+
+
+class ContextBuilder:
+    def __init__(self, budget_tokens=DEFAULT_BUDGET_TOKENS, load_recipes=None):
+        self.budget = budget_tokens
+        self.load_recipes = load_recipes or _load_recipes
+
+    # Function to build the favorites section of a prompt within the token budget.
+    # favorites come most relevant first, with .id, .summary and .summary_tokens (see
+    # favorites.context_candidates); their stored summaries go in until the budget is full,
+    # then what is left upgrades the most relevant of those to their full text.
+    # total is how many favorites there are in all, for the dropped count.
+    def build(self, favorites, total=None):
+        entries = []
+        used = 0
+        for item in favorites:
+            summary = item.summary or item.name
+            tokens = item.summary_tokens if item.summary and item.summary_tokens is not None else count_tokens(summary)
+            tokens += _SUMMARY_LABEL_TOKENS
+            if used + tokens > self.budget:
+                break
+            entries.append([item, f"{_SUMMARY_LABEL} {summary}", tokens])
+            used += tokens
+
+        # Only the bodies of recipes that made it in are loaded
+        recipes = self.load_recipes([slot[0].id for slot in entries]) if entries else {}
+        for slot in entries:
+            recipe = recipes.get(slot[0].id)
+            if not recipe:
+                continue
+            entry = f"Recipe: {recipe}"
+            tokens = count_tokens(entry)
+            if used - slot[2] + tokens <= self.budget:
+                used += tokens - slot[2]
+                slot[1], slot[2] = entry, tokens
+        included = sum(1 for slot in entries if slot[1].startswith("Recipe: "))
+        text = "\n".join(slot[1] for slot in entries)
+        total = len(favorites) if total is None else total
+        return Context(text, used, self.budget, included, len(entries) - included, max(total - len(entries), 0))
@@ -0,0 +1,163 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nutrivision.context_builder import ContextBuilder, count_tokens, truncate_to_tokens
+from nutrivision.favorites import context_candidates, favorites_version
+from nutrivision.timing import elapsed_ms
+
+ANALYSIS_PROMPT = """
+    You are a personal nutritionist. Analyze the following favorite recipes and provide detailed nutritional advice.
+
+    Favorite Recipes:
+    {favorites}
+
+    Nutritional Advice:
+    """
+
+FOLLOW_UP_PROMPT = """
+    You are a personal nutritionist continuing a chat about the user's favorite recipes.
+
+    Your analysis of their favorites:
+    {analysis}
+
+    Earlier in the conversation:
+    {summary}
+
+    Recent turns:
+    {recent}
+
+    User's Question: {question}
+
+    Nutritionist:
+    """
+
+SUMMARY_PROMPT = """
+    Update the running summary of a nutrition chat with the turns below. Keep the user's goals,
+    constraints and any advice already given; drop small talk. Answer with the summary only.
+
+    Current summary:
+    {summary}
+
+    New turns:
+    {turns}
+
+    Updated summary:
+    """
+
+
+# Shared by all chats for folding old turns into the summary after an answer is shown
+_summary_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chat-summary")
+
+
+def _format_turns(turns):
+    return "\n".join(f"User: {question}\nNutritionist: {answer}" for question, answer in turns) or "(none)"
+
+
+class ConversationEngine:
+    # Chat state for the nutritionist page. The favorites analysis is made once per chat and
+    # redone only when favorites change; follow-up prompts carry that analysis, a running
+    # summary of older turns and the last `window` turns, so their size stays flat.
+    # The summary is updated in the background after each answer, not while the user waits.
+    def __init__(self, llm, context_builder=None, window=3, analysis_tokens=600, summary_tokens=250,
+                 max_tokens=500, temperature=0.7):
+        self.llm = llm
+        self.context_builder = context_builder or ContextBuilder()
+        self.window = window
+        self.analysis_tokens = analysis_tokens
+        self.summary_tokens = summary_tokens
+        self.params = dict(max_tokens=max_tokens, temperature=temperature)
+        self.analysis = None
+        self.analysis_version = None
+        self.turns = []
+        self.summary = ""
+        self._summarized = 0
+        self._summary_future = None
+        self.messages = []
+        self.metrics = []
+
+    def _generate(self, prompt, render):
+        if render is None:
+            return self.llm.generate(prompt=prompt, **self.params)
+        return render(self.llm.generate_stream(prompt=prompt, **self.params))
+
+    # Function to (re)make the favorites analysis if favorites changed since it was made.
+    # Returns None when it is still current, otherwise the new analysis text.
+    def refresh_analysis(self, render=None, force=False):
+        version = favorites_version()
+        if not force and self.analysis is not None and version == self.analysis_version:
+            return None
+        start = time.perf_counter()
+        # Only ids, summaries and their token counts, and only as many as the budget can hold
+        favorites = context_candidates(max_tokens=self.context_builder.budget)
+        if not favorites:
+            self.analysis, self.analysis_version = None, version
+            return None
+        total = version[1]
+        context = self.context_builder.build(favorites, total)
+        prompt = ANALYSIS_PROMPT.format(favorites=context.text)
+        self.analysis = self._generate(prompt, render)
+        self.analysis_version = version
+        self.messages.append((self.analysis, "Nutritionist"))
+        self.metrics.append({
+            "turn": len(self.turns),
+            "kind": "analysis",
+            "prompt_tokens": count_tokens(prompt),
+            "latency_ms": elapsed_ms(start),
+            "favorites": total,
+        })
+        return self.analysis
+
+    # Function to answer a follow-up question; returns the answer text.
+    # Call refresh_analysis() first if favorites may have changed; ask() doesn't re-check them.
+    def ask(self, question, render=None):
+        start = time.perf_counter()
+        # Usually done long ago: the previous fold ran while the user was reading and typing
+        self._wait_for_summary()
+        prompt = FOLLOW_UP_PROMPT.format(
+            analysis=truncate_to_tokens(self.analysis or "(no favorites yet)", self.analysis_tokens),
+            summary=self.summary or "(nothing yet)",
+            recent=_format_turns(self.turns[-self.window:]),
+            question=question,
+        )
+        answer = self._generate(prompt, render)
+        latency = elapsed_ms(start)
+        self.turns.append((question, answer))
+        self.messages.append((question, "You"))
+        self.messages.append((answer, "Nutritionist"))
+        metrics = {
+            "turn": len(self.turns),
+            "kind": "follow-up",
+            "prompt_tokens": count_tokens(prompt),
+            "latency_ms": latency,
+        }
+        self.metrics.append(metrics)
+        if len(self.turns) - self.window > self._summarized:
+            self._summary_future = _summary_executor.submit(
+                contextvars.copy_context().run, self._fold_old_turns, metrics,
+            )
+        return answer
+
+    def _wait_for_summary(self):
+        future, self._summary_future = self._summary_future, None
+        if future is None:
+            return
+        try:
+            future.result()
+        except Exception:
+            # The unfolded turns stay pending and are folded after the next answer
+            pass
+
+    # Function to fold turns that left the window into the running summary
+    def _fold_old_turns(self, metrics):
+        start = time.perf_counter()
+        folded = len(self.turns) - self.window
+        # Each turn is summarized once, as it drops out of the window
+        turns = self.turns[self._summarized:folded]
+        prompt = SUMMARY_PROMPT.format(summary=self.summary or "(empty)", turns=_format_turns(turns))
+        self.summary = truncate_to_tokens(
+            self.llm.generate(prompt=prompt, max_tokens=self.summary_tokens, temperature=0.3),
+            self.summary_tokens,
+        )
+        self._summarized = folded
+        metrics["summary_ms"] = elapsed_ms(start)
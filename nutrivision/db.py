@@ -0,0 +1,295 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import (
+    Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text, UniqueConstraint,
+    create_engine, event, inspect, text,
+)
+from sqlalchemy.orm import declarative_base, deferred, sessionmaker
+
+from nutrivision.metrics import instrument_engine, span
+
+Base = declarative_base()
+
+
+# Define the FavoriteRecipe model
+class FavoriteRecipe(Base):
+    __tablename__ = 'favorite_recipes'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    recipe = Column(Text, nullable=False)
+    # Short extractive summary used when prompts can't fit the full recipe
+    summary = Column(Text)
+    # count_tokens(summary), so prompts are packed without re-tokenizing every summary
+    summary_tokens = Column(Integer)
+    # float32 embedding of name + recipe, and the embedder that produced it;
+    # deferred so loading favorites doesn't pull the vectors along
+    embedding = deferred(Column(LargeBinary))
+    embedding_model = Column(String)
+
+
+# Macro columns shared by meal logs, daily rollups and planned meals
+MACROS = ("calories", "protein", "fat", "carbs")
+
+
+# One logged meal with its macros; logged_at is naive UTC
+class MealLog(Base):
+    __tablename__ = 'meal_logs'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, nullable=False, default="default")
+    logged_at = Column(DateTime, nullable=False)
+    calories = Column(Float, nullable=False, default=0.0)
+    protein = Column(Float, nullable=False, default=0.0)
+    fat = Column(Float, nullable=False, default=0.0)
+    carbs = Column(Float, nullable=False, default=0.0)
+    favorite_id = Column(Integer, ForeignKey('favorite_recipes.id', ondelete="SET NULL"))
+    meal_plan_id = Column(Integer)
+    note = Column(String)
+    __table_args__ = (Index("meal_logs_user_time_idx", "user_id", "logged_at"),)
+
+
+# Per-user, per-day totals of meal_logs, kept up to date on every insert and delete
+class DailyIntake(Base):
+    __tablename__ = 'daily_intake'
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    calories = Column(Float, nullable=False, default=0.0)
+    protein = Column(Float, nullable=False, default=0.0)
+    fat = Column(Float, nullable=False, default=0.0)
+    carbs = Column(Float, nullable=False, default=0.0)
+    entries = Column(Integer, nullable=False, default=0)
+
+
+# A weekly meal plan; inputs_key identifies the preferences/allergies/ingredients it was made for
+class MealPlan(Base):
+    __tablename__ = 'meal_plans'
+    id = Column(Integer, primary_key=True)
+    inputs_key = Column(String(64), nullable=False, unique=True)
+    preferences = Column(Text, nullable=False, default="")
+    allergies = Column(Text, nullable=False, default="")
+    ingredients = Column(Text, nullable=False, default="")
+    created_at = Column(DateTime, nullable=False)
+
+
+# One meal of a plan; ingredients is a JSON list of strings
+class PlannedMeal(Base):
+    __tablename__ = 'planned_meals'
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, ForeignKey('meal_plans.id', ondelete="CASCADE"), nullable=False)
+    day = Column(Integer, nullable=False)
+    meal = Column(String, nullable=False)
+    recipe = Column(String, nullable=False)
+    ingredients = Column(Text, nullable=False, default="[]")
+    calories = Column(Float, nullable=False, default=0.0)
+    protein = Column(Float, nullable=False, default=0.0)
+    fat = Column(Float, nullable=False, default=0.0)
+    carbs = Column(Float, nullable=False, default=0.0)
+    generated_at = Column(DateTime, nullable=False)
+    __table_args__ = (UniqueConstraint("plan_id", "day", "meal", name="planned_meals_slot_uq"),)
+
+
+class ImportJob(Base):
+    # How far a resumable favorites import got, written in the same transaction as each batch
+    __tablename__ = 'import_jobs'
+    job = Column(String, primary_key=True)
+    records_done = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+
+
+def _create_search_index(conn):
+    from nutrivision.search import create_search_index
+    create_search_index(conn)
+
+
+def _add_recipe_summaries(conn):
+    from nutrivision.context_builder import summarize_recipe
+    columns = {column["name"] for column in inspect(conn).get_columns("favorite_recipes")}
+    if "summary" not in columns:
+        conn.execute(text("ALTER TABLE favorite_recipes ADD COLUMN summary TEXT"))
+    rows = conn.execute(text("SELECT id, name, recipe FROM favorite_recipes WHERE summary IS NULL")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE favorite_recipes SET summary = :summary WHERE id = :id"),
+            [{"id": row.id, "summary": summarize_recipe(row.name, row.recipe)} for row in rows],
+        )
+
+
+def _add_summary_tokens(conn):
+    from nutrivision.context_builder import count_tokens
+    columns = {column["name"] for column in inspect(conn).get_columns("favorite_recipes")}
+    if "summary_tokens" not in columns:
+        conn.execute(text("ALTER TABLE favorite_recipes ADD COLUMN summary_tokens INTEGER"))
+    rows = conn.execute(text("SELECT id, summary FROM favorite_recipes WHERE summary_tokens IS NULL")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE favorite_recipes SET summary_tokens = :tokens WHERE id = :id"),
+            [{"id": row.id, "tokens": count_tokens(row.summary)} for row in rows],
+        )
+
+
+def _add_embedding_columns(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("favorite_recipes")}
+    binary_type = "BYTEA" if conn.dialect.name == "postgresql" else "BLOB"
+    if "embedding" not in columns:
+        conn.execute(text(f"ALTER TABLE favorite_recipes ADD COLUMN embedding {binary_type}"))
+    if "embedding_model" not in columns:
+        conn.execute(text("ALTER TABLE favorite_recipes ADD COLUMN embedding_model VARCHAR"))
+    # Existing rows are embedded when the vector index is first built
+
+
+# Schema changes made after the initial create_all, as (version, function(connection)),
+# applied in order and recorded in the schema_version table
+MIGRATIONS = [
+    (1, _create_search_index),
+    (2, _add_recipe_summaries),
+    (3, _add_embedding_columns),
+    (4, _add_summary_tokens),
+]
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waits = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def attach(self, engine):
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+                self.in_use += 1
+                self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.in_use = max(self.in_use - 1, 0)
+
+    def record_wait(self, wait_ms):
+        with self._lock:
+            self.waits += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "avg_wait_ms": round(self.wait_ms_total / self.waits, 3) if self.waits else 0.0,
+                "max_wait_ms": round(self.wait_ms_max, 3),
+            }
+
+
+# Function to get the pool settings for a database URL from the environment
+def pool_options(database_url):
+    if database_url.startswith("sqlite") and (":memory:" in database_url or database_url.rstrip("/") == "sqlite:"):
+        # In-memory SQLite uses a single shared connection; pool sizing doesn't apply
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes"),
+    }
+
+
+# Function to create the tables and apply pending migrations
+def init_schema(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+        current = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+        for version, migrate in MIGRATIONS:
+            if version > current:
+                migrate(conn)
+                conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+
+
+class Database:
+    def __init__(self, database_url, **engine_options):
+        options = pool_options(database_url)
+        options.update(engine_options)
+        self.url = database_url
+        self.engine = create_engine(database_url, **options)
+        self.metrics = PoolMetrics()
+        self.metrics.attach(self.engine)
+        # Every statement is timed as a db.query span, labeled by its verb
+        instrument_engine(self.engine)
+        self.session_factory = sessionmaker(expire_on_commit=False)
+        init_schema(self.engine)
+
+    # Function to hand out a short-lived session that commits on success and always closes
+    @contextmanager
+    def session_scope(self):
+        with span("db.session"):
+            start = time.perf_counter()
+            connection = self.engine.connect()
+            self.metrics.record_wait((time.perf_counter() - start) * 1000)
+            session = self.session_factory(bind=connection)
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+                connection.close()
+
+    def stats(self):
+        stats = self.metrics.snapshot()
+        pool = self.engine.pool
+        stats["pool"] = pool.status()
+        return stats
+
+    def dispose(self):
+        self.engine.dispose()
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+# Function to get the process-wide database, created (and migrated) on first use
+def get_database():
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                database_url = os.getenv("DATABASE_URL")
+                if not database_url:
+                    raise RuntimeError("DATABASE_URL is not set. Please set it before running the app.")
+                _database = Database(database_url)
+    return _database
+
+
+# Function to point the process-wide database somewhere else, e.g. a seeded SQLite file
+def configure_database(database_url, **engine_options):
+    global _database
+    with _database_lock:
+        if _database is not None:
+            _database.dispose()
+        _database = Database(database_url, **engine_options)
+    return _database
+
+
+# Function to open a session on the process-wide database
+def session_scope():
+    return get_database().session_scope()
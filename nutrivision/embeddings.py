@@ -0,0 +1,103 @@
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Characters of recipe text that go into an embedding; the name and ingredients come first
+EMBEDDING_TEXT_CHARS = 2000
+
+
+# Function to build the text a favorite is embedded from
+def embedding_text(name, recipe):
+    return f"{name}\n{(recipe or '')[:EMBEDDING_TEXT_CHARS]}"
+
+
+class HashingEmbedder:
+    # Offline stand-in for a sentence embedding model: signed feature hashing of words
+    # and word pairs. Captures shared vocabulary only, but needs no model download.
+    def __init__(self, dim=256, max_cached_features=200_000):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self.max_cached_features = max_cached_features
+        # Recipe vocabulary is small, so most features are hashed once
+        self._buckets = {}
+
+    def _bucket(self, feature):
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            # The top bit gives the sign, folded into the bucket as +/-(index + 1)
+            bucket = (value % self.dim + 1) * (1 if value >> 63 else -1)
+            if len(self._buckets) < self.max_cached_features:
+                self._buckets[feature] = bucket
+        return bucket
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD_RE.findall(text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if not features:
+                continue
+            buckets = np.fromiter(map(self._bucket, features), dtype=np.int64, count=len(features))
+            matrix[row] = np.bincount(np.abs(buckets) - 1, weights=np.sign(buckets), minlength=self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    # Local CPU sentence embedding model; needs the optional sentence-transformers package
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts):
+        return self.model.encode(
+            list(texts), batch_size=32, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+# Function to turn a vector into bytes for the embedding column
+def encode_embedding(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+# Function to turn the embedding column back into a vector
+def decode_embedding(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+# Function to build the embedder selected by NUTRIVISION_EMBEDDER
+def embedder_from_env():
+    kind = os.getenv("NUTRIVISION_EMBEDDER", "hashing").lower()
+    if kind == "hashing":
+        return HashingEmbedder(int(os.getenv("NUTRIVISION_EMBEDDING_DIM", "256")))
+    if kind == "sentence-transformers":
+        return SentenceTransformerEmbedder(os.getenv("NUTRIVISION_EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    raise ValueError(f"Unknown NUTRIVISION_EMBEDDER {kind!r}, expected hashing or sentence-transformers")
+
+
+# Function to get the process-wide embedder
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = embedder_from_env()
+    return _embedder
+
+
+# Function to embed (name, recipe) pairs as rows of a float32 matrix
+def embed_favorites(pairs):
+    return get_embedder().embed([embedding_text(name, recipe) for name, recipe in pairs])
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+# Local stand-ins for the external services, for benchmarks and offline runs
+
+
+class FakeGeneration:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerateResponse:
+    def __init__(self, text):
+        self.generations = [FakeGeneration(text)]
+
+
+class FakeStreamEvent:
+    def __init__(self, event_type, text=None):
+        self.event_type = event_type
+        self.text = text
+
+
+# Function to answer a meal-plan prompt with valid plan JSON, varied by the prompt digest
+def fake_meal_plan_response(prompt, digest):
+    meals = re.search(r"Meals to plan: (.*)", prompt).group(1).split(", ")
+    seed = int(digest, 16)
+    return json.dumps({"meals": [
+        {
+            "meal": meal.strip(),
+            "recipe": f"Fake {meal.strip()} {digest}",
+            "ingredients": ["rice", "lentils", "spinach"][: 1 + (seed + index) % 3],
+            "calories": 300 + (seed >> index) % 400,
+            "protein": 10 + (seed >> (index + 3)) % 30,
+            "fat": 5 + (seed >> (index + 6)) % 20,
+            "carbs": 30 + (seed >> (index + 9)) % 60,
+        }
+        for index, meal in enumerate(meals)
+    ]})
+
+
+class FakeCohereClient:
+    # Mimics cohere.Client.generate/generate_stream with fixed latencies and deterministic text.
+    # Streaming waits first_token_ms before the first token and token_ms between tokens.
+    def __init__(self, latency_ms=200.0, responder=None, first_token_ms=None, token_ms=None):
+        self.latency = latency_ms / 1000.0
+        self.first_token = (first_token_ms if first_token_ms is not None else latency_ms / 4) / 1000.0
+        self.per_token = (token_ms if token_ms is not None else 0.0) / 1000.0
+        self.responder = responder or self.default_response
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_response(prompt, max_tokens=None, **params):
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        if "Meals to plan:" in prompt:
+            return fake_meal_plan_response(prompt, digest)
+        return f"Fake response {digest} for a prompt of {len(prompt)} characters."
+
+    def generate(self, model=None, prompt="", **params):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return FakeGenerateResponse(self.responder(prompt, **params))
+
+    def generate_stream(self, model=None, prompt="", **params):
+        with self._lock:
+            self.calls += 1
+        text = self.responder(prompt, **params)
+        tokens = text.split(" ")
+        per_token = self.per_token or max(self.latency - self.first_token, 0.0) / max(len(tokens), 1)
+        time.sleep(self.first_token)
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(per_token)
+            yield FakeStreamEvent("text-generation", token if index == 0 else " " + token)
+        yield FakeStreamEvent("stream-end")
+
+
+class _FakeRequest:
+    def __init__(self, client, params):
+        self.client = client
+        self.params = params
+
+    def execute(self, http=None):
+        time.sleep(self.client.latency)
+        with self.client._lock:
+            self.client.calls += 1
+        query = self.params.get("q", "")
+        if self.client.empty_for and self.client.empty_for(query):
+            return {"items": []}
+        video_id = hashlib.sha1(query.encode("utf-8")).hexdigest()[:11]
+        return {"items": [{"id": {"kind": "youtube#video", "videoId": video_id}}]}
+
+
+class _FakeSearch:
+    def __init__(self, client):
+        self.client = client
+
+    def list(self, **params):
+        return _FakeRequest(self.client, params)
+
+
+class FakeYouTubeClient:
+    # Mimics the googleapiclient YouTube resource: client.search().list(...).execute()
+    def __init__(self, latency_ms=150.0, empty_for=None):
+        self.latency = latency_ms / 1000.0
+        self.empty_for = empty_for
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self):
+        return _FakeSearch(self)
+
+
+# Function mimicking googleapiclient.discovery.build, including its discovery cost
+def fake_build(build_latency_ms=300.0, latency_ms=150.0):
+    def build(*args, **kwargs):
+        time.sleep(build_latency_ms / 1000.0)
+        return FakeYouTubeClient(latency_ms)
+    return build
+
+
+class FakeAPIError(Exception):
+    # Carries an HTTP status the way cohere and googleapiclient errors do
+    def __init__(self, status_code, message):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+
+
+class FaultInjectingClient:
+    # Wraps a fake client and makes its calls fail like a struggling provider: a fraction of
+    # calls raise 429/503 errors or time out, some are slowed down, and during the outage
+    # window, a (start, end) pair of seconds after the first call, every call fails.
+    def __init__(self, client, failure_rate=0.0, timeout_rate=0.0, slow_rate=0.0, slow_ms=2000.0,
+                 outage=None, seed=0):
+        self.client = client
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self.slow_rate = slow_rate
+        self.slow = slow_ms / 1000.0
+        self.outage = outage
+        self.failures = 0
+        self._started = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # Function to pick what happens to the next call: None, "slow", "timeout", 429 or 503
+    def _fault(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now
+            if self.outage and self.outage[0] <= now - self._started < self.outage[1]:
+                fault = 503
+            else:
+                roll = self._rng.random()
+                if roll < self.failure_rate:
+                    fault = self._rng.choice((429, 503))
+                elif roll < self.failure_rate + self.timeout_rate:
+                    fault = "timeout"
+                elif roll < self.failure_rate + self.timeout_rate + self.slow_rate:
+                    fault = "slow"
+                else:
+                    fault = None
+            self.failures += fault not in (None, "slow")
+        return fault
+
+    def _inject(self):
+        fault = self._fault()
+        if fault == "slow":
+            time.sleep(self.slow)
+        elif fault == "timeout":
+            time.sleep(self.slow)
+            raise TimeoutError("injected timeout")
+        elif fault is not None:
+            raise FakeAPIError(fault, "injected failure")
+
+    def generate(self, **params):
+        self._inject()
+        return self.client.generate(**params)
+
+    def generate_stream(self, **params):
+        self._inject()
+        return self.client.generate_stream(**params)
@@ -0,0 +1,152 @@
+import itertools
+
+from sqlalchemy import func
+
+from nutrivision.context_builder import DEFAULT_BUDGET_TOKENS, SUMMARY_TOKENS, summary_columns
+from nutrivision.db import FavoriteRecipe, session_scope
+from nutrivision.embeddings import embed_favorites, encode_embedding, get_embedder
+from nutrivision.vector_index import index_favorites, unindex_favorites
+
+
+# Bumped on every change made through this process
+_changes = itertools.count(1)
+_change_number = 0
+
+
+# Function to record that favorites were changed by this process
+def mark_favorites_changed():
+    global _change_number
+    _change_number = next(_changes)
+
+
+# Function to get a cheap stamp that changes when favorites change. Local edits bump the
+# counter; the row count and highest id catch rows added or deleted by other processes.
+def favorites_version():
+    with session_scope() as session:
+        count, max_id = session.query(func.count(FavoriteRecipe.id), func.max(FavoriteRecipe.id)).one()
+    return (_change_number, count, max_id)
+
+
+# Function to load favorites
+def load_favorites():
+    with session_scope() as session:
+        return session.query(FavoriteRecipe).all()
+
+
+# Function to add a favorite recipe
+def add_favorite(name, recipe):
+    vector = embed_favorites([(name, recipe)])[0]
+    with session_scope() as session:
+        favorite = FavoriteRecipe(
+            name=name, recipe=recipe, **summary_columns(name, recipe),
+            embedding=encode_embedding(vector), embedding_model=get_embedder().name,
+        )
+        session.add(favorite)
+    index_favorites([favorite.id], [vector])
+    mark_favorites_changed()
+    return favorite
+
+
+# Function to update a favorite recipe
+def update_favorite(recipe_id, name, recipe):
+    vector = embed_favorites([(name, recipe)])[0]
+    with session_scope() as session:
+        favorite = session.get(FavoriteRecipe, recipe_id)
+        if favorite:
+            favorite.name = name
+            favorite.recipe = recipe
+            for column, value in summary_columns(name, recipe).items():
+                setattr(favorite, column, value)
+            favorite.embedding = encode_embedding(vector)
+            favorite.embedding_model = get_embedder().name
+    if favorite:
+        index_favorites([recipe_id], [vector])
+        mark_favorites_changed()
+    return favorite
+
+
+# Function to delete a favorite recipe
+def delete_favorite(recipe_id):
+    with session_scope() as session:
+        favorite = session.get(FavoriteRecipe, recipe_id)
+        if favorite:
+            session.delete(favorite)
+    if favorite:
+        unindex_favorites([recipe_id])
+        mark_favorites_changed()
+    return favorite
+
+
+# Rows per page when listing favorites
+PAGE_SIZE = 50
+
+
+class FavoritesPage:
+    def __init__(self, items, next_cursor):
+        # [(id, name), ...] in id order
+        self.items = items
+        # Pass as after_id to get the next page; None on the last page
+        self.next_cursor = next_cursor
+
+
+# Function to list favorite ids and names after a cursor, without loading recipe text.
+# Keyset pagination on id stays fast however deep the page, unlike OFFSET.
+def list_favorites(after_id=None, limit=PAGE_SIZE):
+    with session_scope() as session:
+        query = session.query(FavoriteRecipe.id, FavoriteRecipe.name).order_by(FavoriteRecipe.id)
+        if after_id is not None:
+            query = query.filter(FavoriteRecipe.id > after_id)
+        rows = query.limit(limit + 1).all()
+    items = [(row.id, row.name) for row in rows[:limit]]
+    next_cursor = items[-1][0] if len(rows) > limit else None
+    return FavoritesPage(items, next_cursor)
+
+
+# Function to load favorites by id, in the order given
+def get_favorites(recipe_ids):
+    with session_scope() as session:
+        rows = session.query(FavoriteRecipe).filter(FavoriteRecipe.id.in_(list(recipe_ids))).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in by_id]
+
+
+# Function to load one favorite's recipe text, e.g. when it is expanded
+def get_favorite_recipe(recipe_id):
+    with session_scope() as session:
+        return session.query(FavoriteRecipe.recipe).filter(FavoriteRecipe.id == recipe_id).scalar()
+
+
+# Function to load the bodies of some favorites as {id: recipe}
+def get_favorite_recipes(recipe_ids):
+    with session_scope() as session:
+        rows = session.query(FavoriteRecipe.id, FavoriteRecipe.recipe).filter(FavoriteRecipe.id.in_(list(recipe_ids))).all()
+    return {row.id: row.recipe for row in rows}
+
+
+# Function to load favorites for a prompt's context as (id, name, summary, summary_tokens) rows,
+# without recipe bodies: the given ids in that order, or else the newest favorites, read a
+# keyset page at a time until their stored summaries would more than fill max_tokens
+def context_candidates(recipe_ids=None, max_tokens=DEFAULT_BUDGET_TOKENS, batch_size=64):
+    columns = (FavoriteRecipe.id, FavoriteRecipe.name, FavoriteRecipe.summary, FavoriteRecipe.summary_tokens)
+    with session_scope() as session:
+        if recipe_ids is not None:
+            rows = session.query(*columns).filter(FavoriteRecipe.id.in_(list(recipe_ids))).all()
+            by_id = {row.id: row for row in rows}
+            return [by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in by_id]
+        candidates = []
+        used = 0
+        before_id = None
+        while used <= max_tokens:
+            query = session.query(*columns).order_by(FavoriteRecipe.id.desc())
+            if before_id is not None:
+                query = query.filter(FavoriteRecipe.id < before_id)
+            rows = query.limit(batch_size).all()
+            for row in rows:
+                candidates.append(row)
+                used += row.summary_tokens if row.summary_tokens is not None else SUMMARY_TOKENS
+                if used > max_tokens:
+                    break
+            if len(rows) < batch_size:
+                break
+            before_id = rows[-1].id
+    return candidates
@@ -0,0 +1,259 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import case, delete, insert, select, update
+
+from nutrivision.context_builder import summary_columns
+from nutrivision.db import FavoriteRecipe, ImportJob, get_database
+from nutrivision.embeddings import embed_favorites, encode_embedding, get_embedder
+from nutrivision.favorites import mark_favorites_changed
+from nutrivision.vector_index import index_favorites, sync_vector_index, unindex_favorites
+
+FORMATS = ("jsonl", "csv")
+FIELDS = ("id", "name", "recipe")
+
+
+# Function to stream (id, name, recipe) rows in id order, one keyset page at a time
+def iter_favorite_rows(batch_size=1000):
+    database = get_database()
+    after_id = 0
+    while True:
+        with database.engine.connect() as conn:
+            rows = conn.execute(
+                select(FavoriteRecipe.id, FavoriteRecipe.name, FavoriteRecipe.recipe)
+                .where(FavoriteRecipe.id > after_id)
+                .order_by(FavoriteRecipe.id)
+                .limit(batch_size)
+            ).all()
+        if not rows:
+            return
+        yield from rows
+        after_id = rows[-1].id
+
+
+# Function to write every favorite to a text file object as JSONL or CSV; returns the row count
+def export_favorites(out, fmt="jsonl", batch_size=1000):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    writer = csv.writer(out) if fmt == "csv" else None
+    if writer:
+        writer.writerow(FIELDS)
+    count = 0
+    for row in iter_favorite_rows(batch_size):
+        if writer:
+            writer.writerow(row)
+        else:
+            out.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+# Function to parse JSONL or CSV records lazily from a text file object.
+# A JSONL line that isn't valid JSON comes out as None, so one bad line doesn't stop the rest.
+def iter_records(source, fmt="jsonl"):
+    if fmt == "csv":
+        for record in csv.DictReader(source):
+            yield record
+    elif fmt == "jsonl":
+        for line in source:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+
+
+def _read_progress(conn, job):
+    if not job:
+        return 0
+    return conn.execute(select(ImportJob.records_done).where(ImportJob.job == job)).scalar() or 0
+
+
+def _write_progress(conn, job, records_done):
+    if not job:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    updated = conn.execute(
+        update(ImportJob).where(ImportJob.job == job).values(records_done=records_done, updated_at=now)
+    ).rowcount
+    if not updated:
+        conn.execute(insert(ImportJob).values(job=job, records_done=records_done, updated_at=now))
+
+
+def _insert_batch(conn, rows):
+    # Embed the whole batch in one call rather than row by row
+    model = get_embedder().name
+    vectors = embed_favorites([(row["name"], row["recipe"]) for row in rows])
+    for row, vector in zip(rows, vectors):
+        row["embedding"] = encode_embedding(vector)
+        row["embedding_model"] = model
+    if conn.dialect.name == "postgresql":
+        # COPY is much faster than INSERT for large batches on PostgreSQL
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (row["name"], row["recipe"], row["summary"], row["summary_tokens"], "\\x" + row["embedding"].hex(), model)
+            for row in rows
+        )
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(
+            "COPY favorite_recipes (name, recipe, summary, summary_tokens, embedding, embedding_model)"
+            " FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    else:
+        # A list of parameter sets makes SQLAlchemy use a single executemany()
+        conn.execute(insert(FavoriteRecipe), rows)
+
+
+# Function to get a stripped string field of a parsed record; "" when the record isn't an
+# object or the field is missing or not a string
+def _text_field(record, field):
+    value = record.get(field) if isinstance(record, dict) else None
+    return value.strip() if isinstance(value, str) else ""
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.batches = 0
+
+
+# Function to import favorites from a JSONL/CSV text file object in chunk_size batches.
+# Each batch is its own transaction. With a job name, the number of records done is stored
+# in that same transaction, so an interrupted import run again under the same name picks up
+# after the last committed batch; the record is removed once the import finishes.
+def import_favorites(source, fmt="jsonl", chunk_size=1000, job=None, on_progress=None):
+    database = get_database()
+    result = ImportResult()
+    with database.engine.connect() as conn:
+        done = _read_progress(conn, job)
+    position = 0
+    batch = []
+
+    def flush():
+        with database.engine.begin() as conn:
+            _insert_batch(conn, batch)
+            _write_progress(conn, job, position)
+        result.inserted += len(batch)
+        result.batches += 1
+        if on_progress:
+            on_progress(result)
+        batch.clear()
+
+    for record in iter_records(source, fmt):
+        position += 1
+        if position <= done:
+            result.skipped += 1
+            continue
+        name, recipe = _text_field(record, "name"), _text_field(record, "recipe")
+        if not name or not recipe:
+            result.invalid += 1
+            continue
+        batch.append({"name": name, "recipe": recipe, **summary_columns(name, recipe)})
+        if len(batch) >= chunk_size:
+            flush()
+    if batch:
+        flush()
+    if job:
+        with database.engine.begin() as conn:
+            conn.execute(delete(ImportJob).where(ImportJob.job == job))
+    if result.inserted:
+        sync_vector_index()
+        mark_favorites_changed()
+    return result
+
+
+# Function to delete many favorites in one statement; returns the number deleted
+def delete_favorites(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return 0
+    with get_database().engine.begin() as conn:
+        deleted = conn.execute(delete(FavoriteRecipe).where(FavoriteRecipe.id.in_(recipe_ids))).rowcount
+    unindex_favorites(recipe_ids)
+    mark_favorites_changed()
+    return deleted
+
+
+# Function to update many favorites in one statement.
+# changes maps id -> {"name": ..., "recipe": ...}; either key may be left out.
+def update_favorites(changes):
+    if not changes:
+        return 0
+    values = {}
+    for column in ("name", "recipe"):
+        mapping = {recipe_id: fields[column] for recipe_id, fields in changes.items() if column in fields}
+        if mapping:
+            values[column] = case(mapping, value=FavoriteRecipe.id, else_=getattr(FavoriteRecipe, column))
+    if not values:
+        return 0
+    # Summaries and embeddings depend on both columns, so fill in whichever one the change leaves out
+    with get_database().engine.begin() as conn:
+        current = {
+            row.id: row for row in conn.execute(
+                select(FavoriteRecipe.id, FavoriteRecipe.name, FavoriteRecipe.recipe)
+                .where(FavoriteRecipe.id.in_(list(changes)))
+            )
+        }
+        merged = {
+            recipe_id: (changes[recipe_id].get("name", row.name), changes[recipe_id].get("recipe", row.recipe))
+            for recipe_id, row in current.items()
+        }
+        if merged:
+            vectors = embed_favorites(list(merged.values()))
+            summaries = {recipe_id: summary_columns(*pair) for recipe_id, pair in merged.items()}
+            embeddings = {recipe_id: encode_embedding(vector) for recipe_id, vector in zip(merged, vectors)}
+            for column in ("summary", "summary_tokens"):
+                mapping = {recipe_id: fields[column] for recipe_id, fields in summaries.items()}
+                values[column] = case(mapping, value=FavoriteRecipe.id, else_=getattr(FavoriteRecipe, column))
+            values["embedding"] = case(embeddings, value=FavoriteRecipe.id, else_=FavoriteRecipe.embedding)
+            values["embedding_model"] = get_embedder().name
+        updated = conn.execute(
+            update(FavoriteRecipe).where(FavoriteRecipe.id.in_(list(changes))).values(**values)
+        ).rowcount
+    if merged:
+        index_favorites(list(merged), vectors)
+        mark_favorites_changed()
+    return updated
+
+
+def main():
+    import argparse
+    import sys
+
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Bulk import/export of favorite recipes")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help="file to read or write; '-' for stdin/stdout")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--job", help="name that makes an import resumable: rerun with the same name to continue")
+    args = parser.parse_args()
+
+    load_dotenv()
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+    if args.command == "export":
+        out = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8", newline="")
+        with out:
+            count = export_favorites(out, fmt, args.chunk_size)
+        print(f"exported {count} favorites", file=sys.stderr)
+    else:
+        source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+        with source:
+            result = import_favorites(
+                source, fmt, args.chunk_size, args.job,
+                on_progress=lambda r: print(f"imported {r.inserted} in {r.batches} batches", file=sys.stderr),
+            )
+        print(f"imported {result.inserted}, skipped {result.skipped}, invalid {result.invalid}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
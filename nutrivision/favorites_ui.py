@@ -0,0 +1,77 @@
+import streamlit as st
+
+from nutrivision.favorites import PAGE_SIZE, delete_favorite, get_favorite_recipe, list_favorites
+
+LABELS = {
+    "show": "Show recipe",
+    "delete": "Delete",
+    "deleted": "Recipe {name} deleted!",
+    "more": "Load more",
+    "empty": "No favorite recipes found.",
+}
+
+
+def _state(key):
+    state_key = f"{key}_favorites_list"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = {"items": [], "cursor": None, "loaded": False, "recipes": {}}
+    return st.session_state[state_key]
+
+
+# Function to forget the loaded pages so the list is re-read from the database
+def reset_favorites_list(key):
+    st.session_state.pop(f"{key}_favorites_list", None)
+
+
+def _load_page(state, page_size):
+    page = list_favorites(after_id=state["cursor"], limit=page_size)
+    state["items"].extend(page.items)
+    state["cursor"] = page.next_cursor
+    state["loaded"] = True
+
+
+# Function to render favorites page by page. Only ids and names are loaded up front;
+# a recipe's text is fetched when the user asks to see it.
+def render_favorites_list(key, page_size=PAGE_SIZE, allow_delete=False, labels=None):
+    labels = {**LABELS, **(labels or {})}
+    state = _state(key)
+    if not state["loaded"]:
+        _load_page(state, page_size)
+
+    # The "load more" button sits below the list but must be handled before it is drawn
+    list_area = st.container()
+    if state["cursor"] is not None and st.button(labels["more"], key=f"{key}_more"):
+        _load_page(state, page_size)
+
+    with list_area:
+        if not state["items"]:
+            st.write(labels["empty"])
+        for recipe_id, name in list(state["items"]):
+            with st.expander(f"{name} (ID: {recipe_id})"):
+                recipe = state["recipes"].get(recipe_id)
+                if recipe is None and st.button(labels["show"], key=f"{key}_show_{recipe_id}"):
+                    recipe = state["recipes"][recipe_id] = get_favorite_recipe(recipe_id)
+                if recipe is not None:
+                    st.write(recipe)
+                if allow_delete and st.button(labels["delete"], key=f"{key}_delete_{recipe_id}"):
+                    delete_favorite(recipe_id)
+                    state["items"].remove((recipe_id, name))
+                    state["recipes"].pop(recipe_id, None)
+                    st.success(labels["deleted"].format(name=name))
+
+
+# Function to render a search box over favorites with ranked, highlighted results
+def render_favorites_search(key, label="Search favorites", empty="No matching recipes.", limit=20):
+    from nutrivision.search import search_favorites
+
+    query = st.text_input(label, key=f"{key}_search")
+    if not query.strip():
+        return
+    results = search_favorites(query, limit=limit)
+    if not results:
+        st.write(empty)
+    for result in results:
+        st.markdown(
+            f"**{result.name}** (ID: {result.id})<br><small>{result.snippet}</small>",
+            unsafe_allow_html=True,
+        )
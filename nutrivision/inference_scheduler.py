@@ -0,0 +1,201 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from nutrivision.metrics import get_metrics
+from nutrivision.model_registry import registry as default_registry
+from nutrivision.preprocessing import SharedPreprocessor
+from nutrivision.timing import timed
+
+
+class _Request:
+    def __init__(self, image, timings):
+        self.image = image
+        self.timings = dict(timings or {})
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ClassificationOutput:
+    def __init__(self, results, timings):
+        # {model_name: [{"label": ..., "score": ...}, ...]}
+        self.results = results
+        # decode/queue/preprocess/infer timings in milliseconds
+        self.timings = timings
+
+
+class InferenceScheduler:
+    def __init__(self, registry, model_names, max_batch=8, max_wait_ms=20, parallel=True):
+        self.registry = registry
+        self.model_names = list(model_names)
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.parallel = parallel and len(self.model_names) > 1
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=len(self.model_names), thread_name_prefix="infer") if self.parallel else None
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._preprocessor = None
+        self.batches = 0
+        self.items = 0
+        self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._worker.start()
+
+    # Function to queue an image; the future resolves to a ClassificationOutput.
+    # timings measured by the caller (e.g. decode_ms) are carried into the output.
+    def submit(self, image, timings=None):
+        if self._stop.is_set():
+            raise RuntimeError("Inference scheduler is shut down")
+        request = _Request(image, timings)
+        self._queue.put(request)
+        return request.future
+
+    def shutdown(self, wait=True):
+        self._stop.set()
+        self._queue.put(None)
+        if wait:
+            self._worker.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    # Function to gather up to max_batch requests, waiting at most max_wait after the first
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._stop.set()
+                break
+            batch.append(request)
+        return batch
+
+    # Function to get the preprocessor shared by every model that accepts tensors
+    def _get_preprocessor(self, models):
+        if self._preprocessor is None:
+            self._preprocessor = SharedPreprocessor({name: model.processor for name, model in models.items()})
+        return self._preprocessor
+
+    # Function to get the image size the models need, for downscale-on-decode
+    def target_size(self):
+        models = {name: self.registry.get(name) for name in self.model_names}
+        tensor_models = {name: model for name, model in models.items() if model.supports_tensors}
+        return self._get_preprocessor(tensor_models).target_size() if tensor_models else None
+
+    def _run_model(self, model, images, pixel_values):
+        if pixel_values is not None:
+            return model.forward(pixel_values)
+        results = model(images, batch_size=len(images))
+        # A single image comes back as one result list rather than a list of lists
+        if len(images) == 1 and results and isinstance(results[0], dict):
+            results = [results]
+        return results
+
+    def _run_batch(self, batch):
+        started_at = time.perf_counter()
+        images = [request.image for request in batch]
+        models = {name: self.registry.get(name) for name in self.model_names}
+        tensor_models = {name: model for name, model in models.items() if model.supports_tensors}
+
+        batch_timings = {"batch_size": len(batch)}
+        for request in batch:
+            get_metrics().observe("classify.queue", (started_at - request.enqueued_at) * 1000)
+        with timed(batch_timings, "preprocess"), get_metrics().span("classify.preprocess"):
+            # Models with matching processor configs get the very same tensor object
+            pixel_values = self._get_preprocessor(tensor_models)(images) if tensor_models else {}
+
+        def infer(name):
+            stage_timings = {}
+            with timed(stage_timings, f"infer_{name}"), get_metrics().span("classify.infer", model=name):
+                results = self._run_model(models[name], images, pixel_values.get(name))
+            return name, results, stage_timings
+
+        if self.parallel:
+            outputs = list(self._pool.map(infer, self.model_names))
+        else:
+            outputs = [infer(name) for name in self.model_names]
+        for _, _, stage_timings in outputs:
+            batch_timings.update(stage_timings)
+
+        for index, request in enumerate(batch):
+            timings = dict(request.timings)
+            timings["queue_ms"] = round((started_at - request.enqueued_at) * 1000, 2)
+            timings.update(batch_timings)
+            results = {name: model_results[index] for name, model_results, _ in outputs}
+            request.future.set_result(ClassificationOutput(results, timings))
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+        # Fail anything still queued so callers don't hang after shutdown
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("Inference scheduler is shut down"))
+
+
+# Function to classify one image through the scheduler; returns (food name, ingredient labels)
+def classify_food(scheduler, image, timings=None):
+    output = scheduler.submit(image, timings).result()
+    if timings is not None:
+        timings.update(output.timings)
+    classified_items_v1 = [result['label'] for result in output.results["food_classification_v1"]]
+    classified_items_v2 = [result['label'] for result in output.results["food_classification_v2"]]
+    food_name = classified_items_v1[0] if classified_items_v1 else "Unknown"
+    ingredients = classified_items_v2 if classified_items_v2 else ["Ingredients not found"]
+    return food_name, ingredients
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+# Function to get the process-wide scheduler for the image classification models
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = InferenceScheduler(
+                    default_registry,
+                    default_registry.model_ids,
+                    max_batch=int(os.getenv("NUTRIVISION_MAX_BATCH", "8")),
+                    max_wait_ms=float(os.getenv("NUTRIVISION_MAX_WAIT_MS", "20")),
+                )
+    return _scheduler
@@ -0,0 +1,236 @@
+import itertools
+import os
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+from sqlalchemy import and_, delete, func, insert, select, update
+
+from nutrivision.db import MACROS, DailyIntake, MealLog, get_database
+
+DEFAULT_USER = "default"
+
+# Bumped on every change made through this process
+_changes = itertools.count(1)
+_change_number = 0
+
+
+def _mark_changed():
+    global _change_number
+    _change_number = next(_changes)
+
+
+# Function to get a cheap stamp that changes when a user's meal logs change. Local changes bump
+# the counter; the rollup entry total catches inserts and deletes made by other processes.
+def intake_version(user_id=DEFAULT_USER):
+    with get_database().engine.connect() as conn:
+        entries = conn.execute(
+            select(func.coalesce(func.sum(DailyIntake.entries), 0)).where(DailyIntake.user_id == user_id)
+        ).scalar()
+    return (_change_number, entries)
+
+
+# Function to get the time zone days are counted in (NUTRIVISION_TIMEZONE, default UTC)
+def intake_timezone():
+    return ZoneInfo(os.getenv("NUTRIVISION_TIMEZONE", "UTC"))
+
+
+# Function to turn a datetime into the naive UTC stored in meal_logs; naive input is taken as UTC
+def to_utc_naive(moment):
+    if moment is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+# Function to get the local day a stored (naive UTC) time falls on
+def local_day(logged_at, tz=None):
+    return logged_at.replace(tzinfo=timezone.utc).astimezone(tz or intake_timezone()).date()
+
+
+# Function to sum per-meal rows into per-(user, day) rollup deltas with one groupby
+def daily_deltas(frame, tz=None, sign=1):
+    if frame.empty:
+        return []
+    local = pd.to_datetime(frame["logged_at"]).dt.tz_localize("UTC").dt.tz_convert(tz or intake_timezone())
+    grouped = (
+        frame.assign(day=local.dt.date, entries=1)
+        .groupby(["user_id", "day"], sort=False)[list(MACROS) + ["entries"]]
+        .sum()
+    )
+    grouped[list(grouped.columns)] *= sign
+    records = grouped.reset_index().to_dict("records")
+    for record in records:
+        record["entries"] = int(record["entries"])
+    return records
+
+
+def _apply_deltas(conn, deltas):
+    if not deltas:
+        return
+    columns = MACROS + ("entries",)
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        statement = upsert(DailyIntake)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={column: getattr(DailyIntake, column) + getattr(statement.excluded, column) for column in columns},
+        )
+        conn.execute(statement, deltas)
+    else:
+        for delta in deltas:
+            key = and_(DailyIntake.user_id == delta["user_id"], DailyIntake.day == delta["day"])
+            changed = conn.execute(
+                update(DailyIntake).where(key)
+                .values({column: getattr(DailyIntake, column) + delta[column] for column in columns})
+            ).rowcount
+            if not changed:
+                conn.execute(insert(DailyIntake), [delta])
+    # Days whose last meal was deleted disappear rather than showing zeros
+    if any(delta["entries"] < 0 for delta in deltas):
+        conn.execute(delete(DailyIntake).where(DailyIntake.entries <= 0))
+
+
+# Function to log one meal and fold it into its day's totals; returns the new log id
+def log_meal(calories=0.0, protein=0.0, fat=0.0, carbs=0.0, logged_at=None, user_id=DEFAULT_USER,
+             favorite_id=None, meal_plan_id=None, note=None):
+    row = {
+        "user_id": user_id, "logged_at": to_utc_naive(logged_at),
+        "calories": float(calories), "protein": float(protein), "fat": float(fat), "carbs": float(carbs),
+        "favorite_id": favorite_id, "meal_plan_id": meal_plan_id, "note": note,
+    }
+    delta = {column: row[column] for column in MACROS}
+    delta.update(user_id=user_id, day=local_day(row["logged_at"]), entries=1)
+    with get_database().engine.begin() as conn:
+        log_id = conn.execute(insert(MealLog).values(**row)).inserted_primary_key[0]
+        _apply_deltas(conn, [delta])
+    _mark_changed()
+    return log_id
+
+
+# Function to log many meals at once from dicts or a DataFrame with logged_at and macro columns.
+# Returns the number logged.
+def log_meals(entries, user_id=DEFAULT_USER):
+    frame = entries.copy() if isinstance(entries, pd.DataFrame) else pd.DataFrame(list(entries))
+    if frame.empty:
+        return 0
+    for column in MACROS:
+        frame[column] = frame[column].astype(float) if column in frame else 0.0
+    for column in ("favorite_id", "meal_plan_id", "note"):
+        if column not in frame:
+            frame[column] = None
+    if "user_id" not in frame:
+        frame["user_id"] = user_id
+    frame["logged_at"] = pd.to_datetime(frame["logged_at"], utc=True).dt.tz_localize(None)
+    rows = frame[["user_id", "logged_at", *MACROS, "favorite_id", "meal_plan_id", "note"]]
+    rows = rows.astype(object).where(rows.notna(), None)
+    records = rows.to_dict("records")
+    for record in records:
+        record["logged_at"] = record["logged_at"].to_pydatetime()
+    with get_database().engine.begin() as conn:
+        conn.execute(insert(MealLog), records)
+        _apply_deltas(conn, daily_deltas(frame))
+    _mark_changed()
+    return len(records)
+
+
+# Function to delete a logged meal and take it out of its day's totals
+def delete_meal_log(log_id):
+    with get_database().engine.begin() as conn:
+        row = conn.execute(select(MealLog).where(MealLog.id == log_id)).first()
+        if row is None:
+            return False
+        conn.execute(delete(MealLog).where(MealLog.id == log_id))
+        delta = {column: -getattr(row, column) for column in MACROS}
+        delta.update(user_id=row.user_id, day=local_day(row.logged_at), entries=-1)
+        _apply_deltas(conn, [delta])
+    _mark_changed()
+    return True
+
+
+# Function to load per-day totals for [start, end] from the rollups, one row per day (missing days are 0)
+def daily_totals(start, end, user_id=DEFAULT_USER):
+    with get_database().engine.connect() as conn:
+        frame = pd.read_sql(
+            select(DailyIntake.day, *[getattr(DailyIntake, column) for column in MACROS], DailyIntake.entries)
+            .where(DailyIntake.user_id == user_id, DailyIntake.day >= start, DailyIntake.day <= end),
+            conn,
+        )
+    frame["day"] = pd.to_datetime(frame["day"])
+    days = pd.date_range(start, end, freq="D", name="day")
+    return frame.set_index("day").reindex(days, fill_value=0).astype({"entries": int})
+
+
+# Function to roll daily totals up into weeks starting on Monday; how is "sum" or "mean"
+def weekly_totals(daily, how="sum"):
+    weekly = daily[list(MACROS)].resample("W-MON", label="left", closed="left")
+    return weekly.sum() if how == "sum" else weekly.mean()
+
+
+# Function to get trailing averages of the daily totals over window days
+def rolling_averages(daily, window=7):
+    return daily[list(MACROS)].rolling(window, min_periods=1).mean()
+
+
+# Function to get the naive UTC time a local day starts at
+def day_start_utc(day, tz=None):
+    return to_utc_naive(datetime.combine(day, datetime.min.time(), tzinfo=tz or intake_timezone()))
+
+
+# Function to load individual meals logged on local days start..end as a DataFrame, oldest first
+def meal_logs_frame(start, end, user_id=DEFAULT_USER):
+    with get_database().engine.connect() as conn:
+        return pd.read_sql(
+            select(MealLog.id, MealLog.logged_at, *[getattr(MealLog, column) for column in MACROS],
+                   MealLog.favorite_id, MealLog.meal_plan_id, MealLog.note)
+            .where(MealLog.user_id == user_id, MealLog.logged_at >= day_start_utc(start),
+                   MealLog.logged_at < day_start_utc(end + timedelta(days=1)))
+            .order_by(MealLog.logged_at),
+            conn,
+        )
+
+
+# Function to recompute the rollups from meal_logs, e.g. after NUTRIVISION_TIMEZONE changes
+def rebuild_daily_rollups(chunk_size=200_000):
+    database = get_database()
+    totals = None
+    with database.engine.connect() as conn:
+        query = select(MealLog.user_id, MealLog.logged_at, *[getattr(MealLog, column) for column in MACROS])
+        for chunk in pd.read_sql(query, conn, chunksize=chunk_size):
+            part = pd.DataFrame(daily_deltas(chunk))
+            if not part.empty:
+                totals = part if totals is None else pd.concat([totals, part])
+    with database.engine.begin() as conn:
+        conn.execute(delete(DailyIntake))
+        if totals is not None:
+            records = totals.groupby(["user_id", "day"], sort=False).sum().reset_index().to_dict("records")
+            for record in records:
+                record["entries"] = int(record["entries"])
+            conn.execute(insert(DailyIntake), records)
+    _mark_changed()
+
+
+# Function to get the first and last day with logged meals, or None when nothing is logged
+def logged_range(user_id=DEFAULT_USER):
+    with get_database().engine.connect() as conn:
+        first, last = conn.execute(
+            select(func.min(DailyIntake.day), func.max(DailyIntake.day)).where(DailyIntake.user_id == user_id)
+        ).one()
+    if first is None:
+        return None
+    return first, last
+
+
+# Days shown when the dashboard opens
+DEFAULT_RANGE_DAYS = 30
+
+
+# Function to get the default dashboard range ending today in the intake time zone
+def default_range(days=DEFAULT_RANGE_DAYS):
+    today = datetime.now(intake_timezone()).date()
+    return today - timedelta(days=days - 1), today
@@ -0,0 +1,346 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from nutrivision.context_builder import count_tokens
+from nutrivision.metrics import get_metrics
+from nutrivision.resilience import ServiceUnavailableError
+
+DEFAULT_MODEL = "command-xlarge-nightly"
+
+# Gateway counters reported as cache_requests{cache="llm"} results
+CACHE_RESULTS = {"hits": "hit", "misses": "miss", "deduplicated": "shared", "stale_hits": "stale"}
+
+
+# Function to normalize a prompt so whitespace-only differences share a cache entry
+def normalize_prompt(prompt):
+    return " ".join(prompt.split())
+
+
+# Function to build the cache key for a generation request
+def cache_key(model, prompt, params):
+    payload = json.dumps(
+        {"model": model, "params": params, "prompt": normalize_prompt(prompt)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Function to get a cached value; allow_stale also returns an expired one.
+    # Expired entries stay until evicted, as the fallback while the provider is down.
+    def get(self, key, allow_stale=False):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time() and not allow_stale:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    # Function to cache a value for ttl seconds, or for good when ttl is None. With ttl 0 it is
+    # expired straight away, so it is only kept as the stale fallback.
+    def set(self, key, value, ttl=None):
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    # Survives restarts and can be shared by several server processes on one host
+    def __init__(self, path, max_entries=20000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, allow_stale=False):
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now and not allow_stale:
+            return None
+        with conn:
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), None if ttl is None else now + ttl, now),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LLMGateway:
+    # policy is an optional resilience.CallPolicy that every call to the client goes through
+    def __init__(self, client, cache=None, ttl=24 * 3600, policy=None):
+        self.client = client
+        self.cache = cache if cache is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.policy = policy
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self.stale_hits = 0
+        self.calls = 0
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        if counter in CACHE_RESULTS:
+            get_metrics().increment("cache_requests", cache="llm", result=CACHE_RESULTS[counter])
+
+    def _count_tokens(self, prompt, text):
+        metrics = get_metrics()
+        metrics.increment("llm_tokens", count_tokens(prompt), kind="prompt")
+        metrics.increment("llm_tokens", count_tokens(text), kind="completion")
+
+    def _guarded(self, fn):
+        return self.policy.call(fn) if self.policy is not None else fn()
+
+    # Function to fall back to an expired cache entry while the provider is unavailable
+    def _stale(self, key):
+        text = self.cache.get(key, allow_stale=True)
+        if text is not None:
+            self._count("stale_hits")
+        return text
+
+    def _call(self, model, prompt, params):
+        self._count("calls")
+        with get_metrics().span("llm.generate", model=model) as span:
+            response = self._guarded(lambda: self.client.generate(model=model, prompt=prompt, **params))
+            text = response.generations[0].text.strip()
+            span["completion_chars"] = len(text)
+        self._count_tokens(prompt, text)
+        return text
+
+    # Function to generate text, served from cache or shared with an identical in-flight call.
+    # validate(text) may raise ValueError for a response that isn't usable; such a response is
+    # still returned but never cached, so the next identical request asks the model again.
+    def generate(self, prompt, model=DEFAULT_MODEL, use_cache=True, validate=None, **params):
+        if not use_cache:
+            return self._call(model, prompt, params)
+
+        key = cache_key(model, prompt, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self._count("deduplicated")
+            return future.result()
+
+        try:
+            # A previous leader may have filled the cache between our lookup and now
+            text = self.cache.get(key)
+            if text is not None:
+                self._count("hits")
+                future.set_result(text)
+                return text
+            self._count("misses")
+            try:
+                text = self._call(model, prompt, params)
+            except ServiceUnavailableError:
+                text = self._stale(key)
+                if text is None:
+                    raise
+                future.set_result(text)
+                return text
+            if _is_valid(validate, text):
+                self.cache.set(key, text, self.ttl)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _open_stream(self, model, prompt, params):
+        events = iter(self.client.generate_stream(model=model, prompt=prompt, **params))
+        return events, next(events, None)
+
+    # Function to stream generated text chunk by chunk; a cache hit arrives as one chunk.
+    # Only opening the stream is retried: once text has been shown it can't be taken back.
+    def generate_stream(self, prompt, model=DEFAULT_MODEL, use_cache=True, **params):
+        key = cache_key(model, prompt, params)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("hits")
+                yield cached
+                return
+            self._count("misses")
+        self._count("calls")
+        parts = []
+        span_start = time.perf_counter()
+        with get_metrics().span("llm.stream", model=model) as span:
+            try:
+                events, first = self._guarded(lambda: self._open_stream(model, prompt, params))
+            except ServiceUnavailableError:
+                stale = self._stale(key) if use_cache else None
+                if stale is None:
+                    raise
+                span["stale"] = True
+                yield stale
+                return
+            for event in itertools.chain([first] if first is not None else [], events):
+                if getattr(event, "event_type", None) == "text-generation":
+                    if not parts:
+                        span["first_token_ms"] = round((time.perf_counter() - span_start) * 1000, 2)
+                    parts.append(event.text)
+                    yield event.text
+        self._count_tokens(prompt, "".join(parts))
+        # Only a stream that ran to the end is cached
+        if use_cache:
+            self.cache.set(key, "".join(parts).strip(), self.ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.deduplicated
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "deduplicated": self.deduplicated,
+            "stale_hits": self.stale_hits,
+            "api_calls": self.calls,
+            "hit_rate": round((self.hits + self.deduplicated) / lookups, 3) if lookups else 0.0,
+            "cached_entries": len(self.cache),
+        }
+
+
+def _is_valid(validate, text):
+    if validate is None:
+        return True
+    try:
+        validate(text)
+    except ValueError:
+        return False
+    return True
+
+
+# Function to build the cache backend selected by NUTRIVISION_LLM_CACHE
+def cache_from_env():
+    backend = os.getenv("NUTRIVISION_LLM_CACHE", "memory").lower()
+    max_entries = int(os.getenv("NUTRIVISION_LLM_CACHE_ENTRIES", "2048"))
+    if backend == "sqlite":
+        path = os.getenv("NUTRIVISION_LLM_CACHE_PATH") or os.path.join(
+            os.path.expanduser("~"), ".cache", "nutrivision", "llm_cache.sqlite3"
+        )
+        return SQLiteCacheBackend(path, max_entries)
+    if backend == "memory":
+        return MemoryCacheBackend(max_entries)
+    raise ValueError(f"Unknown NUTRIVISION_LLM_CACHE {backend!r}, expected memory or sqlite")
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def _fake_llm_enabled():
+    return os.getenv("NUTRIVISION_FAKE_LLM", "").lower() in ("1", "true", "yes")
+
+
+# Function to describe why the Cohere client can't work here, or None if it is configured
+def llm_configuration_error():
+    if _fake_llm_enabled() or os.getenv("COHERE_API_KEY"):
+        return None
+    return "COHERE_API_KEY is not set, so the AI features of this page are unavailable."
+
+
+# Function to build the Cohere client, or the local fake when NUTRIVISION_FAKE_LLM is set
+def client_from_env():
+    if _fake_llm_enabled():
+        from nutrivision.fakes import FakeCohereClient
+        return FakeCohereClient(latency_ms=float(os.getenv("NUTRIVISION_FAKE_LLM_LATENCY_MS", "200")))
+    import cohere
+    return cohere.Client(os.getenv("COHERE_API_KEY"), timeout=float(os.getenv("NUTRIVISION_LLM_TIMEOUT", "60")))
+
+
+# Function to get the process-wide gateway around the Cohere client.
+# The client itself (and the cohere import) is only built on the first model call.
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                from nutrivision.resilience import get_policy
+                from nutrivision.startup import LazyClient
+
+                _gateway = LLMGateway(
+                    LazyClient(client_from_env),
+                    cache=cache_from_env(),
+                    ttl=float(os.getenv("NUTRIVISION_LLM_CACHE_TTL", str(24 * 3600))),
+                    policy=get_policy("llm"),
+                )
+    return _gateway
@@ -0,0 +1,367 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+# MACROS comes from db rather than intake, which would pull in pandas
+from nutrivision.db import MACROS, MealPlan, PlannedMeal, get_database
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+MEALS = ("breakfast", "lunch", "dinner")
+
+PLAN_PROMPT = """
+    Plan meals based on the following preferences and constraints:
+    Dietary Preferences: {preferences}
+    Allergies (never use these): {allergies}
+    Available Ingredients: {ingredients}
+    Day: {day}
+    Meals to plan: {meals}
+    Do not repeat these recipes: {avoid}
+
+    Respond with JSON only, in this shape, with one entry per meal to plan:
+    {{"meals": [{{"meal": "breakfast", "recipe": "Recipe name", "ingredients": ["ingredient", "..."],
+    "calories": 0, "protein": 0, "fat": 0, "carbs": 0}}]}}
+    Calories in kcal; protein, fat and carbs in grams.
+    """
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class PlanValidationError(ValueError):
+    pass
+
+
+# Function to normalize a comma-separated input so order, case and spacing don't matter
+def normalize_items(text):
+    items = {" ".join(item.lower().split()) for item in (text or "").split(",")}
+    return ", ".join(sorted(item for item in items if item))
+
+
+# Function to build the key under which plans for the same inputs are stored and reused
+def plan_inputs_key(preferences, allergies, ingredients):
+    payload = json.dumps(
+        [" ".join((preferences or "").lower().split()), normalize_items(allergies), normalize_items(ingredients)]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Function to find the first JSON object in a model response
+def parse_json_block(text):
+    start, stop = text.find("{"), text.rfind("}")
+    if start < 0 or stop <= start:
+        raise PlanValidationError("response contains no JSON object")
+    try:
+        return json.loads(text[start:stop + 1])
+    except json.JSONDecodeError as e:
+        raise PlanValidationError(f"response is not valid JSON: {e}") from e
+
+
+def _number(value, field):
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        match = _NUMBER_RE.search(str(value or ""))
+        if not match:
+            raise PlanValidationError(f"{field} is not a number: {value!r}")
+        number = float(match.group())
+    if number < 0:
+        raise PlanValidationError(f"{field} is negative: {value!r}")
+    return number
+
+
+# Function to find allergens named in a recipe or its ingredients. Allergens match as whole
+# words, singular or plural, or fused with butter/oil ("peanuts" matches "peanut butter" and
+# "peanutbutter"), but not inside other words ("eggs" vs "eggplant", "nuts" vs "nutmeg") or
+# when marked free of them ("peanut-free granola").
+def allergy_violations(recipe, ingredients, allergies):
+    text = " ".join([recipe, *ingredients]).lower()
+    violations = []
+    for allergy in normalize_items(allergies).split(", "):
+        stem = allergy[:-1] if allergy.endswith("s") and len(allergy) > 3 else allergy
+        if stem and re.search(rf"\b{re.escape(stem)}(?:s|butter|oil)?\b(?![- ]?free\b)", text):
+            violations.append(allergy)
+    return violations
+
+
+# Function to check a parsed response and turn it into {meal: {recipe, ingredients, macros...}}
+def validate_meals(data, expected_meals, allergies=""):
+    meals = data.get("meals") if isinstance(data, dict) else data
+    if not isinstance(meals, list):
+        raise PlanValidationError("'meals' must be a list")
+    result = {}
+    for entry in meals:
+        if not isinstance(entry, dict):
+            raise PlanValidationError("each meal must be an object")
+        meal = str(entry.get("meal", "")).strip().lower()
+        if meal not in expected_meals:
+            raise PlanValidationError(f"unexpected meal {meal!r}")
+        recipe = str(entry.get("recipe") or "").strip()
+        if not recipe:
+            raise PlanValidationError(f"{meal} has no recipe name")
+        ingredients = entry.get("ingredients") or []
+        if isinstance(ingredients, str):
+            ingredients = ingredients.split(",")
+        ingredients = [str(item).strip() for item in ingredients if str(item).strip()]
+        if not ingredients:
+            raise PlanValidationError(f"{meal} has no ingredients")
+        violations = allergy_violations(recipe, ingredients, allergies)
+        if violations:
+            raise PlanValidationError(f"{meal} contains allergens: {', '.join(violations)}")
+        result[meal] = {
+            "recipe": recipe,
+            "ingredients": ingredients,
+            **{macro: _number(entry.get(macro), f"{meal} {macro}") for macro in MACROS},
+        }
+    missing = [meal for meal in expected_meals if meal not in result]
+    if missing:
+        raise PlanValidationError(f"missing meals: {', '.join(missing)}")
+    return result
+
+
+# Function to build the prompt for some meals of one day
+def plan_prompt(inputs, day, meals, avoid=()):
+    return PLAN_PROMPT.format(
+        preferences=inputs["preferences"] or "none",
+        allergies=inputs["allergies"] or "none",
+        ingredients=inputs["ingredients"] or "any",
+        day=DAYS[day],
+        meals=", ".join(meals),
+        avoid=", ".join(sorted(avoid)) or "none",
+    )
+
+
+# Function to ask the model for some meals of one day and validate the answer.
+# A response that fails validation is never cached, so it is simply asked for again,
+# up to `attempts` times. Rate limits and retries of failed calls are the gateway's call policy's job.
+def generate_meals(llm, inputs, day, meals=MEALS, avoid=(), use_cache=True, attempts=3):
+    prompt = plan_prompt(inputs, day, meals, avoid)
+
+    def validate(text):
+        return validate_meals(parse_json_block(text), meals, inputs["allergies"])
+
+    error = None
+    for attempt in range(attempts):
+        text = llm.generate(prompt=prompt, max_tokens=600, temperature=0.7, use_cache=use_cache, validate=validate)
+        try:
+            return validate(text)
+        except PlanValidationError as e:
+            error = e
+    raise PlanValidationError(f"{DAYS[day]}: no valid plan after {attempts} attempts ({error})")
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Function to get the stored plan for these inputs, creating an empty one if there is none.
+# Returns (plan_id, inputs) where inputs holds the normalized preferences/allergies/ingredients.
+def get_or_create_plan(preferences, allergies, ingredients):
+    key = plan_inputs_key(preferences, allergies, ingredients)
+    inputs = {
+        "preferences": (preferences or "").strip(),
+        "allergies": normalize_items(allergies),
+        "ingredients": normalize_items(ingredients),
+    }
+    database = get_database()
+    with database.engine.connect() as conn:
+        plan_id = conn.execute(select(MealPlan.id).where(MealPlan.inputs_key == key)).scalar()
+    if plan_id is not None:
+        return plan_id, inputs
+    try:
+        with database.engine.begin() as conn:
+            plan_id = conn.execute(
+                insert(MealPlan).values(inputs_key=key, created_at=_now(), **inputs)
+            ).inserted_primary_key[0]
+    except IntegrityError:
+        # Another session created the same plan first
+        with database.engine.connect() as conn:
+            plan_id = conn.execute(select(MealPlan.id).where(MealPlan.inputs_key == key)).scalar()
+    return plan_id, inputs
+
+
+# Function to load a plan's inputs
+def plan_inputs(plan_id):
+    with get_database().engine.connect() as conn:
+        row = conn.execute(
+            select(MealPlan.preferences, MealPlan.allergies, MealPlan.ingredients).where(MealPlan.id == plan_id)
+        ).one()
+    return {"preferences": row.preferences, "allergies": row.allergies, "ingredients": row.ingredients}
+
+
+# Function to load a plan as {day index: {meal: {recipe, ingredients, macros...}}}
+def load_plan(plan_id):
+    with get_database().engine.connect() as conn:
+        rows = conn.execute(select(PlannedMeal).where(PlannedMeal.plan_id == plan_id)).all()
+    plan = {}
+    for row in rows:
+        plan.setdefault(row.day, {})[row.meal] = {
+            "recipe": row.recipe,
+            "ingredients": json.loads(row.ingredients),
+            **{macro: getattr(row, macro) for macro in MACROS},
+        }
+    return plan
+
+
+# Function to store meals for one day of a plan, replacing what was in those slots
+def save_meals(plan_id, day, meals):
+    now = _now()
+    with get_database().engine.begin() as conn:
+        conn.execute(delete(PlannedMeal).where(
+            PlannedMeal.plan_id == plan_id, PlannedMeal.day == day, PlannedMeal.meal.in_(list(meals))
+        ))
+        conn.execute(insert(PlannedMeal), [
+            {
+                "plan_id": plan_id, "day": day, "meal": meal, "recipe": values["recipe"],
+                "ingredients": json.dumps(values["ingredients"], ensure_ascii=False),
+                "generated_at": now, **{macro: values[macro] for macro in MACROS},
+            }
+            for meal, values in meals.items()
+        ])
+
+
+# Function to list the recipes planned on days other than `day`
+def _recipes_elsewhere(plan, day=None):
+    return {values["recipe"] for other, meals in plan.items() if other != day for values in meals.values()}
+
+
+# Function to get the days of a plan that are missing or incomplete
+def missing_days(plan):
+    return [day for day in range(len(DAYS)) if set(plan.get(day, {})) != set(MEALS)]
+
+
+# Function to list (day, meal) slots whose recipe already appears earlier in the week
+def find_repeats(plan):
+    seen = set()
+    repeats = []
+    for day in sorted(plan):
+        for meal in MEALS:
+            values = plan[day].get(meal)
+            if values is None:
+                continue
+            recipe = values["recipe"].strip().lower()
+            if recipe in seen:
+                repeats.append((day, meal))
+            seen.add(recipe)
+    return repeats
+
+
+# Function to list (day, meal, problem) for every slot of a plan that is missing,
+# repeats an earlier day's recipe or contains one of the allergies
+def plan_problems(plan, allergies):
+    problems = [(day, meal, "repeats an earlier recipe") for day, meal in find_repeats(plan)]
+    for day in range(len(DAYS)):
+        for meal in MEALS:
+            values = plan.get(day, {}).get(meal)
+            if values is None:
+                problems.append((day, meal, "is missing"))
+                continue
+            for allergy in allergy_violations(values["recipe"], values["ingredients"], allergies):
+                problems.append((day, meal, f"contains {allergy}"))
+    return problems
+
+
+# Function to check a whole plan against cross-day constraints; returns a list of problems
+def check_plan(plan, allergies):
+    return [f"{DAYS[day]} {meal} {problem}" for day, meal, problem in plan_problems(plan, allergies)]
+
+
+# Worker threads for parallel plan generation
+PLAN_WORKERS = int(os.getenv("NUTRIVISION_PLAN_WORKERS", "4"))
+
+
+def _generate_days_parallel(llm, plan_id, inputs, plan, days, on_day, workers):
+    # Days don't see each other's recipes while they run; repeats are fixed up afterwards
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meal-plan") as executor:
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run, generate_meals, llm, inputs, day,
+                avoid=_recipes_elsewhere(plan, day),
+            ): day
+            for day in days
+        }
+        try:
+            # Results are saved and reported on the calling thread, in completion order
+            for future in as_completed(futures):
+                day = futures[future]
+                meals = future.result()
+                save_meals(plan_id, day, meals)
+                plan[day] = meals
+                if on_day:
+                    on_day(day, meals)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+# Function to fill in the missing days of the plan for these inputs. A complete stored plan
+# costs no model calls. Days are generated concurrently on a bounded pool when parallel is set,
+# otherwise one after another; on_day(day, meals) is called for each stored day straight away
+# and for each new day as it is ready.
+def build_plan(llm, preferences, allergies, ingredients, on_day=None, parallel=False, workers=PLAN_WORKERS,
+               max_fix_rounds=2):
+    plan_id, inputs = get_or_create_plan(preferences, allergies, ingredients)
+    plan = load_plan(plan_id)
+    if on_day:
+        for day, meals in sorted(plan.items()):
+            on_day(day, meals)
+    days = missing_days(plan)
+    if parallel and len(days) > 1:
+        _generate_days_parallel(llm, plan_id, inputs, plan, days, on_day, workers)
+    else:
+        for day in days:
+            meals = generate_meals(llm, inputs, day, avoid=_recipes_elsewhere(plan, day))
+            save_meals(plan_id, day, meals)
+            plan[day] = meals
+            if on_day:
+                on_day(day, meals)
+
+    # Regenerate the slots check_plan objects to (repeats keep their first occurrence),
+    # including those of a stored plan saved before the check existed
+    for _ in range(max_fix_rounds):
+        slots = {}
+        for day, meal, problem in plan_problems(plan, inputs["allergies"]):
+            slots.setdefault(day, set()).add(meal)
+        if not slots:
+            break
+        for day, failing in sorted(slots.items()):
+            meals = generate_meals(
+                llm, inputs, day, meals=tuple(meal for meal in MEALS if meal in failing),
+                avoid=_recipes_elsewhere(plan), use_cache=False,
+            )
+            save_meals(plan_id, day, meals)
+            plan.setdefault(day, {}).update(meals)
+            if on_day:
+                on_day(day, plan[day])
+    return plan_id, plan
+
+
+# Function to replace one day of a plan with freshly generated meals
+def regenerate_day(llm, plan_id, day):
+    plan = load_plan(plan_id)
+    meals = generate_meals(llm, plan_inputs(plan_id), day, avoid=_recipes_elsewhere(plan), use_cache=False)
+    save_meals(plan_id, day, meals)
+    plan[day] = meals
+    return plan
+
+
+# Function to replace a single meal of a plan, leaving the other meals alone
+def regenerate_meal(llm, plan_id, day, meal):
+    plan = load_plan(plan_id)
+    meals = generate_meals(
+        llm, plan_inputs(plan_id), day, meals=(meal,), avoid=_recipes_elsewhere(plan), use_cache=False
+    )
+    save_meals(plan_id, day, meals)
+    plan.setdefault(day, {}).update(meals)
+    return plan
+
+
+# Function to total a day's macros
+def day_totals(meals):
+    return {macro: round(sum(values[macro] for values in meals.values()), 1) for macro in MACROS}
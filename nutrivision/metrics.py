@@ -0,0 +1,269 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Recent samples kept per series for exact p50/p95/p99
+SAMPLE_WINDOW = 2048
+
+# The page whose script run is doing the work; copied into worker threads with copy_context()
+current_page = contextvars.ContextVar("nutrivision_page", default="")
+
+
+# Function to compute a percentile from a list of samples
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for index, bound in enumerate(BUCKETS_MS):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+
+    def percentiles(self):
+        samples = list(self.recent)
+        return {f"p{pct}_ms": round(percentile(samples, pct), 2) for pct in (50, 95, 99)}
+
+
+def _labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+# Function to escape a label value as the Prometheus text format requires
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    escaped = (f'{key}="{_escape_label(value)}"' for key, value in pairs)
+    return "{" + ",".join(escaped) + "}" if pairs else ""
+
+
+class Metrics:
+    # Span latency histograms and counters, labeled by page, exported as Prometheus text
+    # and optionally appended to a JSONL trace (one line per span).
+    def __init__(self, trace_path=None, recent_spans=200):
+        self.trace_path = trace_path
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._trace_lock = threading.Lock()
+        self.recent = deque(maxlen=recent_spans)
+
+    def _labels(self, labels):
+        labels.setdefault("page", current_page.get() or "background")
+        return _labels_key(labels)
+
+    def observe(self, name, value_ms, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value_ms)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    # Function to time a block as one span. The yielded dict can carry extra fields for the trace;
+    # an exception marks the span as an error and is re-raised.
+    @contextmanager
+    def span(self, name, **labels):
+        fields = {}
+        status = "ok"
+        start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield fields
+        except GeneratorExit:
+            # A stream the reader stopped consuming
+            status = "cancelled"
+            raise
+        except BaseException as e:
+            status = "error"
+            fields["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            labels.setdefault("page", current_page.get() or "background")
+            self.observe(name, duration_ms, status=status, **labels)
+            if status == "error":
+                self.increment("errors", span=name, **labels)
+            event = dict(labels, span=name, status=status, ts=round(started_at, 3),
+                         duration_ms=round(duration_ms, 2), thread=threading.current_thread().name, **fields)
+            self.recent.append(event)
+            self._trace(event)
+
+    def _trace(self, event):
+        if not self.trace_path:
+            return
+        line = json.dumps(event, default=str) + "\n"
+        with self._trace_lock:
+            with open(self.trace_path, "a", encoding="utf-8") as trace:
+                trace.write(line)
+
+    # Function to get one row per span series with counts and p50/p95/p99, optionally for one page
+    def summary(self, page=None):
+        with self._lock:
+            items = [(name, dict(labels), histogram) for (name, labels), histogram in self._histograms.items()]
+            rows = [
+                dict(span=name, **labels, count=histogram.count, **histogram.percentiles())
+                for name, labels, histogram in items
+                if page is None or labels.get("page") == page
+            ]
+        return sorted(rows, key=lambda row: (row.get("page", ""), row["span"]))
+
+    def counters(self, page=None):
+        with self._lock:
+            rows = [dict(counter=name, **dict(labels), value=value) for (name, labels), value in self._counters.items()]
+        return [row for row in rows if page is None or row.get("page") == page]
+
+    # Function to get the cache hit rate per cache from the cache_requests counters
+    def hit_rates(self):
+        totals = {}
+        for row in self.counters():
+            if row["counter"] == "cache_requests":
+                hits, lookups = totals.get(row["cache"], (0, 0))
+                hit = row["result"] in ("hit", "negative_hit", "shared")
+                totals[row["cache"]] = (hits + row["value"] * hit, lookups + row["value"])
+        return {cache: round(hits / lookups, 3) for cache, (hits, lookups) in totals.items() if lookups}
+
+    # Function to render everything in the Prometheus text exposition format
+    def prometheus_text(self, prefix="nutrivision"):
+        with self._lock:
+            histograms = [(name, labels, histogram.buckets[:], histogram.count, histogram.sum, histogram.percentiles())
+                          for (name, labels), histogram in self._histograms.items()]
+            counters = list(self._counters.items())
+        lines = [
+            f"# HELP {prefix}_span_ms Duration of instrumented spans in milliseconds",
+            f"# TYPE {prefix}_span_ms histogram",
+        ]
+        for name, labels, buckets, count, total, _ in sorted(histograms):
+            pairs = (("span", name),) + labels
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS_MS, buckets):
+                cumulative += bucket
+                lines.append(f"{prefix}_span_ms_bucket{_format_labels(pairs + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{prefix}_span_ms_bucket{_format_labels(pairs + (('le', '+Inf'),))} {count}")
+            lines.append(f"{prefix}_span_ms_sum{_format_labels(pairs)} {total:.3f}")
+            lines.append(f"{prefix}_span_ms_count{_format_labels(pairs)} {count}")
+        lines += [
+            f"# HELP {prefix}_span_recent_ms Percentiles of the last {SAMPLE_WINDOW} samples of each span",
+            f"# TYPE {prefix}_span_recent_ms summary",
+        ]
+        for name, labels, _, _, _, percentiles in sorted(histograms):
+            for pct in (50, 95, 99):
+                pairs = (("span", name),) + labels + (("quantile", str(pct / 100)),)
+                lines.append(f"{prefix}_span_recent_ms{_format_labels(pairs)} {percentiles[f'p{pct}_ms']}")
+        for counter in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {prefix}_{counter}_total counter")
+            for (name, labels), value in sorted(counters):
+                if name == counter:
+                    lines.append(f"{prefix}_{counter}_total{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Function to record SQL statement times for an engine as db.query spans (without the trace).
+# The start time rides on the statement's execution context, so a statement that fails
+# (and never reaches after_cursor_execute) leaves nothing behind on the pooled connection.
+def instrument_engine(engine, metrics=None):
+    from sqlalchemy import event
+
+    def observe(context, statement, status):
+        start = getattr(context, "_nutrivision_query_start", None)
+        if start is None:
+            return
+        verb = statement.lstrip().split(" ", 1)[0].upper()
+        (metrics or get_metrics()).observe(
+            "db.query", (time.perf_counter() - start) * 1000, statement=verb, status=status,
+        )
+
+    def on_before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._nutrivision_query_start = time.perf_counter()
+
+    def on_after(conn, cursor, statement, parameters, context, executemany):
+        observe(context, statement, "ok")
+
+    def on_error(exception_context):
+        if exception_context.execution_context is not None and exception_context.statement:
+            observe(exception_context.execution_context, exception_context.statement, "error")
+
+    event.listen(engine, "before_cursor_execute", on_before)
+    event.listen(engine, "after_cursor_execute", on_after)
+    event.listen(engine, "handle_error", on_error)
+
+
+# Function to serve /metrics in Prometheus text format from a daemon thread
+def start_metrics_server(port, metrics=None, host="0.0.0.0"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = (metrics or get_metrics()).prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+# Function to get the process-wide metrics. NUTRIVISION_TRACE_PATH turns on the JSONL trace
+# and NUTRIVISION_METRICS_PORT serves /metrics on that port.
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                metrics = Metrics(trace_path=os.getenv("NUTRIVISION_TRACE_PATH") or None)
+                port = os.getenv("NUTRIVISION_METRICS_PORT")
+                if port:
+                    try:
+                        start_metrics_server(int(port), metrics)
+                    except OSError:
+                        # Another server process already holds the port
+                        pass
+                _metrics = metrics
+    return _metrics
+
+
+# Function to time a block as a span on the process-wide metrics
+def span(name, **labels):
+    return get_metrics().span(name, **labels)
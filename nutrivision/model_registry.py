@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+
+# Hugging Face models used by the image classification page
+MODEL_IDS = {
+    "food_classification_v1": "Kaludi/Food-Classification",
+    "food_classification_v2": "Kaludi/food-category-classification-v2.0",
+}
+
+
+# Function to read the resident memory of this process in bytes
+def resident_memory_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is a high-water mark in KiB on Linux, good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Function to load an eager PyTorch image-classification pipeline
+def load_pipeline(model_id):
+    from transformers import pipeline, AutoImageProcessor, AutoModelForImageClassification
+
+    processor = AutoImageProcessor.from_pretrained(model_id)
+    model = AutoModelForImageClassification.from_pretrained(model_id)
+    model.eval()
+    return pipeline("image-classification", model=model, image_processor=processor)
+
+
+# Function to turn a batch of logits into pipeline-shaped [{"label", "score"}] lists
+def top_k_labels(logits, id2label, top_k=5):
+    scores, ids = logits.softmax(-1).topk(min(top_k, logits.shape[-1]), dim=-1)
+    return [
+        [{"label": id2label[int(i)], "score": float(score)} for score, i in zip(row_scores, row_ids)]
+        for row_scores, row_ids in zip(scores, ids)
+    ]
+
+
+# Function to count the bytes held by a model's parameters and buffers
+def parameter_bytes(model):
+    total = 0
+    for tensors in (getattr(model, "parameters", None), getattr(model, "buffers", None)):
+        if tensors is None:
+            continue
+        for tensor in tensors():
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class LoadedModel:
+    def __init__(self, name, model_id, pipe, load_seconds, rss_delta_bytes):
+        self.name = name
+        self.model_id = model_id
+        self.pipeline = pipe
+        self.model = getattr(pipe, "model", None)
+        self.processor = getattr(pipe, "image_processor", None) or getattr(pipe, "feature_extractor", None)
+        self.load_seconds = load_seconds
+        self.rss_delta_bytes = rss_delta_bytes
+        self.param_bytes = parameter_bytes(self.model)
+        self.calls = 0
+        # Pipelines keep per-call state, so inference is serialized per model
+        self._lock = threading.Lock()
+
+    def __call__(self, images, **kwargs):
+        with self._lock:
+            self.calls += 1
+            return self.pipeline(images, **kwargs)
+
+    # True when the model can run on pixel_values prepared outside the pipeline
+    @property
+    def supports_tensors(self):
+        return self.model is not None and self.processor is not None
+
+    # Function to classify a preprocessed batch, returning pipeline-shaped results
+    def forward(self, pixel_values, top_k=5):
+        import torch
+
+        # Eval-mode forward passes don't mutate module state, so no lock is needed here
+        with torch.inference_mode():
+            logits = self.model(pixel_values=pixel_values).logits
+        with self._lock:
+            self.calls += 1
+        return top_k_labels(logits, self.model.config.id2label, top_k)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "model_id": self.model_id,
+            "load_seconds": round(self.load_seconds, 3),
+            "rss_delta_mb": round(self.rss_delta_bytes / 2**20, 1),
+            "param_mb": round(self.param_bytes / 2**20, 1),
+            "calls": self.calls,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, model_ids, loader=load_pipeline):
+        self.model_ids = dict(model_ids)
+        self.loader = loader
+        self._models = {}
+        self._errors = {}
+        self._locks = {name: threading.Lock() for name in self.model_ids}
+        self._preload_thread = None
+
+    # Function to get a model, loading it on first use
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self.model_ids:
+            raise KeyError(f"Unknown model: {name}")
+        with self._locks[name]:
+            # Another session may have finished loading while we waited
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name)
+            return model
+
+    def _load(self, name):
+        model_id = self.model_ids[name]
+        rss_before = resident_memory_bytes()
+        start = time.perf_counter()
+        try:
+            pipe = self.loader(model_id)
+        except Exception as e:
+            self._errors[name] = e
+            raise
+        load_seconds = time.perf_counter() - start
+        rss_delta = max(resident_memory_bytes() - rss_before, 0)
+        model = LoadedModel(name, model_id, pipe, load_seconds, rss_delta)
+        self._models[name] = model
+        self._errors.pop(name, None)
+        return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    # Function to load every registered model, optionally on a background thread
+    def preload(self, background=True):
+        def load_all():
+            for name in self.model_ids:
+                try:
+                    self.get(name)
+                except Exception:
+                    # The error is kept in _errors and raised again on first real use
+                    pass
+
+        if not background:
+            load_all()
+            return None
+        if self._preload_thread is None or not self._preload_thread.is_alive():
+            self._preload_thread = threading.Thread(target=load_all, name="model-preload", daemon=True)
+            self._preload_thread.start()
+        return self._preload_thread
+
+    def stats(self):
+        rows = []
+        for name, model_id in self.model_ids.items():
+            model = self._models.get(name)
+            if model is not None:
+                rows.append(model.stats())
+            else:
+                error = self._errors.get(name)
+                rows.append({
+                    "name": name,
+                    "model_id": model_id,
+                    "status": f"failed: {error}" if error else "not loaded",
+                })
+        return rows
+
+
+# Function to load a model with the backend picked by NUTRIVISION_BACKEND
+def load_with_configured_backend(model_id):
+    from nutrivision.backends import loader_from_env
+    return loader_from_env()(model_id)
+
+
+# One registry per server process, shared by every session
+registry = ModelRegistry(MODEL_IDS, loader=load_with_configured_backend)
+
+
+# Function to start loading the models when the server starts, if enabled
+def preload_if_enabled():
+    if os.getenv("NUTRIVISION_PRELOAD_MODELS", "").lower() in ("1", "true", "yes"):
+        registry.preload(background=True)
@@ -0,0 +1,62 @@
+import io
+import json
+
+# Processor config keys that don't change the pixels fed to the model
+_IGNORED_PROCESSOR_KEYS = {"processor_class", "_processor_class", "image_processor_type", "feature_extractor_type"}
+
+
+# Function to decode an upload once, letting the JPEG decoder downscale while it decodes
+def decode_image(image_bytes, target_size=None):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    if target_size:
+        # draft() picks the largest DCT scale (1/2, 1/4, 1/8) that stays >= target_size
+        if image.format == "JPEG":
+            image.draft("RGB", target_size)
+        image.load()
+        # For formats without draft support, reduce() is a cheap integer box downscale
+        factor = min(image.width // target_size[0], image.height // target_size[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+    return image.convert("RGB")
+
+
+# Function to get the input size an image processor resizes to
+def processor_target_size(processor):
+    size = getattr(processor, "crop_size", None) if getattr(processor, "do_center_crop", False) else None
+    size = size or getattr(processor, "size", None) or {}
+    if "height" in size and "width" in size:
+        return size["width"], size["height"]
+    edge = size.get("shortest_edge") or size.get("longest_edge") or 224
+    return edge, edge
+
+
+# Function to describe everything about a processor that affects its output
+def processor_signature(processor):
+    config = {key: value for key, value in processor.to_dict().items() if key not in _IGNORED_PROCESSOR_KEYS}
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+class SharedPreprocessor:
+    # Groups models whose processors would produce identical tensors, so each
+    # group's resize/normalize runs once and every model reads the same buffer
+    def __init__(self, processors):
+        self.processors = dict(processors)
+        self.groups = {}
+        for name, processor in self.processors.items():
+            self.groups.setdefault(processor_signature(processor), []).append(name)
+
+    def target_size(self):
+        sizes = [processor_target_size(processor) for processor in self.processors.values()]
+        return max(w for w, _ in sizes), max(h for _, h in sizes)
+
+    # Function to turn a batch of images into {model_name: pixel_values}
+    def __call__(self, images):
+        pixel_values = {}
+        for names in self.groups.values():
+            processor = self.processors[names[0]]
+            tensor = processor(images, return_tensors="pt")["pixel_values"]
+            for name in names:
+                pixel_values[name] = tensor
+        return pixel_values
@@ -0,0 +1,104 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nutrivision.timing import elapsed_ms
+
+DISH_NAME_PREFIX = "Dish name:"
+
+# One generation returns both the dish name and the recipe, so no second LLM call is needed
+STRUCTURED_RECIPE_PROMPT = (
+    "Generate a recipe with the following ingredients: {ingredients}\n"
+    "Start your answer with exactly one line of the form '" + DISH_NAME_PREFIX + " <name of the dish>' "
+    "and then write the recipe."
+)
+
+DISH_NAME_PROMPT = (
+    "Extract the name of the dish from the following recipe text, "
+    "output only name of the dish nothing else!: {recipe}"
+)
+
+# Shared by all sessions for side lookups that overlap with streaming
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="recipe-flow")
+
+
+class RecipeRun:
+    # Everything one "Generate Recipe" click produces, filled in as the stream arrives
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.dish_name = None
+        self.video_future = None
+        self.timings = {}
+
+
+# Function to split a "Dish name: ..." header line off a generated recipe
+def split_dish_name(text):
+    header, _, body = text.strip().partition("\n")
+    if header.lower().startswith(DISH_NAME_PREFIX.lower()):
+        name = header[len(DISH_NAME_PREFIX):].strip().strip("*#\"' ")
+        return name or None, body.strip()
+    return None, text.strip()
+
+
+# Function to stream a recipe while extracting the dish name from its first line.
+# As soon as the name is known, search_video(name) starts on the shared executor so
+# the lookup overlaps with the rest of the recipe streaming in.
+def stream_recipe(llm, ingredients, run, search_video=None, executor=None):
+    executor = executor or _executor
+
+    def on_dish_name(name):
+        run.dish_name = name
+        run.timings["dish_name_ms"] = elapsed_ms(run.started_at)
+        if search_video is not None:
+            # The copied context keeps the lookup's spans labeled with the calling page
+            run.video_future = executor.submit(contextvars.copy_context().run, _timed_search, search_video, name, run)
+
+    chunks = llm.generate_stream(
+        model='command-xlarge-nightly',
+        prompt=STRUCTURED_RECIPE_PROMPT.format(ingredients=ingredients),
+        max_tokens=512,
+        temperature=0.7,
+    )
+    buffer = ""
+    header_done = False
+    for chunk in chunks:
+        if "first_token_ms" not in run.timings:
+            run.timings["first_token_ms"] = elapsed_ms(run.started_at)
+        if header_done:
+            yield chunk
+            continue
+        buffer += chunk
+        stripped = buffer.lstrip()
+        if "\n" not in stripped:
+            continue
+        header_done = True
+        name, body = split_dish_name(stripped)
+        if name:
+            on_dish_name(name)
+            yield body
+        else:
+            yield stripped
+    if not header_done and buffer:
+        name, body = split_dish_name(buffer)
+        if name:
+            on_dish_name(name)
+        yield body
+    run.timings["generation_ms"] = elapsed_ms(run.started_at)
+
+
+# Function to ask the model for the dish name of a recipe that didn't start with one
+def extract_dish_name(llm, recipe_text):
+    return llm.generate(
+        model='command-xlarge-nightly',
+        prompt=DISH_NAME_PROMPT.format(recipe=recipe_text),
+        max_tokens=50,
+        temperature=0.7
+    )
+
+
+def _timed_search(search_video, query, run):
+    start = time.perf_counter()
+    try:
+        return search_video(query + " cooking")
+    finally:
+        run.timings["video_search_ms"] = elapsed_ms(start)
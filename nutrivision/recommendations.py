@@ -0,0 +1,41 @@
+import os
+
+from nutrivision.context_builder import ContextBuilder, count_tokens
+from nutrivision.favorites import context_candidates
+from nutrivision.vector_index import nearest_favorites
+
+# How many of the closest favorites to show the model
+RETRIEVAL_K = int(os.getenv("NUTRIVISION_RETRIEVAL_K", "8"))
+
+RECOMMEND_PROMPT = """
+    Based on the following preferences and past favorite recipes, recommend new recipes.
+    Preferences: {preferences}
+
+    Favorite Recipes:
+    {favorites}
+
+    Recommended Recipes:
+    """
+
+
+# Function to recommend recipes for some preferences. Only the k favorites nearest to the
+# preferences go into the prompt, within the context builder's token budget.
+# Returns (recommendations, prompt size report).
+def recommend_recipes(llm, preferences, context_builder=None, k=RETRIEVAL_K):
+    context_builder = context_builder or ContextBuilder()
+    favorite_ids = nearest_favorites(preferences, k)
+    if favorite_ids:
+        favorites = context_candidates(favorite_ids)
+    else:
+        # Nothing to rank by (e.g. no preferences yet): the k newest, still without bodies
+        favorites = context_candidates(max_tokens=context_builder.budget)[:k]
+    context = context_builder.build(favorites)
+    prompt = RECOMMEND_PROMPT.format(preferences=preferences, favorites=context.text)
+    report = dict(context.report(), prompt_tokens=count_tokens(prompt))
+    recommendations = llm.generate(
+        model='command-xlarge-nightly',
+        prompt=prompt,
+        max_tokens=500,
+        temperature=0.7
+    )
+    return recommendations, report
@@ -0,0 +1,283 @@
+import os
+import random
+import threading
+import time
+
+
+class ServiceUnavailableError(RuntimeError):
+    # An outbound call gave up: the circuit is open, the deadline passed or retries ran out
+    def __init__(self, provider, message):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    pass
+
+
+class DeadlineExceededError(ServiceUnavailableError):
+    pass
+
+
+class RateLimiter:
+    # Token bucket: up to `burst` calls at once, refilled at `rate` calls per second
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # Function to block until a call is allowed; False if that would take longer than timeout
+    def acquire(self, timeout=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+                if timeout is not None and wait > timeout:
+                    return False
+                self.waited_seconds += wait
+            time.sleep(wait)
+            if timeout is not None:
+                timeout -= wait
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` failures in a row and fails calls fast for `reset_timeout`
+    # seconds; then one trial call is let through (half-open) and its outcome closes or reopens it.
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    # Function to check, without reserving anything, whether calls are being failed fast
+    def is_open(self):
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    # Function to check whether a call may go out now; reserves the half-open trial call
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    # Function to end a call that says nothing about the provider's health, like a rejected
+    # request or an interrupted script: frees the half-open trial without a verdict
+    def release(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+# Function to get the delay before retry number `attempt` (1-based): exponential with full jitter
+def backoff_delay(attempt, base_delay=0.5, max_delay=8.0, rng=random):
+    return rng.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+# Function to call fn, retrying failures with jittered exponential backoff.
+# Exceptions listed in give_up_on, or rejected by retry_if, are raised at once; others are
+# retried up to `retries` times, but never past `deadline` (a time.monotonic() value).
+def retry_call(fn, retries=2, base_delay=0.5, max_delay=8.0, retry_on=(Exception,), give_up_on=(), on_retry=None,
+               retry_if=None, deadline=None):
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except give_up_on:
+            raise
+        except retry_on as e:
+            attempt += 1
+            if attempt > retries or (retry_if is not None and not retry_if(e)):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            if on_retry:
+                on_retry(attempt, e, delay)
+            time.sleep(delay)
+
+
+# Function to decide whether an upstream error is worth retrying: timeouts, dropped
+# connections, 429 and 5xx. Bad requests and bad keys fail the same way every time.
+def is_transient(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "resp", None), "status", None)
+    if status is not None:
+        try:
+            status = int(status)
+        except (TypeError, ValueError):
+            return False
+        return status in (408, 425, 429) or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    return "Timeout" in name or "Connect" in name
+
+
+class CallPolicy:
+    # How calls to one provider go out: a token bucket, at most max_concurrent in flight,
+    # transient failures retried with jittered backoff inside an overall deadline, and a
+    # circuit breaker that fails fast while the provider keeps failing.
+    def __init__(self, provider, rate=5.0, burst=None, max_concurrent=8, retries=2, base_delay=0.5, max_delay=8.0,
+                 deadline_seconds=60.0, failure_threshold=5, reset_timeout=30.0):
+        self.provider = provider
+        self.limiter = RateLimiter(rate, burst)
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_seconds = deadline_seconds
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _reject(self):
+        self._count("rejected")
+        return CircuitOpenError(self.provider, "circuit open after repeated failures")
+
+    def _attempt(self, fn, deadline):
+        if self.breaker.is_open():
+            raise self._reject()
+        # Waiting for our own limits doesn't count against the provider's breaker
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not self.limiter.acquire(timeout=remaining):
+            raise DeadlineExceededError(self.provider, "deadline passed waiting for the rate limit")
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise DeadlineExceededError(self.provider, f"deadline passed waiting for one of {self.max_concurrent} call slots")
+        if not self.breaker.allow():
+            self._slots.release()
+            raise self._reject()
+        self._count("calls")
+        outcome = None
+        try:
+            result = fn()
+            outcome = "success"
+            return result
+        except Exception as e:
+            # Only upstream trouble counts against the breaker, not our own bad requests
+            if is_transient(e):
+                outcome = "failure"
+            raise
+        finally:
+            self._slots.release()
+            if outcome == "success":
+                self.breaker.record_success()
+            elif outcome == "failure":
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+
+    # Function to make one outbound call under this policy. Transient failures that outlast
+    # the retries or the deadline are raised as ServiceUnavailableError; other errors as they are.
+    def call(self, fn, deadline_seconds=None):
+        deadline = time.monotonic() + (deadline_seconds or self.deadline_seconds)
+        try:
+            return retry_call(
+                lambda: self._attempt(fn, deadline), retries=self.retries, base_delay=self.base_delay,
+                max_delay=self.max_delay, give_up_on=(ServiceUnavailableError,), retry_if=is_transient,
+                deadline=deadline, on_retry=lambda attempt, error, delay: self._count("retried"),
+            )
+        except ServiceUnavailableError:
+            self._count("failed")
+            raise
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            self._count("failed")
+            raise ServiceUnavailableError(self.provider, f"{type(e).__name__}: {e}") from e
+
+    def stats(self):
+        return {
+            "provider": self.provider,
+            "calls": self.calls,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected_by_breaker": self.rejected,
+            "breaker": self.breaker.state,
+            "breaker_opens": self.breaker.opens,
+            "rate_limited_s": round(self.limiter.waited_seconds, 2),
+        }
+
+
+# Per-provider defaults; every value can be overridden with NUTRIVISION_<PROVIDER>_<SETTING>
+PROVIDER_DEFAULTS = {
+    "llm": {"rate": 5.0, "max_concurrent": 8, "deadline_seconds": 90.0},
+    "youtube": {"rate": 2.0, "max_concurrent": 4, "deadline_seconds": 15.0},
+}
+
+_ENV_SETTINGS = {
+    "RATE": ("rate", float),
+    "BURST": ("burst", float),
+    "CONCURRENCY": ("max_concurrent", int),
+    "RETRIES": ("retries", int),
+    "DEADLINE_S": ("deadline_seconds", float),
+    "BREAKER_FAILURES": ("failure_threshold", int),
+    "BREAKER_RESET_S": ("reset_timeout", float),
+}
+
+
+# Function to build a provider's policy from its defaults and the environment
+def policy_from_env(provider):
+    options = dict(PROVIDER_DEFAULTS.get(provider, {}))
+    for suffix, (option, cast) in _ENV_SETTINGS.items():
+        value = os.getenv(f"NUTRIVISION_{provider.upper()}_{suffix}")
+        if value:
+            options[option] = cast(value)
+    return CallPolicy(provider, **options)
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+# Function to get the process-wide call policy for a provider ("llm" or "youtube")
+def get_policy(provider):
+    policy = _policies.get(provider)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(provider)
+            if policy is None:
+                policy = _policies[provider] = policy_from_env(provider)
+    return policy
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from nutrivision.metrics import get_metrics
+
+
+# Function to build a cache key from the raw image bytes and the model id
+def image_cache_key(image_bytes, model_id):
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    model_digest = hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16]
+    return f"{model_digest}-{digest}"
+
+
+class MemoryLRU:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskLRU:
+    # One JSON file per entry; file mtime doubles as the last-access time
+    def __init__(self, directory, max_bytes=64 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".json"))
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        data = json.dumps(value).encode("utf-8")
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        self._size = sum(entry.stat().st_size for entry in entries)
+        # Evict down to 90% so every put near the limit doesn't rescan the directory
+        target = self.max_bytes * 0.9
+        for entry in entries:
+            if self._size <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._size -= size
+            except OSError:
+                pass
+
+
+class ResultCache:
+    def __init__(self, memory_entries=1024, disk_dir=None, disk_max_bytes=64 * 2**20):
+        self.memory = MemoryLRU(memory_entries)
+        self.disk = DiskLRU(disk_dir, disk_max_bytes) if disk_dir else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        metrics = get_metrics()
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            metrics.increment("cache_requests", cache="classification", result="hit")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.disk_hits += 1
+                metrics.increment("cache_requests", cache="classification", result="hit", tier="disk")
+                self.memory.put(key, value)
+                return value
+        self.misses += 1
+        metrics.increment("cache_requests", cache="classification", result="miss")
+        return None
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    # Function to return the cached value or compute and store it
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self.memory),
+            "memory_hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+# Function to get the process-wide classification result cache
+def get_result_cache():
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    memory_entries=int(os.getenv("NUTRIVISION_RESULT_CACHE_ENTRIES", "1024")),
+                    disk_dir=os.getenv("NUTRIVISION_RESULT_CACHE_DIR") or None,
+                    disk_max_bytes=int(float(os.getenv("NUTRIVISION_RESULT_CACHE_MB", "64")) * 2**20),
+                )
+    return _result_cache
@@ -0,0 +1,133 @@
+import html
+import re
+
+from sqlalchemy import text
+
+from nutrivision.db import session_scope
+
+# Markers put around matches by the database, swapped for <mark> after HTML-escaping
+_START, _STOP = "\x02", "\x03"
+
+
+# Function to create the full-text index for the connection's database.
+# Both indexes are maintained by the database itself on every insert/update/delete.
+def create_search_index(conn):
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS favorite_recipes_fts USING fts5("
+            " name, recipe, content='favorite_recipes', content_rowid='id',"
+            " tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS favorite_recipes_fts_insert AFTER INSERT ON favorite_recipes BEGIN"
+            " INSERT INTO favorite_recipes_fts (rowid, name, recipe) VALUES (new.id, new.name, new.recipe);"
+            " END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS favorite_recipes_fts_delete AFTER DELETE ON favorite_recipes BEGIN"
+            " INSERT INTO favorite_recipes_fts (favorite_recipes_fts, rowid, name, recipe)"
+            " VALUES ('delete', old.id, old.name, old.recipe);"
+            " END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS favorite_recipes_fts_update AFTER UPDATE ON favorite_recipes BEGIN"
+            " INSERT INTO favorite_recipes_fts (favorite_recipes_fts, rowid, name, recipe)"
+            " VALUES ('delete', old.id, old.name, old.recipe);"
+            " INSERT INTO favorite_recipes_fts (rowid, name, recipe) VALUES (new.id, new.name, new.recipe);"
+            " END"
+        ))
+        # Index the rows that existed before the triggers
+        conn.execute(text("INSERT INTO favorite_recipes_fts (favorite_recipes_fts) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        # 'simple' keeps matching language-agnostic; the app has both English and Russian recipes
+        conn.execute(text(
+            "ALTER TABLE favorite_recipes ADD COLUMN IF NOT EXISTS search_vector tsvector"
+            " GENERATED ALWAYS AS ("
+            " setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||"
+            " setweight(to_tsvector('simple', coalesce(recipe, '')), 'B')) STORED"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS favorite_recipes_search_idx ON favorite_recipes USING GIN (search_vector)"
+        ))
+
+
+# Function to turn free text into an FTS5 query: every word must match, the last as a prefix
+def fts5_query(query):
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+# Function to HTML-escape a snippet and turn the match markers into <mark> tags
+def highlight_html(snippet):
+    return html.escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+class SearchResult:
+    def __init__(self, recipe_id, name, snippet, rank):
+        self.id = recipe_id
+        # name and snippet are safe HTML with matches wrapped in <mark>
+        self.name = name
+        self.snippet = snippet
+        self.rank = rank
+
+
+def _search_sqlite(session, query, limit):
+    match = fts5_query(query)
+    if match is None:
+        return []
+    # Every match is ranked: FTS5 sorts by its rank column (bm25 with names weighted 10x) itself,
+    # and highlight/snippet only run for the rows within the limit. bm25 costs a few microseconds
+    # per matching row, so terms found in most recipes take ~100 ms on 100k rows; cutting the
+    # match set down before ranking would leave better, older matches out of the results.
+    rows = session.execute(text(
+        "SELECT rowid,"
+        " highlight(favorite_recipes_fts, 0, :start, :stop),"
+        " snippet(favorite_recipes_fts, 1, :start, :stop, '…', 16),"
+        " rank"
+        " FROM favorite_recipes_fts WHERE favorite_recipes_fts MATCH :match AND rank MATCH 'bm25(10.0, 1.0)'"
+        " ORDER BY rank LIMIT :limit"
+    ), {"match": match, "start": _START, "stop": _STOP, "limit": limit}).all()
+    return [SearchResult(row[0], highlight_html(row[1]), highlight_html(row[2]), -row[3]) for row in rows]
+
+
+def _search_postgresql(session, query, limit):
+    # Every match found through the GIN index is ranked; headlines are built only for the rows we return
+    rows = session.execute(text(
+        "WITH q AS (SELECT websearch_to_tsquery('simple', :query) AS tsq),"
+        " hits AS ("
+        "  SELECT f.id, f.name, f.recipe, ts_rank_cd(f.search_vector, q.tsq) AS rank"
+        "  FROM favorite_recipes f, q WHERE f.search_vector @@ q.tsq ORDER BY rank DESC LIMIT :limit)"
+        " SELECT hits.id,"
+        "  ts_headline('simple', hits.name, q.tsq, :options),"
+        "  ts_headline('simple', hits.recipe, q.tsq, :options || ', MaxWords=30, MinWords=10'),"
+        "  hits.rank"
+        " FROM hits, q ORDER BY hits.rank DESC"
+    ), {"query": query, "limit": limit, "options": f"StartSel={_START}, StopSel={_STOP}"}).all()
+    return [SearchResult(row[0], highlight_html(row[1]), highlight_html(row[2]), row[3]) for row in rows]
+
+
+def _search_fallback(session, query, limit):
+    # Unindexed substring match for databases without a full-text index
+    pattern = f"%{query.strip()}%"
+    rows = session.execute(text(
+        "SELECT id, name, substr(recipe, 1, 200) FROM favorite_recipes"
+        " WHERE name LIKE :pattern OR recipe LIKE :pattern ORDER BY id LIMIT :limit"
+    ), {"pattern": pattern, "limit": limit}).all()
+    return [SearchResult(row[0], html.escape(row[1]), html.escape(row[2]), 0.0) for row in rows]
+
+
+# Function to search favorites by name and recipe text, best matches first
+def search_favorites(query, limit=20):
+    if not query or not query.strip():
+        return []
+    with session_scope() as session:
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            return _search_sqlite(session, query, limit)
+        if dialect == "postgresql":
+            return _search_postgresql(session, query, limit)
+        return _search_fallback(session, query, limit)
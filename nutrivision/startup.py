@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+import time
+
+from nutrivision.metrics import current_page, get_metrics
+from nutrivision.timing import elapsed_ms
+
+# Imported first by main.py, so this is roughly when the server process started serving
+PROCESS_STARTED = time.perf_counter()
+
+
+# Function to check whether startup profiling is on (NUTRIVISION_PROFILE_STARTUP=1)
+def profiling_enabled():
+    return os.getenv("NUTRIVISION_PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+
+
+class LazyClient:
+    # Stands in for an API client and builds it with factory() on first attribute access,
+    # so pages can hold a client without paying its import and setup until it is used.
+    # A failed build is raised on every use, without being cached, so fixing the key works.
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def resolved(self):
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+# First run of each page in this process: the cold import and render cost
+_first_runs = {}
+_first_runs_lock = threading.Lock()
+
+
+class PageProfile:
+    # Timings of one run of a page script: imports, then render
+    def __init__(self, page):
+        self.page = page
+        # Spans recorded during this script run are labeled with the page
+        current_page.set(page)
+        self.start = time.perf_counter()
+        self.modules_before = len(sys.modules)
+        self.timings = {}
+
+    def mark(self, stage):
+        self.timings[f"{stage}_ms"] = elapsed_ms(self.start)
+
+    # Function to note the end of the page's imports and how many modules they loaded
+    def imports_done(self):
+        self.mark("imports")
+        self.timings["modules_loaded"] = len(sys.modules) - self.modules_before
+
+    # Function to note the end of the render; with profiling on, the report goes to the sidebar and stderr
+    def finish(self):
+        self.mark("render")
+        get_metrics().observe("page.run", self.timings["render_ms"])
+        if debug_timings_enabled():
+            render_debug_panel(self.page)
+        with _first_runs_lock:
+            first = self.page not in _first_runs
+            if first:
+                _first_runs[self.page] = dict(self.timings, since_process_start_ms=elapsed_ms(PROCESS_STARTED))
+        if not profiling_enabled():
+            return
+        if first:
+            print(f"startup profile {self.page}: {_first_runs[self.page]}", file=sys.stderr)
+        import streamlit as st
+
+        from nutrivision.assets import asset_stats
+
+        with st.sidebar.expander("Startup profile"):
+            st.write({"this run": self.timings})
+            st.table(startup_report())
+            st.write(asset_stats())
+
+
+# Function to check whether pages offer the debug timing panel (NUTRIVISION_DEBUG_TIMINGS=1)
+def debug_timings_enabled():
+    return os.getenv("NUTRIVISION_DEBUG_TIMINGS", "").lower() in ("1", "true", "yes")
+
+
+# Function to draw the span percentiles, counters and cache hit rates of this page behind a toggle
+def render_debug_panel(page):
+    import streamlit as st
+
+    if not st.sidebar.toggle("Debug timings", key="debug_timings"):
+        return
+    metrics = get_metrics()
+    with st.sidebar.expander("Timings for this page", expanded=True):
+        st.dataframe(metrics.summary(page), hide_index=True)
+        st.write({"cache hit rates": metrics.hit_rates()})
+        st.dataframe(metrics.counters(page), hide_index=True)
+        st.caption("Last spans")
+        st.dataframe([span for span in metrics.recent if span.get("page") == page][-20:], hide_index=True)
+
+
+# Function to start profiling a page script; call before its other imports
+def profile_page(page):
+    return PageProfile(page)
+
+
+# Function to get the first-run timings of every page rendered by this process
+def startup_report():
+    with _first_runs_lock:
+        return [dict(page=page, **timings) for page, timings in _first_runs.items()]
@@ -0,0 +1,18 @@
+import time
+
+
+# Function to render streamed text into a Streamlit placeholder as it arrives.
+# template wraps the text so streamed output keeps the page's styling; redraws are
+# throttled to min_interval seconds so long outputs don't flood the websocket.
+def render_stream(chunks, placeholder, template="{}", min_interval=0.05):
+    text = ""
+    last_draw = 0.0
+    for chunk in chunks:
+        text += chunk
+        now = time.perf_counter()
+        if now - last_draw >= min_interval:
+            placeholder.markdown(template.format(text), unsafe_allow_html=True)
+            last_draw = now
+    text = text.strip()
+    placeholder.markdown(template.format(text), unsafe_allow_html=True)
+    return text
@@ -0,0 +1,17 @@
+import time
+from contextlib import contextmanager
+
+
+# Function to record how long a block takes under timings["<stage>_ms"]
+@contextmanager
+def timed(timings, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[f"{stage}_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+
+# Function to get the milliseconds elapsed since a perf_counter() start
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
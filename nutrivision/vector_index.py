@@ -0,0 +1,275 @@
+import atexit
+import os
+import threading
+
+import numpy as np
+from sqlalchemy import select, update
+
+from nutrivision.db import FavoriteRecipe, get_database, session_scope
+from nutrivision.embeddings import decode_embedding, embed_favorites, encode_embedding, get_embedder
+
+
+class VectorIndex:
+    # Normalized embeddings in one float32 matrix, searched by brute-force dot product.
+    # At favorites scale (thousands of rows) this is a single BLAS call and beats any ANN
+    # structure on build and update cost, while staying exact.
+    def __init__(self, dim, capacity=1024):
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._positions = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, recipe_id):
+        return recipe_id in self._positions
+
+    def ids(self):
+        with self._lock:
+            return list(self._positions)
+
+    def _ensure_writable(self, needed):
+        # Memory-mapped snapshots are read-only; the first change copies them into memory
+        if not self._matrix.flags.writeable or needed > len(self._ids):
+            capacity = max(needed, 2 * len(self._ids), 1024)
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            ids = np.zeros(capacity, dtype=np.int64)
+            matrix[:self._size] = self._matrix[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+            self._matrix, self._ids = matrix, ids
+
+    # Function to add or replace vectors; vectors is an (n, dim) array matching recipe_ids
+    def add(self, recipe_ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(vectors):
+            return
+        with self._lock:
+            self._ensure_writable(self._size + len(recipe_ids))
+            for recipe_id, vector in zip(recipe_ids, vectors):
+                position = self._positions.get(recipe_id)
+                if position is None:
+                    position = self._size
+                    self._positions[recipe_id] = position
+                    self._ids[position] = recipe_id
+                    self._size += 1
+                self._matrix[position] = vector
+
+    # Function to drop vectors; the last row moves into each freed slot so the matrix stays dense
+    def remove(self, recipe_ids):
+        with self._lock:
+            for recipe_id in recipe_ids:
+                if recipe_id not in self._positions:
+                    continue
+                self._ensure_writable(self._size)
+                position = self._positions.pop(recipe_id)
+                last = self._size - 1
+                if position != last:
+                    moved_id = int(self._ids[last])
+                    self._matrix[position] = self._matrix[last]
+                    self._ids[position] = moved_id
+                    self._positions[moved_id] = position
+                self._size = last
+
+    # Function to find the k nearest favorites to a query vector, as [(id, cosine similarity), ...]
+    def search(self, vector, k=8):
+        with self._lock:
+            if self._size == 0:
+                return []
+            scores = self._matrix[:self._size] @ np.asarray(vector, dtype=np.float32)
+            ids = self._ids[:self._size]
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(int(ids[i]), float(scores[i])) for i in top]
+
+    # Function to write the index to path.npy/path.ids.npy for memory-mapped loading.
+    # Files are replaced atomically since the current ones may be mapped by this index.
+    def save(self, path):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            for suffix, array in (("npy", self._matrix[:self._size]), ("ids.npy", self._ids[:self._size])):
+                np.save(f"{path}.tmp.{suffix}", array)
+                os.replace(f"{path}.tmp.{suffix}", f"{path}.{suffix}")
+
+    # Function to open a saved index; the matrix stays on disk until the index is changed
+    @classmethod
+    def load(cls, path):
+        matrix = np.load(f"{path}.npy", mmap_mode="r")
+        ids = np.load(f"{path}.ids.npy")
+        index = cls(matrix.shape[1], capacity=0)
+        index._matrix, index._ids, index._size = matrix, ids, len(ids)
+        index._positions = {int(recipe_id): position for position, recipe_id in enumerate(ids)}
+        return index
+
+
+# Function to read stored embeddings and fill in any that are missing or from another embedder
+def _load_embeddings(index, recipe_ids=None, batch_size=1000):
+    embedder = get_embedder()
+    database = get_database()
+    after_id = 0
+    while True:
+        query = (
+            select(FavoriteRecipe.id, FavoriteRecipe.embedding, FavoriteRecipe.embedding_model)
+            .where(FavoriteRecipe.id > after_id).order_by(FavoriteRecipe.id).limit(batch_size)
+        )
+        if recipe_ids is not None:
+            query = query.where(FavoriteRecipe.id.in_(recipe_ids))
+        with database.engine.connect() as conn:
+            rows = conn.execute(query).all()
+        if not rows:
+            return
+        fresh = [row for row in rows if row.embedding is not None and row.embedding_model == embedder.name]
+        if fresh:
+            index.add([row.id for row in fresh], np.stack([decode_embedding(row.embedding) for row in fresh]))
+        if len(fresh) < len(rows):
+            fresh_ids = {row.id for row in fresh}
+            refresh_embeddings([row.id for row in rows if row.id not in fresh_ids], index)
+        after_id = rows[-1].id
+
+
+# Function to recompute and store embeddings for the given favorites
+def refresh_embeddings(recipe_ids, index=None):
+    embedder = get_embedder()
+    with session_scope() as session:
+        rows = session.execute(
+            select(FavoriteRecipe.id, FavoriteRecipe.name, FavoriteRecipe.recipe)
+            .where(FavoriteRecipe.id.in_(list(recipe_ids)))
+        ).all()
+        if not rows:
+            return
+        vectors = embed_favorites([(row.name, row.recipe) for row in rows])
+        # A list of parameter sets with primary keys is an ORM bulk UPDATE by id
+        session.execute(
+            update(FavoriteRecipe),
+            [
+                {"id": row.id, "embedding": encode_embedding(vector), "embedding_model": embedder.name}
+                for row, vector in zip(rows, vectors)
+            ],
+        )
+    if index is not None:
+        index.add([row.id for row in rows], vectors)
+
+
+def _snapshot_file(path):
+    return f"{path}.{get_embedder().name.replace('/', '_')}"
+
+
+# Function to add and drop index entries so the index holds exactly the favorites in the database
+def reconcile(index):
+    with get_database().engine.connect() as conn:
+        current = set(conn.execute(select(FavoriteRecipe.id)).scalars())
+    index.remove([recipe_id for recipe_id in index.ids() if recipe_id not in current])
+    missing = [recipe_id for recipe_id in current if recipe_id not in index]
+    for start in range(0, len(missing), 1000):
+        _load_embeddings(index, missing[start:start + 1000])
+
+
+# Function to build the index from the database, starting from a saved snapshot when there is one.
+# Snapshots are kept per embedder, so switching models never mixes vectors.
+def build_index(snapshot_path=None):
+    embedder = get_embedder()
+    index = None
+    if snapshot_path:
+        snapshot_path = _snapshot_file(snapshot_path)
+        if os.path.exists(f"{snapshot_path}.npy"):
+            index = VectorIndex.load(snapshot_path)
+    if index is None:
+        index = VectorIndex(embedder.dim)
+        _load_embeddings(index)
+    else:
+        # Pick up rows added or deleted since the snapshot was saved
+        reconcile(index)
+    if snapshot_path:
+        index.save(snapshot_path)
+    return index
+
+
+_index = None
+_index_database = None
+_index_lock = threading.Lock()
+
+# Seconds a changed index waits before its snapshot is rewritten, so a burst of edits costs one write
+SNAPSHOT_DELAY = float(os.getenv("NUTRIVISION_VECTOR_SNAPSHOT_DELAY_S", "30"))
+
+# Pending snapshot write; set while the index has changes the snapshot doesn't have yet
+_snapshot_timer = None
+_snapshot_lock = threading.Lock()
+
+
+def _snapshot_path():
+    path = os.getenv("NUTRIVISION_VECTOR_INDEX_PATH")
+    return _snapshot_file(path) if path else None
+
+
+# Function to get the process-wide favorites index, built on first use and again
+# whenever the process-wide database is swapped by configure_database
+def get_vector_index():
+    global _index, _index_database
+    database = get_database()
+    if _index is None or _index_database is not database:
+        with _index_lock:
+            if _index is None or _index_database is not database:
+                _index = build_index(os.getenv("NUTRIVISION_VECTOR_INDEX_PATH") or None)
+                _index_database = database
+    return _index
+
+
+# Function to mark the snapshot out of date; it is rewritten SNAPSHOT_DELAY seconds later
+# (or at exit), however many changes arrive in between
+def _schedule_snapshot():
+    global _snapshot_timer
+    if not _snapshot_path():
+        return
+    with _snapshot_lock:
+        if _snapshot_timer is None:
+            _snapshot_timer = threading.Timer(SNAPSHOT_DELAY, flush_snapshot)
+            _snapshot_timer.daemon = True
+            _snapshot_timer.start()
+
+
+# Function to write the snapshot now if the index changed since the last write
+def flush_snapshot():
+    global _snapshot_timer
+    with _snapshot_lock:
+        timer, _snapshot_timer = _snapshot_timer, None
+    if timer is None:
+        return
+    timer.cancel()
+    if _index is not None and _snapshot_path():
+        _index.save(_snapshot_path())
+
+
+atexit.register(flush_snapshot)
+
+
+# Function to keep a built index (and its snapshot) in step with saved favorites; a no-op before first use.
+# Changes made by other processes reach the snapshot only as added/deleted ids.
+def index_favorites(recipe_ids, vectors):
+    if _index is not None:
+        _index.add(recipe_ids, vectors)
+        _schedule_snapshot()
+
+
+# Function to keep a built index (and its snapshot) in step with deleted favorites; a no-op before first use
+def unindex_favorites(recipe_ids):
+    if _index is not None:
+        _index.remove(recipe_ids)
+        _schedule_snapshot()
+
+
+# Function to bring a built index up to date after bulk changes whose ids aren't known, e.g. imports
+def sync_vector_index():
+    if _index is not None:
+        reconcile(_index)
+        _schedule_snapshot()
+
+
+# Function to find the ids of the k favorites closest in meaning to a free-text query
+def nearest_favorites(query, k=8):
+    if not query or not query.strip():
+        return []
+    vector = get_embedder().embed([query])[0]
+    return [recipe_id for recipe_id, _ in get_vector_index().search(vector, k)]
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+
+from nutrivision.metrics import get_metrics, span
+from nutrivision.resilience import get_policy
+
+_client = None
+_client_lock = threading.Lock()
+_local = threading.local()
+
+
+# Function to get this thread's HTTP connection for YouTube requests. httplib2.Http is not
+# thread-safe, so requests from the shared client are executed with one Http per thread.
+def youtube_http():
+    http = getattr(_local, "http", None)
+    if http is None:
+        import httplib2
+
+        http = _local.http = httplib2.Http(timeout=float(os.getenv("NUTRIVISION_YOUTUBE_TIMEOUT", "10")))
+    return http
+
+
+# Function to get the YouTube Data API client, built once per process.
+# Only its discovery document is shared; execute requests with http=youtube_http().
+def get_youtube_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from googleapiclient.discovery import build
+
+                # cache_discovery=False skips the file cache that warns on newer oauth2client
+                _client = build(
+                    "youtube", "v3", developerKey=os.getenv("YOUTUBE_API_KEY"), cache_discovery=False,
+                    http=youtube_http(),
+                )
+    return _client
+
+
+class QuotaExhaustedError(RuntimeError):
+    pass
+
+
+# Function to query the YouTube API for a video, None if there are no results.
+# The request goes out under the "youtube" call policy (rate limit, retries, breaker),
+# over `http` when given instead of the connection the client was built with.
+# Every attempt, retries included, is billed, so reserve() is called before each one
+# and QuotaExhaustedError is raised once it returns False.
+def fetch_video(client, query, policy=None, http=None, reserve=None):
+    request = client.search().list(
+        part="snippet",
+        q=query,
+        type="video",
+        maxResults=1
+    )
+
+    def attempt():
+        if reserve is not None and not reserve():
+            raise QuotaExhaustedError("today's YouTube quota is spent")
+        return request.execute() if http is None else request.execute(http=http)
+
+    response = (policy or get_policy("youtube")).call(attempt)
+    items = response.get("items", [])
+    if not items:
+        return None
+    return f"https://www.youtube.com/watch?v={items[0]['id']['videoId']}"
+
+
+# YouTube Data API cost of one search.list call, in quota units
+SEARCH_COST_UNITS = 100
+
+# Lookup counters reported as cache_requests{cache="youtube"} results
+CACHE_RESULTS = {
+    "hits": "hit", "negative_hits": "negative_hit", "api_calls": "miss", "quota_skips": "quota_skip",
+    "breaker_skips": "breaker_skip",
+}
+
+
+# Function to normalize a search query so "Pasta  Carbonara" and "pasta carbonara" share an entry
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+# Function to get the current quota day; YouTube quotas reset at midnight Pacific time
+def quota_day():
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+
+    return datetime.now(ZoneInfo("America/Los_Angeles")).date().isoformat()
+
+
+class VideoLookupCache:
+    # Persistent query -> video URL cache. A None URL is a cached "no result" answer.
+    def __init__(self, path, ttl=30 * 86400, negative_ttl=86400, daily_quota=10000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.daily_quota = daily_quota
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.api_calls = 0
+        self.quota_skips = 0
+        self.breaker_skips = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS video_lookups ("
+                " query TEXT PRIMARY KEY, video_url TEXT, fetched_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS youtube_quota (day TEXT PRIMARY KEY, units INTEGER NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        if counter in CACHE_RESULTS:
+            get_metrics().increment("cache_requests", cache="youtube", result=CACHE_RESULTS[counter])
+
+    # Function to reserve quota units for a call; False once today's budget is spent
+    def _reserve_quota(self, units):
+        conn = self._connect()
+        day = quota_day()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO youtube_quota (day, units) VALUES (?, 0)", (day,))
+            cursor = conn.execute(
+                "UPDATE youtube_quota SET units = units + ? WHERE day = ? AND units + ? <= ?",
+                (units, day, units, self.daily_quota),
+            )
+        return cursor.rowcount == 1
+
+    def quota_used(self):
+        row = self._connect().execute("SELECT units FROM youtube_quota WHERE day = ?", (quota_day(),)).fetchone()
+        return row[0] if row else 0
+
+    def _store(self, key, video_url):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO video_lookups (query, video_url, fetched_at) VALUES (?, ?, ?)",
+                (key, video_url, time.time()),
+            )
+
+    # Function to look up a video URL, calling search(query, reserve) only on a cache miss.
+    # search must call reserve() before every billed API request and stop if it returns False
+    # (fetch_video(..., reserve=reserve) does). Returns None when there is no video or when the
+    # quota is spent and nothing is cached.
+    def lookup(self, query, search):
+        with span("youtube.lookup"):
+            return self._lookup(query, search)
+
+    def _lookup(self, query, search):
+        key = normalize_query(query)
+        row = self._connect().execute(
+            "SELECT video_url, fetched_at FROM video_lookups WHERE query = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            video_url, fetched_at = row
+            ttl = self.ttl if video_url else self.negative_ttl
+            if time.time() - fetched_at < ttl:
+                self._count("hits" if video_url else "negative_hits")
+                return video_url
+
+        if get_policy("youtube").breaker.is_open():
+            # The API keeps failing: don't spend quota on it, answer from what we have
+            self._count("breaker_skips")
+            return row[0] if row is not None else None
+
+        def reserve():
+            if not self._reserve_quota(SEARCH_COST_UNITS):
+                return False
+            self._count("api_calls")
+            return True
+
+        try:
+            with span("youtube.search"):
+                video_url = search(query, reserve)
+        except QuotaExhaustedError:
+            # Out of quota: a stale answer beats no answer
+            self._count("quota_skips")
+            return row[0] if row is not None else None
+        except Exception:
+            if row is not None:
+                return row[0]
+            raise
+        self._store(key, video_url)
+        return video_url
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "api_calls": self.api_calls,
+            "quota_skips": self.quota_skips,
+            "breaker_skips": self.breaker_skips,
+            "quota_used_today": self.quota_used(),
+            "daily_quota": self.daily_quota,
+        }
+
+
+_video_cache = None
+
+
+# Function to get the process-wide video lookup cache
+def get_video_cache():
+    global _video_cache
+    if _video_cache is None:
+        with _client_lock:
+            if _video_cache is None:
+                _video_cache = VideoLookupCache(
+                    os.getenv("NUTRIVISION_YOUTUBE_CACHE_PATH") or os.path.join(
+                        os.path.expanduser("~"), ".cache", "nutrivision", "youtube_cache.sqlite3"
+                    ),
+                    ttl=float(os.getenv("NUTRIVISION_YOUTUBE_TTL", str(30 * 86400))),
+                    negative_ttl=float(os.getenv("NUTRIVISION_YOUTUBE_NEGATIVE_TTL", "86400")),
+                    daily_quota=int(os.getenv("NUTRIVISION_YOUTUBE_DAILY_QUOTA", "10000")),
+                )
+    return _video_cache
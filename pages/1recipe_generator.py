@@ -1,64 +1,44 @@
+from nutrivision.startup import profile_page
+
+profile = profile_page("Recipe Generator")
+
 import streamlit as st
-import cohere
 from dotenv import load_dotenv
-import os
-from googleapiclient.discovery import build
-from sqlalchemy import create_engine, Column, Integer, String, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from PIL import Image
-
-logo = Image.open("pages/logo.png")
-st.image(logo, width=150)
+from nutrivision.llm_gateway import get_gateway, llm_configuration_error
+from nutrivision.favorites import add_favorite
+from nutrivision.favorites_ui import render_favorites_list, render_favorites_search, reset_favorites_list
+from nutrivision.streaming import render_stream
+from nutrivision.recipe_flow import RecipeRun, extract_dish_name, stream_recipe
+from nutrivision.resilience import ServiceUnavailableError
+from nutrivision.timing import elapsed_ms
+from nutrivision.youtube import fetch_video, get_video_cache, get_youtube_client, youtube_http
+from nutrivision.assets import show_logo
+
+profile.imports_done()
+
+show_logo()
 # Load environment variables
 load_dotenv()
 
-# Get the tokens from the environment variables
-cohere_api_key = os.getenv("COHERE_API_KEY")
-youtube_api_key = os.getenv("YOUTUBE_API_KEY")
-database_url = os.getenv("DATABASE_URL")
-
-# Initialize Cohere
-co = cohere.Client(cohere_api_key)
-
-# Initialize SQLAlchemy
-engine = create_engine(database_url)
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
-
-# Define the FavoriteRecipe model
-class FavoriteRecipe(Base):
-    __tablename__ = 'favorite_recipes'
-    id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    recipe = Column(Text, nullable=False)
-
-# Create the table if it doesn't exist
-Base.metadata.create_all(engine)
-
-# Function to load favorites
-def load_favorites():
-    return session.query(FavoriteRecipe).all()
-
-# Function to save favorites
-def save_favorite(name, recipe):
-    new_favorite = FavoriteRecipe(name=name, recipe=recipe)
-    session.add(new_favorite)
-    session.commit()
-
-# Function to generate the recipe using Cohere
-def generate_recipe(ingredients):
+# Cohere calls go through the shared, cached gateway; the client is built on the first call
+llm = get_gateway()
+llm_error = llm_configuration_error()
+
+RECIPE_TEMPLATE = "<div style='background-color: #333333; color: white; padding: 15px; border-radius: 10px;'>{}</div>"
+
+# Function to generate the recipe using Cohere, streaming it into placeholder if given.
+# The dish name comes from the same generation and is stored on run, along with the
+# YouTube lookup that starts as soon as the name is known.
+def generate_recipe(ingredients, placeholder=None, run=None):
+    run = run if run is not None else RecipeRun()
     try:
-        prompt = f"Generate a recipe with the following ingredients: {ingredients}"
-        response = co.generate(
-            model='command-xlarge-nightly',
-            prompt=prompt,
-            max_tokens=512,
-            temperature=0.7
-        )
-        recipe = response.generations[0].text.strip()
-        return recipe
+        chunks = stream_recipe(llm, ingredients, run, search_youtube_video)
+        if placeholder is None:
+            return "".join(chunks).strip()
+        return render_stream(chunks, placeholder, RECIPE_TEMPLATE)
+    except ServiceUnavailableError:
+        st.error("The AI service is unavailable right now, please try again shortly.")
+        return None
     except Exception as e:
         st.error(f"Error generating recipe: {e}")
         return None
@@ -66,35 +46,19 @@ def generate_recipe(ingredients):
 # Function to get the name of the dish from the generated recipe
 def get_dish_name(recipe_text):
     try:
-        prompt = f"Extract the name of the dish from the following recipe text, output only name of the dish nothing else!: {recipe_text}"
-        response = co.generate(
-            model='command-xlarge-nightly',
-            prompt=prompt,
-            max_tokens=50,
-            temperature=0.7
-        )
-        dish_name = response.generations[0].text.strip()
-        return dish_name
+        return extract_dish_name(llm, recipe_text)
     except Exception as e:
         st.error(f"Error extracting dish name: {e}")
         return "Dish Name Not Generated Correctly"
 
-# Function to search for a YouTube video
+# Function to query the YouTube API for a video, None if there are no results.
+# Lookups run on the recipe-flow worker threads, each with its own HTTP connection.
+def fetch_youtube_video(query, reserve=None):
+    return fetch_video(get_youtube_client(), query, http=youtube_http(), reserve=reserve)
+
+# Function to search for a YouTube video through the persistent lookup cache
 def search_youtube_video(query):
-    youtube = build("youtube", "v3", developerKey=youtube_api_key)
-    request = youtube.search().list(
-        part="snippet",
-        q=query,
-        type="video",
-        maxResults=1
-    )
-    response = request.execute()
-    video_id = response["items"][0]["id"]["videoId"]
-    video_url = f"https://www.youtube.com/watch?v={video_id}"
-    return video_url
-
-# Load favorites
-favorites = load_favorites()
+    return get_video_cache().lookup(query, fetch_youtube_video)
 
 # Create a Streamlit page
 st.title("Recipe Generator")
@@ -103,27 +67,41 @@ st.write("Enter the ingredients you have, and I'll generate a recipe for you!")
 # Create a text input for the user to enter ingredients
 ingredients_input = st.text_input("Ingredients (separated by commas):")
 
+# A missing key only disables generation; saved favorites still work
+if llm_error:
+    st.error(llm_error)
+
 # Create a button to generate the recipe
-if st.button("Generate Recipe"):
+if st.button("Generate Recipe", disabled=bool(llm_error)):
     if not ingredients_input.strip():
         st.warning("Please enter the ingredients you have.")
     else:
         # Generate the recipe
         st.write(f"Generating recipe for: {ingredients_input}")
-        recipe = generate_recipe(ingredients_input)
+        st.subheader("Generated Recipe")
+        run = RecipeRun()
+        recipe = generate_recipe(ingredients_input, placeholder=st.empty(), run=run)
         if recipe:
-            st.subheader("Generated Recipe")
-            st.markdown(f"<div style='background-color: #333333; color: white; padding: 15px; border-radius: 10px;'>{recipe}</div>", unsafe_allow_html=True)
-
-            # Get the name of the dish
-            dish_name = get_dish_name(recipe)
+            # The dish name normally arrives with the recipe; ask separately only if it didn't
+            dish_name = run.dish_name or get_dish_name(recipe)
             st.subheader("Dish Name")
             st.write(dish_name)
 
-            # Search for a YouTube video of the dish
-            video_url = search_youtube_video(dish_name + " cooking")
+            # The video search has been running since the dish name was streamed
             st.subheader("Recipe Video")
-            st.video(video_url)
+            try:
+                video_url = run.video_future.result() if run.video_future else search_youtube_video(dish_name + " cooking")
+            except Exception as e:
+                # A missing or rejected YOUTUBE_API_KEY costs the video, not the recipe
+                video_url = None
+                st.warning(f"Could not search for a recipe video: {e}")
+            if video_url:
+                st.video(video_url)
+            else:
+                st.info("No recipe video found.")
+            run.timings["end_to_end_ms"] = elapsed_ms(run.started_at)
+            with st.expander("Timings"):
+                st.write(run.timings)
 
             # Store the generated recipe and dish name in the session state
             st.session_state["generated_recipe"] = recipe
@@ -133,14 +111,14 @@ if st.button("Generate Recipe"):
 if "generated_recipe" in st.session_state and "dish_name" in st.session_state:
     # Create a favorite button to save the recipe
     if st.button("Add to Favorites List"):
-        save_favorite(st.session_state["dish_name"], st.session_state["generated_recipe"])
+        add_favorite(st.session_state["dish_name"], st.session_state["generated_recipe"])
         st.success("Recipe added to favorites!")
+        reset_favorites_list("sidebar")
 
-# Display favorite recipes
+# Display favorite recipes, loaded page by page
 st.sidebar.header("Favorite Recipes")
-for favorite in favorites:
-    st.sidebar.subheader(favorite.name)
-    st.sidebar.write(favorite.recipe)
+with st.sidebar:
+    render_favorites_search("sidebar")
+    render_favorites_list("sidebar")
 
-# Close the session
-session.close()
+profile.finish()
@@ -1,64 +1,31 @@
+from nutrivision.startup import profile_page
+
+profile = profile_page("Favorite Recipes")
+
+import csv
+import io
+import tempfile
 import streamlit as st
-from PIL import Image
-from sqlalchemy import create_engine, Column, Integer, String, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
-import os
+from nutrivision.favorites import add_favorite, update_favorite
+from nutrivision.favorites_ui import render_favorites_list, render_favorites_search, reset_favorites_list
+from nutrivision.db import get_database
+from nutrivision.favorites_io import delete_favorites, export_favorites, import_favorites
+from nutrivision.assets import show_logo
+
+profile.imports_done()
 
 # Load environment variables
 load_dotenv()
 
-# Get the database URL from the environment variables
-database_url = os.getenv("DATABASE_URL")
-
-# Initialize SQLAlchemy
-engine = create_engine(database_url)
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
-
-# Define the FavoriteRecipe model
-class FavoriteRecipe(Base):
-    __tablename__ = 'favorite_recipes'
-    id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    recipe = Column(Text, nullable=False)
-
-# Create the table if it doesn't exist
-Base.metadata.create_all(engine)
-
-# Function to load favorites
-def load_favorites():
-    return session.query(FavoriteRecipe).all()
-
-# Function to add a favorite recipe
-def add_favorite(name, recipe):
-    new_favorite = FavoriteRecipe(name=name, recipe=recipe)
-    session.add(new_favorite)
-    session.commit()
-
-# Function to update a favorite recipe
-def update_favorite(recipe_id, name, recipe):
-    favorite = session.query(FavoriteRecipe).filter(FavoriteRecipe.id == recipe_id).first()
-    if favorite:
-        favorite.name = name
-        favorite.recipe = recipe
-        session.commit()
-
-# Function to delete a favorite recipe
-def delete_favorite(recipe_id):
-    favorite = session.query(FavoriteRecipe).filter(FavoriteRecipe.id == recipe_id).first()
-    if favorite:
-        session.delete(favorite)
-        session.commit()
-
 # Streamlit UI
-logo = Image.open("pages/logo.png")
-st.image(logo, width=150)
+show_logo()
 
 st.title("Избранные рецепты")
 
+# Full-text search over saved recipes
+render_favorites_search("favorites", label="Поиск рецептов", empty="Ничего не найдено.")
+
 # Add new favorite recipe
 st.subheader("Добавить новый рецепт в избранное")
 new_name = st.text_input("Название рецепта")
@@ -67,8 +34,7 @@ if st.button("Добавить рецепт"):
     if new_name and new_recipe:
         add_favorite(new_name, new_recipe)
         st.success("Рецепт добавлен в избранное!")
-        if 'favorites' in st.session_state:
-            st.session_state['favorites'] = load_favorites()
+        reset_favorites_list("favorites")
     else:
         st.warning("Пожалуйста, укажите название и рецепт.")
 
@@ -81,37 +47,66 @@ if st.button("Обновить рецепт"):
     if update_id and update_name and update_recipe:
         update_favorite(update_id, update_name, update_recipe)
         st.success("Рецепт обновлен!")
-        if 'favorites' in st.session_state:
-            st.session_state['favorites'] = load_favorites()
+        reset_favorites_list("favorites")
     else:
         st.warning("Пожалуйста, укажите ID рецепта, обновленное название и рецепт.")
 
-# Delete favorite recipe
-st.subheader("Удалить рецепт из избранного")
-if 'favorites' in st.session_state:
-    favorites = st.session_state['favorites']
-    for favorite in favorites:
-        if st.button(f"Удалить {favorite.name}", key=f"delete_{favorite.id}"):
-            delete_favorite(favorite.id)
-            st.success(f"Рецепт {favorite.name} удален!")
-            st.session_state['favorites'] = load_favorites()
-else:
-    st.write("Нет избранных рецептов.")
-
-# Load favorites
-if 'favorites' not in st.session_state:
-    st.session_state['favorites'] = load_favorites()
-
-favorites = st.session_state['favorites']
-
-# Display favorite recipes
+# Bulk import and export of favorites as JSONL or CSV
+st.subheader("Импорт и экспорт")
+uploaded = st.file_uploader("Импорт рецептов (JSONL или CSV)", type=["jsonl", "csv"])
+if uploaded is not None and st.button("Импортировать"):
+    data = uploaded.getvalue()
+    fmt = "csv" if uploaded.name.endswith(".csv") else "jsonl"
+    # Keyed by this upload, so pressing the button again after an interruption resumes it,
+    # while a later upload of the same file is a fresh import
+    job = f"upload-{uploaded.file_id}"
+    progress = st.progress(0.0)
+    total = max(data.count(b"\n"), 1)
+    try:
+        result = import_favorites(
+            io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", newline=""),
+            fmt,
+            job=job,
+            on_progress=lambda r: progress.progress(min((r.inserted + r.skipped) / total, 1.0)),
+        )
+    except (UnicodeDecodeError, csv.Error, ValueError) as e:
+        # Batches committed before the error are kept
+        st.error(f"Не удалось импортировать файл: {e}")
+    else:
+        progress.progress(1.0)
+        st.success(f"Импортировано: {result.inserted}, пропущено: {result.skipped}, с ошибками: {result.invalid}")
+    reset_favorites_list("favorites")
+
+export_format = st.radio("Формат экспорта", ["jsonl", "csv"], horizontal=True)
+if st.button("Подготовить экспорт"):
+    # Rows are streamed into a spooled file, so only the finished file is held for download
+    with tempfile.SpooledTemporaryFile(max_size=8 * 2**20, mode="w+", encoding="utf-8", newline="") as out:
+        export_favorites(out, export_format)
+        out.seek(0)
+        st.download_button("Скачать", out.read(), file_name=f"favorites.{export_format}")
+
+bulk_ids = st.text_input("ID рецептов для удаления (через запятую)")
+if st.button("Удалить выбранные"):
+    ids = [int(part) for part in bulk_ids.replace(" ", "").split(",") if part.isdigit()]
+    st.success(f"Удалено рецептов: {delete_favorites(ids)}")
+    reset_favorites_list("favorites")
+
+# Display favorite recipes, loaded page by page; recipe text is fetched on demand
 st.subheader("Сохраненные рецепты")
-if favorites:
-    for idx, favorite in enumerate(favorites, start=1):
-        st.write(f"{idx}. **{favorite.name}** (ID: {favorite.id})")
-        st.write(favorite.recipe)
-else:
-    st.write("Нет избранных рецептов.")
-
-# Close the session
-session.close()
+render_favorites_list(
+    "favorites",
+    allow_delete=True,
+    labels={
+        "show": "Показать рецепт",
+        "delete": "Удалить",
+        "deleted": "Рецепт {name} удален!",
+        "more": "Загрузить еще",
+        "empty": "Нет избранных рецептов.",
+    },
+)
+
+# Connection pool checkouts and wait times for this server process
+with st.sidebar.expander("Database pool"):
+    st.write(get_database().stats())
+
+profile.finish()
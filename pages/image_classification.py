@@ -1,47 +1,47 @@
+from nutrivision.startup import profile_page
+
+profile = profile_page("Image Classification")
+
 import streamlit as st
-import numpy as np
-from PIL import Image
-from transformers import pipeline, AutoImageProcessor, AutoModelForImageClassification
-from huggingface_hub import HfFolder
 from dotenv import load_dotenv
 import os
+from nutrivision.model_registry import registry
+from nutrivision.inference_scheduler import classify_food, get_scheduler
+from nutrivision.result_cache import get_result_cache, image_cache_key
+from nutrivision.preprocessing import decode_image
+from nutrivision.timing import timed
+from nutrivision.backends import selected_backend
+from nutrivision.assets import show_logo
+
+profile.imports_done()
 
 # Load environment variables
 load_dotenv()
 
-# Load the token from the .env file
-hf_token = os.getenv('HF_TOKEN')
-
-# Check if the token is set
-if hf_token is None:
-    raise ValueError("Hugging Face token is not set. Please set it before running the script.")
-else:
-    HfFolder.save_token(hf_token)
-
-# Load models once and reuse them
-if 'food_classification_v1' not in st.session_state:
-    model_name_v1 = "Kaludi/Food-Classification"
-    processor_v1 = AutoImageProcessor.from_pretrained(model_name_v1)
-    model_v1 = AutoModelForImageClassification.from_pretrained(model_name_v1)
-    st.session_state.food_classification_v1 = pipeline("image-classification", model=model_v1, feature_extractor=processor_v1)
-
-if 'food_classification_v2' not in st.session_state:
-    model_name_v2 = "Kaludi/food-category-classification-v2.0"
-    processor_v2 = AutoImageProcessor.from_pretrained(model_name_v2)
-    model_v2 = AutoModelForImageClassification.from_pretrained(model_name_v2)
-    st.session_state.food_classification_v2 = pipeline("image-classification", model=model_v2, feature_extractor=processor_v2)
-
-def classify_food_and_get_ingredients(image):
-    results_v1 = st.session_state.food_classification_v1(image)
-    results_v2 = st.session_state.food_classification_v2(image)
-    classified_items_v1 = [result['label'] for result in results_v1]
-    classified_items_v2 = [result['label'] for result in results_v2]
-    food_name = classified_items_v1[0] if classified_items_v1 else "Unknown"
-    ingredients = classified_items_v2 if classified_items_v2 else ["Ingredients not found"]
-    return food_name, ingredients
-
-logo = Image.open("pages/logo.png")
-st.image(logo, width=150)
+# huggingface_hub reads HF_TOKEN from the environment when a model is downloaded, so the
+# token file isn't rewritten on every rerun. The models are public; without a token they
+# are fetched anonymously, with lower rate limits.
+if not os.getenv('HF_TOKEN'):
+    st.sidebar.info("HF_TOKEN is not set; models are downloaded anonymously.")
+
+# Models are loaded once per server process and shared by all sessions;
+# uploads from every session are micro-batched through one scheduler
+scheduler = get_scheduler()
+
+# Results are cached by image hash, so repeat uploads skip decoding and the models
+result_cache = get_result_cache()
+try:
+    classifier_id = selected_backend() + ":" + "+".join(registry.model_ids.values())
+except ValueError as e:
+    # A bad NUTRIVISION_BACKEND only takes this page down
+    st.error(str(e))
+    profile.finish()
+    st.stop()
+
+def classify_food_and_get_ingredients(image, timings=None):
+    return classify_food(scheduler, image, timings)
+
+show_logo()
 
 # Streamlit App
 st.title("Food Classification")
@@ -49,14 +49,34 @@ st.header("Upload an image to classify food items and get ingredients")
 uploaded_image = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
 
 if uploaded_image is not None:
-    image = Image.open(uploaded_image)
-    st.image(image, caption='Uploaded Image', use_column_width=True)
-    image_np = np.array(image)
-    image_pil = Image.fromarray(image_np)
-    food_name, ingredients = classify_food_and_get_ingredients(image_pil)
+    image_bytes = uploaded_image.getvalue()
+    st.image(image_bytes, caption='Uploaded Image', use_column_width=True)
+
+    timings = {}
+
+    def classify_upload():
+        # Decode once, downscaled to what the models need
+        with timed(timings, "decode"):
+            image = decode_image(image_bytes, scheduler.target_size())
+        return list(classify_food_and_get_ingredients(image, timings))
+
+    cache_key = image_cache_key(image_bytes, classifier_id)
+    with timed(timings, "total"):
+        food_name, ingredients = result_cache.get_or_compute(cache_key, classify_upload)
 
     # Display classified food and ingredients
     st.markdown(f"### Classified Food: **{food_name}**")
     st.markdown("### Ingredients:")
     for ingredient in ingredients:
         st.markdown(f"- {ingredient}")
+
+    with st.expander("Timings"):
+        st.write(timings)
+
+# Model load time and memory, shared by every session on this server
+with st.sidebar.expander("Model stats"):
+    st.table(registry.stats())
+    st.write(scheduler.stats())
+    st.write(result_cache.stats())
+
+profile.finish()
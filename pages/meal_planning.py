@@ -1,20 +1,49 @@
+from nutrivision.startup import profile_page
+
+profile = profile_page("Meal Planning")
+
 import streamlit as st
-import cohere
 from dotenv import load_dotenv
-import os
-from PIL import Image
+from nutrivision.llm_gateway import get_gateway, llm_configuration_error
+from nutrivision.meal_plans import (
+    DAYS, MEALS, PlanValidationError, build_plan, check_plan, day_totals, plan_inputs, regenerate_day,
+    regenerate_meal,
+)
+from nutrivision.assets import show_logo
+from nutrivision.resilience import ServiceUnavailableError
+
+profile.imports_done()
 
 # Load environment variables
 load_dotenv()
 
-# Get the Cohere API key from the environment variables
-cohere_api_key = os.getenv("COHERE_API_KEY")
+# Cohere calls go through the shared, cached gateway; the client is built on the first call
+llm = get_gateway()
+llm_error = llm_configuration_error()
+
+show_logo()
+
 
-# Initialize Cohere
-co = cohere.Client(cohere_api_key)
+# Function to draw one day of the plan as a table with its totals
+def render_day(area, day, meals):
+    rows = [
+        {
+            "Meal": meal.title(),
+            "Recipe": values["recipe"],
+            "Ingredients": ", ".join(values["ingredients"]),
+            "Calories": values["calories"],
+            "Protein (g)": values["protein"],
+            "Fat (g)": values["fat"],
+            "Carbs (g)": values["carbs"],
+        }
+        for meal, values in sorted(meals.items(), key=lambda item: MEALS.index(item[0]))
+    ]
+    totals = day_totals(meals)
+    with area.container():
+        st.markdown(f"**{DAYS[day]}** — {totals['calories']:.0f} kcal, {totals['protein']:.0f} g protein, "
+                    f"{totals['fat']:.0f} g fat, {totals['carbs']:.0f} g carbs")
+        st.dataframe(rows, hide_index=True, use_container_width=True)
 
-logo = Image.open("pages/logo.png")
-st.image(logo, width=150)
 
 # Streamlit UI
 st.title("AI-Powered Meal Planning")
@@ -24,27 +53,69 @@ st.subheader("Enter your dietary preferences and constraints")
 dietary_preferences = st.text_input("Dietary Preferences (e.g., vegan, keto, etc.)")
 allergies = st.text_input("Allergies (e.g., peanuts, dairy, etc.)")
 available_ingredients = st.text_area("Available Ingredients (separated by commas)")
+parallel = st.checkbox("Generate days in parallel", value=True)
+
+plan_area = st.container()
+
+# Generate meal plan; a stored plan for the same inputs is reused, and only missing days are generated.
+# Each day is drawn as soon as it is ready, in whatever order the days finish. A day is only
+# shown once its whole JSON response has been validated, so until then it keeps a placeholder
+# rather than streaming half-written text that might still be rejected.
+if llm_error:
+    st.error(llm_error)
+if st.button("Generate Meal Plan", disabled=bool(llm_error)):
+    with plan_area:
+        st.subheader("Weekly Meal Plan")
+        day_areas = [st.empty() for _ in DAYS]
+        for day_name, area in zip(DAYS, day_areas):
+            area.info(f"⏳ {day_name}: generating…")
+    try:
+        plan_id, plan = build_plan(
+            llm, dietary_preferences, allergies, available_ingredients,
+            on_day=lambda day, meals: render_day(day_areas[day], day, meals), parallel=parallel,
+        )
+    except PlanValidationError as e:
+        st.error(f"Could not generate a valid plan: {e}")
+    except ServiceUnavailableError:
+        # Days that finished are stored, so trying again only generates the rest
+        st.error("The AI service is unavailable right now. The days shown are saved; please try again shortly.")
+    else:
+        # Save meal plan to session state
+        st.session_state['meal_plan_id'] = plan_id
+        st.session_state['meal_plan'] = plan
+        st.session_state['meal_plan_drawn'] = True
+        for day, meals in plan.items():
+            render_day(day_areas[day], day, meals)
+
+plan_id = st.session_state.get('meal_plan_id')
+if plan_id is not None:
+    # Regenerating re-bills only the day or meal that changes
+    st.subheader("Change part of the plan")
+    columns = st.columns(3)
+    day = columns[0].selectbox("Day", range(len(DAYS)), format_func=DAYS.__getitem__)
+    meal = columns[1].selectbox("Meal", ("whole day",) + MEALS, format_func=str.title)
+    if columns[2].button("Regenerate", disabled=bool(llm_error)):
+        try:
+            if meal == "whole day":
+                st.session_state['meal_plan'] = regenerate_day(llm, plan_id, day)
+            else:
+                st.session_state['meal_plan'] = regenerate_meal(llm, plan_id, day, meal)
+        except PlanValidationError as e:
+            st.error(f"Could not regenerate: {e}")
+        except ServiceUnavailableError:
+            st.error("The AI service is unavailable right now, please try again shortly.")
+
+    # The plan was just drawn day by day above unless this rerun came from another widget
+    if not st.session_state.pop('meal_plan_drawn', False):
+        with plan_area:
+            st.subheader("Weekly Meal Plan")
+            for plan_day, meals in sorted(st.session_state['meal_plan'].items()):
+                render_day(st, plan_day, meals)
+
+    # build_plan regenerates failing slots a few times; anything still wrong is shown, not hidden
+    problems = check_plan(st.session_state['meal_plan'], plan_inputs(plan_id)["allergies"])
+    if problems:
+        plan_area.warning("Some of this plan doesn't meet your constraints yet, regenerate these meals: "
+                          + "; ".join(problems))
 
-# Generate meal plan
-if st.button("Generate Meal Plan"):
-    prompt = f"""
-    Create a weekly meal plan based on the following preferences and constraints:
-    Dietary Preferences: {dietary_preferences}
-    Allergies: {allergies}
-    Available Ingredients: {available_ingredients}
-
-    Weekly Meal Plan:
-    """
-    response = co.generate(
-        model='command-xlarge-nightly',
-        prompt=prompt,
-        max_tokens=500,
-        temperature=0.7
-    )
-    meal_plan = response.generations[0].text.strip()
-    
-    st.subheader("Weekly Meal Plan")
-    st.markdown(f"<div style='background-color: #333333; padding: 15px; border-radius: 10px;'>{meal_plan}</div>", unsafe_allow_html=True)
-
-    # Save meal plan to session state
-    st.session_state['meal_plan'] = meal_plan
+profile.finish()
@@ -1,22 +1,92 @@
+from nutrivision.startup import profile_page
+
+profile = profile_page("Nutrition Dashboard")
+
+import time
+from datetime import datetime
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from PIL import Image
-
-logo = Image.open("pages/logo.png")
-st.image(logo, width=150)
-# Dummy nutritional data for demonstration
-data = {
-    "Day": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
-    "Calories": [2000, 1800, 2200, 2100, 1900, 2300, 2000],
-    "Proteins": [50, 60, 55, 70, 65, 75, 60],
-    "Fats": [70, 65, 75, 80, 60, 85, 70],
-    "Carbohydrates": [300, 250, 350, 330, 280, 360, 300]
-}
-df = pd.DataFrame(data)
+from dotenv import load_dotenv
+from nutrivision.charts import get_chart_cache
+from nutrivision.favorites import PAGE_SIZE, get_favorites, list_favorites
+from nutrivision.intake import MACROS, daily_totals, default_range, intake_timezone, log_meal, weekly_totals
+from nutrivision.search import search_favorites
+from nutrivision.timing import elapsed_ms
+from nutrivision.assets import show_logo
+
+profile.imports_done()
+
+show_logo()
+
+# Load environment variables
+load_dotenv()
+
+LABELS = {"calories": "Calories", "protein": "Proteins", "fat": "Fats", "carbs": "Carbohydrates"}
 
 st.title("Interactive Nutrition Dashboard")
 
-# Plotly chart
-fig = px.line(df, x='Day', y=['Calories', 'Proteins', 'Fats', 'Carbohydrates'], title='Nutritional Intake Over the Week')
-st.plotly_chart(fig)
+# Log a meal; it is added to that day's totals right away
+with st.expander("Log a meal"):
+    # The picker offers the first page of favorites; searching reaches any of them
+    favorite_query = st.text_input("Find a favorite recipe", key="dashboard_favorite_search")
+    if favorite_query.strip():
+        found = [result.id for result in search_favorites(favorite_query, limit=PAGE_SIZE)]
+        favorites = {row.id: row.name for row in get_favorites(found)}
+        if not favorites:
+            st.caption("No matching favorites.")
+    else:
+        page = list_favorites()
+        favorites = dict(page.items)
+        if page.next_cursor is not None:
+            st.caption(f"Showing your first {PAGE_SIZE} favorites; search above to find the others.")
+    with st.form("log_meal", clear_on_submit=True):
+        favorite_id = st.selectbox(
+            "From favorite recipe (optional)", [None] + list(favorites),
+            format_func=lambda recipe_id: "—" if recipe_id is None else favorites[recipe_id],
+        )
+        columns = st.columns(4)
+        values = {macro: columns[index].number_input(LABELS[macro], min_value=0.0, step=1.0)
+                  for index, macro in enumerate(MACROS)}
+        eaten_at = st.columns(2)
+        day = eaten_at[0].date_input("Day", value=datetime.now(intake_timezone()).date())
+        at = eaten_at[1].time_input("Time")
+        note = st.text_input("Note")
+        if st.form_submit_button("Log meal"):
+            log_meal(
+                logged_at=datetime.combine(day, at, tzinfo=intake_timezone()),
+                favorite_id=favorite_id, note=note or None, **values,
+            )
+            st.success("Meal logged!")
+
+# Totals come from the per-day rollups, so the range doesn't change how much is read per day
+start, end = default_range()
+selected = st.date_input("Date range", value=(start, end))
+if isinstance(selected, (list, tuple)) and len(selected) == 2:
+    start, end = selected
+metrics = st.multiselect("Metrics", list(MACROS), default=list(MACROS), format_func=LABELS.get)
+per_meal = st.toggle("Show individual meals instead of daily totals")
+
+daily = daily_totals(start, end)
+if not metrics:
+    st.info("Pick at least one metric.")
+elif daily["entries"].sum() == 0:
+    st.write("No meals logged in this range yet.")
+else:
+    # Figures are downsampled to screen resolution and cached until a meal is logged or deleted
+    charts = get_chart_cache()
+    chart_reports = {}
+    for granularity, title in (
+        ("meal" if per_meal else "daily", "Nutritional Intake per Meal" if per_meal else "Nutritional Intake per Day"),
+        ("rolling7", "7-Day Rolling Average"),
+    ):
+        result = charts.chart(start, end, metrics, granularity, labels=LABELS, title=title)
+        render_start = time.perf_counter()
+        st.plotly_chart(result.figure)
+        chart_reports[title] = dict(result.report(), render_ms=elapsed_ms(render_start))
+
+    with st.sidebar.expander("Chart payloads"):
+        st.json(chart_reports)
+
+    st.subheader("Weekly Averages")
+    st.dataframe(weekly_totals(daily, how="mean")[metrics].rename(columns=LABELS).round(1))
+
+profile.finish()
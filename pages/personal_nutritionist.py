@@ -1,120 +1,91 @@
+from nutrivision.startup import profile_page
+
+profile = profile_page("Personal Nutritionist")
+
 import streamlit as st
-import cohere
 from dotenv import load_dotenv
-import os
-from sqlalchemy import create_engine, Column, Integer, String, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from PIL import Image
+from nutrivision.conversation import ConversationEngine
+from nutrivision.favorites_ui import render_favorites_list
+from nutrivision.llm_gateway import get_gateway, llm_configuration_error
+from nutrivision.resilience import ServiceUnavailableError
+from nutrivision.streaming import render_stream
+from nutrivision.assets import show_logo
+
+profile.imports_done()
 
-logo = Image.open("pages/logo.png")
-st.image(logo, width=150)
+show_logo()
 
 # Load environment variables
 load_dotenv()
 
-# Get the Cohere API key and database URL from the environment variables
-cohere_api_key = os.getenv("COHERE_API_KEY")
-database_url = os.getenv("DATABASE_URL")
-
-# Initialize Cohere
-co = cohere.Client(cohere_api_key)
-
-# Initialize SQLAlchemy
-engine = create_engine(database_url)
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
-
-# Define the FavoriteRecipe model
-class FavoriteRecipe(Base):
-    __tablename__ = 'favorite_recipes'
-    id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    recipe = Column(Text, nullable=False)
+# Cohere calls go through the shared, cached gateway; the client is built on the first call
+llm = get_gateway()
+llm_error = llm_configuration_error()
 
-# Create the table if it doesn't exist
-Base.metadata.create_all(engine)
+NUTRITIONIST_TEMPLATE = "<div style='padding: 10px; margin: 10px 0; border: 1px solid #ccc; border-radius: 5px; background-color: #495d85;'>Nutritionist: {}</div>"
+USER_TEMPLATE = "<div style='padding: 10px; margin: 10px 0; border: 1px solid #ccc; border-radius: 5px; background-color: #6e7685;'>You: {}</div>"
 
-# Function to load favorites
-def load_favorites():
-    return session.query(FavoriteRecipe).all()
 
-# Function to analyze recipes using Cohere API
-def analyze_nutrition(favorites, user_input=None):
-    favorite_recipes = "\n".join([f"Recipe: {item.recipe}" for item in favorites])
+# Function to stream a nutritionist reply into a fresh placeholder in the chat area
+def render_reply(area):
+    return lambda chunks: render_stream(chunks, area.empty(), NUTRITIONIST_TEMPLATE)
 
-    prompt = f"""
-    You are a personal nutritionist. Analyze the following favorite recipes and provide detailed nutritional advice.
 
-    Favorite Recipes:
-    {favorite_recipes}
+# Function to draw one chat message
+def render_message(area, text, role):
+    template = USER_TEMPLATE if role == "You" else NUTRITIONIST_TEMPLATE
+    area.markdown(template.format(text), unsafe_allow_html=True)
 
-    Nutritional Advice:
-    """
-
-    if user_input:
-        prompt += f"\nUser's Question: {user_input}\n"
-
-    response = co.generate(
-        model='command-xlarge-nightly',
-        prompt=prompt,
-        max_tokens=500,
-        temperature=0.7
-    )
-
-    return response.generations[0].text.strip()
 
 # Streamlit UI
 st.title("Personal Nutritionist Chat with AI")
 
-# Initialize conversation history
-if 'conversation' not in st.session_state:
-    st.session_state['conversation'] = None
-if 'chat_history' not in st.session_state:
-    st.session_state['chat_history'] = []
+# The chat engine keeps the favorites analysis and a compact history across reruns
+if 'nutritionist_chat' not in st.session_state:
+    st.session_state['nutritionist_chat'] = None
 
 # Button to start the chat
-if st.button("Start Chat"):
-    favorites = load_favorites()
-    if not favorites:
+if llm_error:
+    st.error(llm_error)
+if st.button("Start Chat", disabled=bool(llm_error)):
+    engine = ConversationEngine(llm)
+    st.session_state['nutritionist_chat'] = engine
+    if engine.refresh_analysis(render=render_reply(st)) is None:
+        st.session_state['nutritionist_chat'] = None
         st.warning("Add favorite recipes to get nutritional advice.")
     else:
-        initial_response = analyze_nutrition(favorites)
-        st.session_state['conversation'] = initial_response
-        st.session_state['chat_history'] = [(initial_response, "Nutritionist")]
-
         st.success("Chat started! You can now ask questions.")
+        # The analysis was just streamed above; history starts with the next turn
+        st.session_state['nutritionist_shown'] = len(engine.messages)
 
-# Load favorites
-favorites = load_favorites()
-
-# Display favorite recipes with expanders
+# Display favorite recipes page by page; deleting one refreshes the analysis on the next question
 st.subheader("Favorite Recipes")
-if favorites:
-    for favorite in favorites:
-        with st.expander(f"{favorite.name} (ID: {favorite.id})"):
-            st.write(favorite.recipe)
-            if st.button("Delete", key=f"delete_{favorite.id}"):
-                session.delete(favorite)
-                session.commit()
-                st.experimental_rerun()
-else:
-    st.write("No favorite recipes found.")
+render_favorites_list("nutritionist", allow_delete=True)
 
 # Chat interface at the end of the page
-if st.session_state['conversation']:
+engine = st.session_state['nutritionist_chat']
+if engine is not None:
     st.subheader("Chat History")
-    for chat, role in st.session_state['chat_history']:
-        if role == "You":
-            st.markdown(f"<div style='padding: 10px; margin: 10px 0; border: 1px solid #ccc; border-radius: 5px; background-color: #6e7685;'>You: {chat}</div>", unsafe_allow_html=True)
-        else:
-            st.markdown(f"<div style='padding: 10px; margin: 10px 0; border: 1px solid #ccc; border-radius: 5px; background-color: #495d85;'>Nutritionist: {chat}</div>", unsafe_allow_html=True)
-
-    user_input = st.text_input("You:", key="user_input")
-
-    if user_input:
-        response = analyze_nutrition(favorites, user_input)
-        st.session_state['chat_history'].append((user_input, "You"))
-        st.session_state['chat_history'].append((response, "Nutritionist"))
-        st.experimental_rerun()
+    chat_area = st.container()
+    shown = st.session_state.pop('nutritionist_shown', 0)
+    for text, role in engine.messages[shown:]:
+        render_message(chat_area, text, role)
+
+    # A cleared form replaces the old text_input + rerun: new turns are drawn in place
+    with st.form("nutritionist_question", clear_on_submit=True):
+        user_input = st.text_input("You:")
+        submitted = st.form_submit_button("Send")
+
+    if submitted and user_input:
+        try:
+            engine.refresh_analysis(render=render_reply(chat_area))
+            render_message(chat_area, user_input, "You")
+            engine.ask(user_input, render=render_reply(chat_area))
+        except ServiceUnavailableError:
+            st.error("The AI service is unavailable right now, please ask again shortly.")
+
+    if engine.metrics:
+        with st.sidebar.expander("Prompt size and latency per turn"):
+            st.dataframe(engine.metrics)
+
+profile.finish()
@@ -1,64 +1,31 @@
+from nutrivision.startup import profile_page
+
+profile = profile_page("Recipe Recommendation")
+
 import streamlit as st
-import cohere
-from sqlalchemy import create_engine, Column, Integer, String, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
-import os
-from PIL import Image
+from nutrivision.context_builder import ContextBuilder
+from nutrivision.llm_gateway import get_gateway, llm_configuration_error
+from nutrivision.recommendations import recommend_recipes as recommend
+from nutrivision.assets import show_logo
+from nutrivision.resilience import ServiceUnavailableError
+
+profile.imports_done()
 
-logo = Image.open("pages/logo.png")
-st.image(logo, width=150)
+show_logo()
 # Load environment variables
 load_dotenv()
 
-# Get the Cohere API key and database URL from the environment variables
-cohere_api_key = os.getenv("COHERE_API_KEY")
-database_url = os.getenv("DATABASE_URL")
-
-# Initialize Cohere
-co = cohere.Client(cohere_api_key)
-
-# Initialize SQLAlchemy
-engine = create_engine(database_url)
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
+# Cohere calls go through the shared, cached gateway; the client is built on the first call
+llm = get_gateway()
+llm_error = llm_configuration_error()
 
-# Define the FavoriteRecipe model
-class FavoriteRecipe(Base):
-    __tablename__ = 'favorite_recipes'
-    id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    recipe = Column(Text, nullable=False)
+# Keeps the favorites part of the prompt within a token budget
+context_builder = ContextBuilder()
 
-# Create the table if it doesn't exist
-Base.metadata.create_all(engine)
-
-# Function to load favorites
-def load_favorites():
-    return session.query(FavoriteRecipe).all()
-
-# Function to recommend recipes using Cohere
+# Function to recommend recipes using Cohere, from the favorites nearest to the preferences
 def recommend_recipes(user_preferences):
-    favorites = load_favorites()
-    favorite_recipes = "\n".join([f"Recipe: {item.recipe}" for item in favorites])
-    prompt = f"""
-    Based on the following preferences and past favorite recipes, recommend new recipes.
-    Preferences: {user_preferences}
-
-    Favorite Recipes:
-    {favorite_recipes}
-
-    Recommended Recipes:
-    """
-    response = co.generate(
-        model='command-xlarge-nightly',
-        prompt=prompt,
-        max_tokens=500,
-        temperature=0.7
-    )
-    recommended_recipes = response.generations[0].text.strip()
+    recommended_recipes, st.session_state['prompt_report'] = recommend(llm, user_preferences, context_builder)
     return recommended_recipes
 
 # Streamlit UI
@@ -69,7 +36,17 @@ st.subheader("Enter your preferences")
 user_preferences = st.text_area("Preferences (e.g., spicy food, vegetarian, quick meals)")
 
 # Recommend recipes
-if st.button("Recommend Recipes"):
-    recommended_recipes = recommend_recipes(user_preferences)
-    st.subheader("Recommended Recipes")
-    st.markdown(f"<div style='background-color: #333333; color: white; padding: 15px; border-radius: 10px;'>{recommended_recipes}</div>", unsafe_allow_html=True)
+if llm_error:
+    st.error(llm_error)
+if st.button("Recommend Recipes", disabled=bool(llm_error)):
+    try:
+        recommended_recipes = recommend_recipes(user_preferences)
+    except ServiceUnavailableError:
+        st.error("The AI service is unavailable right now, please try again shortly.")
+    else:
+        st.subheader("Recommended Recipes")
+        st.markdown(f"<div style='background-color: #333333; color: white; padding: 15px; border-radius: 10px;'>{recommended_recipes}</div>", unsafe_allow_html=True)
+        with st.expander("Prompt size"):
+            st.json(st.session_state['prompt_report'])
+
+profile.finish()